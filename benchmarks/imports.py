@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Benchmark the time to import edward.
+
+It imports edward in fresh interpreters, and reports the median
+wall time and the heavy optional modules which were loaded. Those
+modules are imported lazily on first use, so the script exits with a
+nonzero status if importing edward loads any of them, or if the
+median time exceeds a budget.
+
+Usage:
+    python -m benchmarks.imports
+    python -m benchmarks.imports --n_repeat 10 --budget 5.0
+"""
+from __future__ import print_function
+import argparse
+import json
+import subprocess
+import sys
+
+# Modules that `import edward` must not load. Its submodules are
+# only imported lazily from Python 3.7.
+LAZY_MODULES = ['pymc3', 'pystan', 'theano', 'prettytensor', 'scipy.stats',
+                'tensorflow.python.client.timeline']
+if sys.version_info >= (3, 7):
+    LAZY_MODULES += ['edward.callbacks', 'edward.criticisms',
+                     'edward.inferences', 'edward.models', 'edward.stats',
+                     'edward.traces']
+
+_SCRIPT = """
+import json, sys, time
+start = time.time()
+import tensorflow
+mid = time.time()
+import edward
+end = time.time()
+print(json.dumps({'tensorflow': mid - start, 'edward': end - mid,
+                  'loaded': [m for m in %r if m in sys.modules]}))
+"""
+
+def time_import():
+    """
+    Time importing TensorFlow, then edward, in a fresh interpreter.
+
+    Returns
+    -------
+    dict
+        Seconds to import TensorFlow, seconds to import edward on top
+        of it, and the lazy modules which were loaded.
+    """
+    out = subprocess.check_output([sys.executable, '-c',
+                                   _SCRIPT % (LAZY_MODULES, )])
+    return json.loads(out.decode().strip().split('\n')[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--n_repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=None,
+                        help="maximum median seconds to import edward, "
+                             "excluding TensorFlow")
+    args = parser.parse_args(argv)
+
+    runs = [time_import() for _ in range(args.n_repeat)]
+    tf_times = sorted(run['tensorflow'] for run in runs)
+    ed_times = sorted(run['edward'] for run in runs)
+    loaded = sorted(set(m for run in runs for m in run['loaded']))
+    result = {'tensorflow': tf_times[len(tf_times) // 2],
+              'edward': ed_times[len(ed_times) // 2],
+              'loaded': loaded}
+    print(json.dumps(result, indent=2, sort_keys=True))
+
+    status = 0
+    if loaded:
+        print("REGRESSION imported eagerly: " + ", ".join(loaded),
+              file=sys.stderr)
+        status = 1
+
+    if args.budget is not None and result['edward'] > args.budget:
+        print("REGRESSION import took {:.3f}s, budget {:.3f}s".format(
+            result['edward'], args.budget), file=sys.stderr)
+        status = 1
+
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
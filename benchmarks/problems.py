@@ -0,0 +1,134 @@
+"""
+Benchmark problems built from the bundled examples.
+
+Each problem is a function taking a problem size and returning the
+model, variational model, data, and keyword arguments for
+MFVI.initialize(). The models are loaded from the examples
+themselves, rather than copied, so that timings reflect what users
+run.
+"""
+import ast
+import edward as ed
+import numpy as np
+import os
+import tensorflow as tf
+
+from edward.models import Variational, Beta, Normal, TransformedNormal
+from edward.stats import norm
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'examples')
+
+def load_example(filename):
+    """
+    Load the imports, classes and functions of an example, without
+    running the rest of its script.
+
+    Returns
+    -------
+    dict
+        Namespace of the example.
+    """
+    path = os.path.join(EXAMPLES_DIR, filename)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    namespace = {'__name__': 'examples.' + os.path.splitext(filename)[0]}
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            try:
+                _exec(node, path, namespace)
+            except ImportError:
+                # Only used by the script, e.g., for plotting.
+                pass
+        elif isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            _exec(node, path, namespace)
+
+    return namespace
+
+def _exec(node, path, namespace):
+    module = ast.parse('')
+    module.body = [node]
+    exec(compile(module, path, 'exec'), namespace)
+
+class NormalPosterior:
+    """
+    p(x, z) = p(z) = p(z | x) = prod_{d=1}^D Normal(z_d; mu, std)
+
+    examples/normal.py in D dimensions, whose model has a single
+    latent variable.
+    """
+    def __init__(self, num_vars, mu=1.0, std=1.0):
+        self.num_vars = num_vars
+        self.mu = mu
+        self.std = std
+
+    def log_prob(self, xs, zs):
+        return tf.reduce_sum(norm.logpdf(zs, self.mu, self.std), 1)
+
+def normal(size):
+    model = NormalPosterior(num_vars=size)
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    return model, variational, ed.Data(), {}
+
+def beta_bernoulli(size):
+    x = np.random.binomial(1, 0.2, size=size).astype(np.float32)
+    model = load_example('beta_bernoulli_tf.py')['BetaBernoulli']()
+    variational = Variational()
+    variational.add(Beta())
+    return model, variational, ed.Data(tf.constant(x)), {}
+
+def mixture_gaussian(size):
+    K, D = 2, 2
+    c = np.random.binomial(1, 0.5, size=size)
+    x = np.random.randn(size, D) + 4.0 * c[:, np.newaxis]
+    model = load_example('mixture_gaussian.py')['MixtureGaussian'](K, D)
+    variational = Variational()
+    variational.add(TransformedNormal([1, model.K],
+                                      transform='stick_breaking'))
+    variational.add(Normal(model.K*model.D))
+    variational.add(TransformedNormal(model.K*model.D, transform='softplus'))
+    data = ed.Data(tf.constant(x, dtype=tf.float32))
+    return model, variational, data, {'n_minibatch': 5}
+
+def bayesian_nn(size):
+    x = np.linspace(-2, 2, num=size)
+    y = np.cos(4.0 * x) + np.random.normal(0, 0.1, size=size)
+    BayesianNN = load_example('bayesian_nn.py')['BayesianNN']
+    model = BayesianNN(layer_sizes=[1, 10, 10, 1], nonlinearity=ed.rbf)
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(tf.constant(np.column_stack((y, x)), dtype=tf.float32))
+    return model, variational, data, {'n_minibatch': 5}
+
+def gp_classification(size):
+    x = np.random.randn(size, 2)
+    y = np.where(x[:, 0] + x[:, 1] > 0, 1.0, -1.0)
+    model = load_example('gp_classification.py')['GaussianProcess'](N=size)
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(tf.constant(np.column_stack((y, x)), dtype=tf.float32))
+    return model, variational, data, {}
+
+def hierarchical_logistic(size):
+    x = np.linspace(-3, 3, num=size)
+    y = (np.tanh(x) + np.random.normal(0, 0.1, size=size) >= 0.5)
+    HierarchicalLogistic = load_example(
+        'hierarchical_logistic_regression.py')['HierarchicalLogistic']
+    model = HierarchicalLogistic(weight_dim=[1, 1])
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(tf.constant(np.column_stack((y, (x - 4.0) / 4.0)),
+                               dtype=tf.float32))
+    return model, variational, data, {'n_minibatch': 5}
+
+# Problem sizes for each benchmark, from smallest to largest.
+PROBLEMS = {
+    'normal': (normal, [1, 100, 10000]),
+    'beta_bernoulli': (beta_bernoulli, [10, 1000, 100000]),
+    'mixture_gaussian': (mixture_gaussian, [100, 1000, 10000]),
+    'bayesian_nn': (bayesian_nn, [40, 400, 4000]),
+    'gp_classification': (gp_classification, [10, 25, 50]),
+    'hierarchical_logistic': (hierarchical_logistic, [40, 400, 4000]),
+}
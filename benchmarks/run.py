@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Benchmark MFVI on the bundled examples.
+
+For each problem and size, it measures
++ the time to build the graph and initialize variables,
++ steady-state steps per second, after warm-up steps, and
++ the time and number of steps until the ELBO first reaches a
+  threshold.
+
+Results are written as JSON. If a baseline is given, each benchmark
+uses the baseline's ELBO threshold, results are compared against it,
+and the script exits with a nonzero status if any benchmark regressed
+by more than the tolerance.
+
+Usage:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --problems normal,gp_classification \
+        --sizes 0,1 --baseline benchmarks/baseline.json
+"""
+from __future__ import print_function
+import argparse
+import edward as ed
+import json
+import numpy as np
+import platform
+import sys
+import tensorflow as tf
+import time
+
+from benchmarks.problems import PROBLEMS
+
+def run_benchmark(problem, size, n_iter=500, n_warmup=20, threshold=None,
+                  frac=0.9, seed=42):
+    """
+    Time one benchmark in a fresh graph and session.
+
+    Parameters
+    ----------
+    problem : function
+        Function taking size and returning the model, variational
+        model, data, and keyword arguments for MFVI.initialize().
+    size : int
+        Problem size.
+    n_iter : int, optional
+        Number of steps to run.
+    n_warmup : int, optional
+        Number of steps excluded from the steady-state timing.
+    threshold : float, optional
+        ELBO threshold. If not specified, it is the ELBO value at
+        frac of the improvement from the first to the final steps,
+        using a moving average to smooth the stochastic ELBO.
+    frac : float, optional
+        Fraction of the improvement used for the default threshold.
+    seed : int, optional
+        Random seed.
+
+    Returns
+    -------
+    dict
+        Timings for the benchmark.
+    """
+    with tf.Graph().as_default():
+        ed.set_seed(seed)
+        model, variational, data, kwargs = problem(size)
+        start = time.time()
+        inference = ed.MFVI(model, variational, data)
+        inference.initialize(n_iter=n_iter, n_print=None, **kwargs)
+        build_time = time.time() - start
+
+        times = np.zeros(n_iter)
+        losses = np.zeros(n_iter)
+        start = time.time()
+        for t in range(n_iter):
+            losses[t] = inference.update()
+            times[t] = time.time() - start
+
+        ed.get_session().close()
+
+    n_warmup = min(n_warmup, n_iter - 1)
+    if n_warmup > 0:
+        steady_time = times[-1] - times[n_warmup - 1]
+    else:
+        steady_time = times[-1]
+
+    steps_per_sec = (n_iter - n_warmup) / steady_time
+
+    window = max(1, n_iter // 20)
+    smoothed = np.convolve(losses, np.ones(window) / window, mode='valid')
+    if threshold is None:
+        threshold = smoothed[0] + frac * (smoothed[-1] - smoothed[0])
+
+    reached = np.where(smoothed >= threshold)[0]
+    if len(reached) > 0:
+        # Report the last step of the first window reaching threshold.
+        iters_to_threshold = int(reached[0]) + window
+        time_to_threshold = float(build_time +
+                                  times[iters_to_threshold - 1])
+    else:
+        iters_to_threshold = None
+        time_to_threshold = None
+
+    return {'build_time': build_time,
+            'steps_per_sec': steps_per_sec,
+            'threshold': float(threshold),
+            'iters_to_threshold': iters_to_threshold,
+            'time_to_threshold': time_to_threshold,
+            'final_elbo': float(smoothed[-1])}
+
+def run(problems=None, sizes=None, n_iter=500, n_warmup=20,
+        baseline=None):
+    """
+    Run benchmarks for the given problems and indices into their
+    problem sizes. Default is all problems and sizes.
+
+    If a baseline is given, each benchmark in it uses its threshold,
+    so that the time to threshold of both runs is to the same ELBO.
+    """
+    if problems is None:
+        problems = sorted(PROBLEMS.keys())
+
+    thresholds = {}
+    if baseline is not None:
+        for b in baseline['benchmarks']:
+            thresholds[(b['name'], b['size'])] = b['threshold']
+
+    results = []
+    for name in problems:
+        problem, problem_sizes = PROBLEMS[name]
+        for i, size in enumerate(problem_sizes):
+            if sizes is not None and i not in sizes:
+                continue
+
+            print("{:s} size {:d}".format(name, size), file=sys.stderr)
+            result = run_benchmark(problem, size, n_iter, n_warmup,
+                                   thresholds.get((name, size)))
+            result.update({'name': name, 'size': size})
+            results += [result]
+
+    return {'meta': {'python': platform.python_version(),
+                     'tensorflow': tf.__version__,
+                     'numpy': np.__version__,
+                     'platform': platform.platform(),
+                     'n_iter': n_iter,
+                     'n_warmup': n_warmup},
+            'benchmarks': results}
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare results against a baseline.
+
+    A benchmark regresses if its build time or time to threshold
+    grows, or its steps per second or final ELBO drops, by more than
+    the tolerance relative to the baseline. The time to threshold is
+    only compared if both runs used the same threshold (see run()).
+
+    Returns
+    -------
+    list
+        Descriptions of each regression.
+    """
+    base = dict(((b['name'], b['size']), b) for b in baseline['benchmarks'])
+    regressions = []
+    for result in results['benchmarks']:
+        key = (result['name'], result['size'])
+        if key not in base:
+            continue
+
+        old = base[key]
+        checks = [('build_time', 1.0), ('steps_per_sec', -1.0),
+                  ('final_elbo', -1.0)]
+        if result['threshold'] == old['threshold']:
+            checks += [('time_to_threshold', 1.0)]
+        else:
+            regressions += ["{:s} size {:d}: threshold {:.4g} differs "
+                            "from the baseline's {:.4g}".format(
+                                key[0], key[1], result['threshold'],
+                                old['threshold'])]
+
+        for field, sign in checks:
+            new_val = result[field]
+            old_val = old.get(field)
+            if old_val is None:
+                continue
+
+            if new_val is None:
+                regressions += ["{:s} size {:d}: {:s} not reached".format(
+                    key[0], key[1], field)]
+                continue
+
+            change = sign * (new_val - old_val) / abs(old_val)
+            if change > tolerance:
+                regressions += ["{:s} size {:d}: {:s} {:.4g} -> {:.4g}".format(
+                    key[0], key[1], field, old_val, new_val)]
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--problems', default=None,
+                        help="comma-separated problem names")
+    parser.add_argument('--sizes', default=None,
+                        help="comma-separated indices into problem sizes")
+    parser.add_argument('--n_iter', type=int, default=500)
+    parser.add_argument('--n_warmup', type=int, default=20)
+    parser.add_argument('--output', default=None,
+                        help="file to write JSON results to")
+    parser.add_argument('--baseline', default=None,
+                        help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    problems = args.problems.split(',') if args.problems else None
+    sizes = [int(i) for i in args.sizes.split(',')] if args.sizes else None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        baseline = None
+
+    results = run(problems, sizes, args.n_iter, args.n_warmup, baseline)
+    out = json.dumps(results, indent=2, sort_keys=True)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(out)
+    else:
+        print(out)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression, file=sys.stderr)
+
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks and accuracy harness for edward.stats and the special
+functions in edward.util.
+
+For every density, entropy and special function, it measures
++ throughput in elements per second across input sizes and batch
+  shapes, and
++ the maximum absolute and relative error versus SciPy over a grid
+  of parameters, binned by the decade of the argument, to show where
+  the polynomial approximations of digamma, lgamma and lbeta break
+  down.
+
+Omitted are the entropies which raise NotImplementedError (binom,
+chi2, expon, geom, lognorm, mixture, nbinom, t, truncnorm), and two
+whose cost does not depend on the size of the input:
+multinomial.entropy enumerates every vector of counts summing to n,
+and multivariate_normal.entropy takes a single covariance matrix.
+multivariate_normal.logpdf builds one op per data point, so its
+throughput is measured on smaller inputs.
+
+Usage:
+    python -m benchmarks.stats --output stats.json
+    python -m benchmarks.stats --functions lgamma,digamma --no-throughput
+"""
+from __future__ import print_function
+import argparse
+import json
+import numpy as np
+import sys
+import tensorflow as tf
+import time
+
+from edward import stats as ed_stats
+from edward.util import digamma, lbeta, lgamma
+from scipy import special, stats
+
+# Each function is given as
+# (function in Edward, reference in SciPy, input generator),
+# where the input generator takes a number of elements and returns
+# the argument and a list of parameter settings.
+def _positive(n):
+    return np.logspace(-3, 3, n), [()]
+
+def _beta_pairs(n):
+    a = np.logspace(-2, 2, int(np.sqrt(n)))
+    x = np.array([[ai, bi] for ai in a for bi in a])
+    return x, [()]
+
+def _unit(n):
+    return np.linspace(0.001, 0.999, n), [(0.5, 0.5), (2.0, 5.0), (10.0, 1.0)]
+
+def _real(n):
+    return np.linspace(-10.0, 10.0, n), [(0.0, 1.0), (2.0, 0.1), (-1.0, 10.0)]
+
+def _counts(n):
+    return np.arange(n) % 100, [(0.1, ), (5.0, ), (50.0, )]
+
+def _binary(n):
+    return np.arange(n) % 2, [(0.01, ), (0.5, ), (0.99, )]
+
+def _simplex(n):
+    K = 5
+    x = np.random.dirichlet(np.ones(K), size=max(n // K, 1))
+    return x, [(np.ones(K), ), (np.linspace(0.1, 10.0, K), )]
+
+def _count_vectors(n):
+    K = 5
+    p_one = np.ones(K) / K
+    p_two = np.linspace(0.1, 1.0, K) / np.sum(np.linspace(0.1, 1.0, K))
+    x = np.random.multinomial(10, p_one, size=max(n // K, 1))
+    return x, [(10, p_one), (10, p_two)]
+
+def _points(n):
+    D = 3
+    x = np.random.randn(max(n // D, 1), D)
+    cov = np.array([[1.0, 0.5, 0.0], [0.5, 2.0, 0.3], [0.0, 0.3, 0.5]])
+    return x, [(np.zeros(D), np.eye(D)), (np.ones(D), cov)]
+
+def _mixture_points(n):
+    D = 2
+    x = 3.0 * np.random.randn(max(n // D, 1), D)
+    pi = np.array([0.2, 0.3, 0.5])
+    loc = np.array([[-2.0, 0.0], [0.0, 2.0], [3.0, -1.0]])
+    scale = np.array([[0.5, 1.0], [1.0, 1.0], [2.0, 0.3]])
+    return x, [(pi, loc, scale)]
+
+def _mixture_logpdf(x, pi, loc, scale):
+    log_joint = np.log(pi) + \
+        np.sum(stats.norm.logpdf(x[:, np.newaxis, :], loc, scale), 2)
+    max_joint = np.max(log_joint, 1)
+    return max_joint + \
+        np.log(np.sum(np.exp(log_joint - max_joint[:, np.newaxis]), 1))
+
+def _alphas(n):
+    K = 4
+    return np.exp(np.random.uniform(-2.0, 2.0, (max(n // K, 1), K))), [()]
+
+FUNCTIONS = {
+    'digamma': (digamma, special.psi, _positive),
+    'lgamma': (lgamma, special.gammaln, _positive),
+    'lbeta': (lbeta,
+              lambda x: special.betaln(x[:, 0], x[:, 1]),
+              _beta_pairs),
+    'bernoulli.logpmf': (ed_stats.bernoulli.logpmf, stats.bernoulli.logpmf,
+                         _binary),
+    'beta.logpdf': (ed_stats.beta.logpdf, stats.beta.logpdf, _unit),
+    'binom.logpmf': (lambda x, p: ed_stats.binom.logpmf(x, 100, p),
+                     lambda x, p: stats.binom.logpmf(x, 100, p),
+                     lambda n: (np.arange(n) % 101, [(0.1, ), (0.5, )])),
+    'chi2.logpdf': (ed_stats.chi2.logpdf, stats.chi2.logpdf,
+                    lambda n: (np.logspace(-2, 2, n),
+                               [(1.0, ), (5.0, ), (50.0, )])),
+    'dirichlet.logpdf': (ed_stats.dirichlet.logpdf,
+                         lambda x, alpha: stats.dirichlet.logpdf(x.T, alpha),
+                         _simplex),
+    'expon.logpdf': (ed_stats.expon.logpdf,
+                     lambda x, scale: stats.expon.logpdf(x, scale=scale),
+                     lambda n: (np.logspace(-2, 2, n), [(0.5, ), (10.0, )])),
+    'gamma.logpdf': (ed_stats.gamma.logpdf, stats.gamma.logpdf,
+                     lambda n: (np.logspace(-2, 2, n),
+                                [(0.5, ), (1.0, ), (20.0, )])),
+    'geom.logpmf': (ed_stats.geom.logpmf, stats.geom.logpmf,
+                    lambda n: (np.arange(n) % 50 + 1, [(0.1, ), (0.9, )])),
+    'invgamma.logpdf': (ed_stats.invgamma.logpdf, stats.invgamma.logpdf,
+                        lambda n: (np.logspace(-2, 2, n),
+                                   [(0.5, ), (3.0, ), (20.0, )])),
+    'lognorm.logpdf': (ed_stats.lognorm.logpdf, stats.lognorm.logpdf,
+                       lambda n: (np.logspace(-2, 2, n), [(0.5, ), (2.0, )])),
+    'mixture.logpdf': (ed_stats.mixture.logpdf, _mixture_logpdf,
+                       _mixture_points),
+    'multinomial.logpmf': (ed_stats.multinomial.logpmf,
+                           stats.multinomial.logpmf, _count_vectors),
+    'multivariate_normal.logpdf': (ed_stats.multivariate_normal.logpdf,
+                                   stats.multivariate_normal.logpdf,
+                                   _points),
+    'nbinom.logpmf': (ed_stats.nbinom.logpmf, stats.nbinom.logpmf,
+                      lambda n: (np.arange(n) % 100,
+                                 [(1.0, 0.5), (20.0, 0.1)])),
+    'norm.logpdf': (ed_stats.norm.logpdf, stats.norm.logpdf, _real),
+    'poisson.logpmf': (ed_stats.poisson.logpmf, stats.poisson.logpmf,
+                       _counts),
+    't.logpdf': (ed_stats.t.logpdf, stats.t.logpdf,
+                 lambda n: (np.linspace(-10.0, 10.0, n),
+                            [(1.0, ), (5.0, ), (100.0, )])),
+    'truncnorm.logpdf': (ed_stats.truncnorm.logpdf, stats.truncnorm.logpdf,
+                         lambda n: (np.linspace(-0.99, 0.99, n),
+                                    [(-1.0, 2.0), (-3.0, 1.0)])),
+    'uniform.logpdf': (ed_stats.uniform.logpdf, stats.uniform.logpdf,
+                       lambda n: (np.linspace(0.001, 0.999, n),
+                                  [(0.0, 1.0), (-2.0, 5.0)])),
+    'bernoulli.entropy': (ed_stats.bernoulli.entropy,
+                          stats.bernoulli.entropy,
+                          lambda n: (np.linspace(0.001, 0.999, n), [()])),
+    'beta.entropy': (lambda x: ed_stats.beta.entropy(x[:, 0], x[:, 1]),
+                     lambda x: stats.beta.entropy(x[:, 0], x[:, 1]),
+                     _beta_pairs),
+    'dirichlet.entropy': (ed_stats.dirichlet.entropy,
+                          lambda x: np.array([stats.dirichlet.entropy(alpha)
+                                              for alpha in x]),
+                          _alphas),
+    'gamma.entropy': (ed_stats.gamma.entropy, stats.gamma.entropy,
+                      _positive),
+    'invgamma.entropy': (ed_stats.invgamma.entropy, stats.invgamma.entropy,
+                         _positive),
+    'norm.entropy': (lambda scale: ed_stats.norm.entropy(scale=scale),
+                     lambda scale: stats.norm.entropy(scale=scale),
+                     _positive),
+    'uniform.entropy': (lambda scale: ed_stats.uniform.entropy(scale=scale),
+                        lambda scale: stats.uniform.entropy(scale=scale),
+                        _positive),
+}
+
+# Input sizes for throughput, for functions which cannot be timed on
+# the default sizes.
+SIZES = {
+    'multivariate_normal.logpdf': (100, 1000, 10000),
+}
+
+def accuracy(name, n=1000):
+    """
+    Maximum absolute and relative error versus SciPy.
+
+    Returns
+    -------
+    dict
+        The overall errors, the argument with the largest relative
+        error, and the errors binned by the decade of the first
+        column of the argument.
+    """
+    ed_fn, sp_fn, inputs = FUNCTIONS[name]
+    x, params = inputs(n)
+    sess = tf.Session()
+    abs_errs = []
+    rel_errs = []
+    for param in params:
+        val_ed = sess.run(ed_fn(tf.constant(x, dtype=tf.float32), *param))
+        val_true = sp_fn(x, *param)
+        abs_err = np.abs(val_ed - val_true)
+        abs_errs += [abs_err]
+        rel_errs += [abs_err / np.maximum(np.abs(val_true), 1e-12)]
+
+    sess.close()
+    abs_err = np.max(abs_errs, 0)
+    rel_err = np.max(rel_errs, 0)
+    key = np.abs(x if len(x.shape) == 1 else x[:, 0])
+    worst = int(np.nanargmax(rel_err))
+    result = {'max_abs_err': float(np.nanmax(abs_err)),
+              'max_rel_err': float(np.nanmax(rel_err)),
+              'worst_arg': np.atleast_1d(x[worst]).tolist(),
+              'bins': []}
+    if rel_err.shape != key.shape:
+        return result
+
+    # Bin errors by decade of the argument.
+    with np.errstate(divide='ignore'):
+        decade = np.floor(np.log10(np.maximum(key, 1e-300)))
+
+    for d in np.unique(decade):
+        mask = decade == d
+        result['bins'] += [{'decade': float(d),
+                            'max_abs_err': float(np.nanmax(abs_err[mask])),
+                            'max_rel_err': float(np.nanmax(rel_err[mask]))}]
+
+    return result
+
+def throughput(name, sizes=None, n_repeat=10):
+    """
+    Elements evaluated per second, for each input size and for a
+    vector and a matrix batch shape of the same number of elements.
+    The sizes default to SIZES[name], or to (100, 10000, 1000000).
+    """
+    ed_fn, sp_fn, inputs = FUNCTIONS[name]
+    if sizes is None:
+        sizes = SIZES.get(name, (100, 10000, 1000000))
+
+    results = []
+    for size in sizes:
+        x, params = inputs(size)
+        param = params[0]
+        shapes = [x.shape]
+        if len(x.shape) == 1 and size >= 100:
+            shapes += [(size // 100, 100)]
+
+        for shape in shapes:
+            n = int(np.prod(shape))
+            with tf.Graph().as_default():
+                xv = tf.Variable(tf.constant(x[:n].reshape(shape),
+                                             dtype=tf.float32))
+                op = ed_fn(xv, *param)
+                sess = tf.Session()
+                sess.run(tf.initialize_all_variables())
+                sess.run(op)
+                start = time.time()
+                for _ in range(n_repeat):
+                    sess.run(op)
+
+                elapsed = (time.time() - start) / n_repeat
+                sess.close()
+
+            results += [{'shape': list(shape),
+                         'seconds': elapsed,
+                         'elements_per_sec': x[:n].size / elapsed}]
+
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--functions', default=None,
+                        help="comma-separated function names")
+    parser.add_argument('--no-throughput', dest='throughput',
+                        action='store_false')
+    parser.add_argument('--no-accuracy', dest='accuracy',
+                        action='store_false')
+    parser.add_argument('--output', default=None,
+                        help="file to write JSON results to")
+    args = parser.parse_args(argv)
+
+    if args.functions is not None:
+        names = args.functions.split(',')
+    else:
+        names = sorted(FUNCTIONS.keys())
+
+    np.random.seed(42)
+    results = {}
+    for name in names:
+        print(name, file=sys.stderr)
+        results[name] = {}
+        if args.accuracy:
+            results[name]['accuracy'] = accuracy(name)
+
+        if args.throughput:
+            results[name]['throughput'] = throughput(name)
+
+    out = json.dumps(results, indent=2, sort_keys=True)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(out)
+    else:
+        print(out)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,47 @@
 from __future__ import absolute_import
-from . import models
-from . import stats
-from . import criticisms
+import importlib
+import sys
+
 from . import data
-from . import inferences
 from . import util
 
 # Direct imports for convenience
-from .models import PyMC3Model, PythonModel, StanModel
-from .criticisms import evaluate, ppc
 from .data import Data
-from .inferences import Inference, MonteCarlo, VariationalInference, MFVI, KLpq, MAP, Laplace
-from .util import cumprod, digamma, dot, get_dims, get_session, hessian, kl_multivariate_normal, lbeta, lgamma, log_sum_exp, logit, multivariate_rbf, rbf, set_seed, softplus
+from .util import cumprod, digamma, dot, dtype_policy, get_dims, get_dtype, get_session, has_dtype_policy, hessian, kl_multivariate_normal, lbeta, lgamma, log_sum_exp, logit, multivariate_rbf, rbf, set_dtype, set_seed, softplus
+
+# The other submodules, and the names imported from them for
+# convenience, are imported on first access, so that importing edward
+# only loads what is used.
+_SUBMODULES = ['callbacks', 'criticisms', 'inferences', 'models', 'stats',
+               'traces']
+_ATTRIBUTES = {
+    'callbacks': ['Callback', 'MetricsLogger', 'ProgressPrinter'],
+    'criticisms': ['evaluate', 'ppc', 'ppc_pvalue'],
+    'inferences': ['Inference', 'MonteCarlo', 'VariationalInference', 'MFVI',
+                   'KLpq', 'IWAE', 'MAP', 'Laplace'],
+    'models': ['PyMC3Model', 'PythonModel', 'StanModel'],
+    'traces': ['Trace'],
+}
+_LAZY = dict((name, module) for module, names in _ATTRIBUTES.items()
+             for name in names)
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    elif name in _LAZY:
+        module = importlib.import_module('.' + _LAZY[name], __name__)
+        return getattr(module, name)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+
+def __dir__():
+    return sorted(list(globals().keys()) + _SUBMODULES + list(_LAZY.keys()))
+
+if sys.version_info < (3, 7):
+    # Module attributes cannot be lazy before Python 3.7.
+    for _name in _SUBMODULES:
+        globals()[_name] = importlib.import_module('.' + _name, __name__)
+
+    for _name, _module in _LAZY.items():
+        globals()[_name] = getattr(globals()[_module], _name)
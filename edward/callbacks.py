@@ -0,0 +1,241 @@
+from __future__ import print_function
+import csv
+import json
+import tensorflow as tf
+import threading
+import time
+
+from edward.util import get_session
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+class Callback:
+    """
+    Base class for callbacks, which are called by an inference
+    algorithm during training.
+
+    Subclasses override any of on_train_begin(), on_step_end(), and
+    on_train_end().
+    """
+    def on_train_begin(self, inference):
+        """Called at the end of initialize()."""
+        pass
+
+    def on_step_end(self, inference, t, loss):
+        """Called after each update, with iteration t and its loss."""
+        pass
+
+    def on_train_end(self, inference):
+        """Called at the end of run()."""
+        pass
+
+class ProgressPrinter(Callback):
+    """
+    Print the loss every n_print iterations.
+
+    Arguments
+    ----------
+    n_print : int, optional
+        Number of iterations between prints.
+    print_params : bool, optional
+        Whether to also print the variational model, which fetches all
+        its parameters.
+    """
+    def __init__(self, n_print=100, print_params=False):
+        self.n_print = n_print
+        self.print_params = print_params
+
+    def on_step_end(self, inference, t, loss):
+        if t % self.n_print == 0:
+            print("iter {:d} loss {:.2f}".format(t, loss))
+            if self.print_params:
+                print(inference.variational)
+
+class MetricsLogger(Callback):
+    """
+    Log training metrics to a JSONL or CSV file.
+
+    Each record holds the iteration, loss, mean wall time per step
+    and samples per second since the last record, and optionally
+    summaries (mean, standard deviation, minimum, maximum) of the
+    variational parameters. The summaries are computed in the graph,
+    so logging them fetches only four scalars per parameter.
+
+    Arguments
+    ----------
+    path : str
+        File to write to. The format is CSV if the path ends in
+        '.csv' and JSONL otherwise.
+    n_log : int, optional
+        Number of iterations between records.
+    params : bool or list, optional
+        Parameters to summarize: True for all, or a list of names of
+        the form '<layer index>/<attribute>', e.g., '0/loc'. Default
+        is none. Attributes which depend on a placeholder, such as
+        the minibatch's rows of an IndexedNormal or the output of an
+        inference network on fed data, are skipped, as no values
+        are fed when logging.
+    dump_params : bool, optional
+        Whether to also write the full parameter values. Only
+        available for JSONL.
+    async_write : bool, optional
+        Whether to write records from a background thread, so the
+        training loop does not wait on disk.
+
+    Notes
+    -----
+    The parameters of a layer are its attributes which are tensors,
+    such as loc and scale of Normal.
+    """
+    def __init__(self, path, n_log=100, params=None, dump_params=False,
+                 async_write=False):
+        self.path = path
+        self.n_log = n_log
+        self.params = params
+        self.dump_params = dump_params
+        self.async_write = async_write
+        self.is_csv = path.endswith('.csv')
+        if self.is_csv and dump_params:
+            raise ValueError("dump_params is only available for JSONL.")
+
+        self._file = None
+        self._writer = None
+        self._queue = None
+        self._thread = None
+
+    def on_train_begin(self, inference):
+        self._file = open(self.path, 'w')
+        self._summaries = []
+        self._values = []
+        for name, param in _layer_params(inference.variational,
+                                         self.params):
+            param = tf.cast(param, tf.float32)
+            mean = tf.reduce_mean(param)
+            std = tf.sqrt(tf.reduce_mean(tf.square(param - mean)))
+            self._summaries += [(name + '/mean', mean),
+                                (name + '/std', std),
+                                (name + '/min', tf.reduce_min(param)),
+                                (name + '/max', tf.reduce_max(param))]
+            if self.dump_params:
+                self._values += [(name, param)]
+
+        if self.async_write:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._consume)
+            self._thread.daemon = True
+            self._thread.start()
+
+        self._last_t = None
+        self._last_time = time.time()
+
+    def on_step_end(self, inference, t, loss):
+        if t % self.n_log != 0:
+            return
+
+        now = time.time()
+        if self._last_t is None or t <= self._last_t:
+            step_time = now - self._last_time
+        else:
+            step_time = (now - self._last_time) / (t - self._last_t)
+
+        record = {'iter': t, 'loss': float(loss), 'step_time': step_time}
+        n_minibatch = getattr(inference, 'n_minibatch', 1)
+        record['samples_per_sec'] = n_minibatch / max(step_time, 1e-12)
+        if self._summaries or self._values:
+            sess = get_session()
+            n_summaries = len(self._summaries)
+            names, tensors = zip(*(self._summaries + self._values))
+            values = sess.run(list(tensors))
+            for i, (name, value) in enumerate(zip(names, values)):
+                if i < n_summaries:
+                    record[name] = float(value)
+                else:
+                    record[name] = value.tolist()
+
+        if self.async_write:
+            self._queue.put(record)
+        else:
+            self._write(record)
+
+        # Exclude the time to log from the next step time.
+        self._last_t = t
+        self._last_time = time.time()
+
+    def on_train_end(self, inference):
+        self.close()
+
+    def close(self):
+        """Finish writing all records and close the file."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _consume(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+
+            self._write(record)
+
+    def _write(self, record):
+        if self.is_csv:
+            if self._writer is None:
+                fieldnames = ['iter', 'loss', 'step_time', 'samples_per_sec']
+                fieldnames += sorted(set(record.keys()) - set(fieldnames))
+                self._writer = csv.DictWriter(self._file, fieldnames)
+                self._writer.writeheader()
+
+            self._writer.writerow(record)
+        else:
+            self._file.write(json.dumps(record, sort_keys=True) + "\n")
+
+        self._file.flush()
+
+def _layer_params(variational, params):
+    """
+    Names and tensors of the parameters of each layer in the
+    variational model, selected by params.
+    """
+    if params is None or params is False:
+        return []
+
+    out = []
+    for i, layer in enumerate(variational.layers):
+        for attr in sorted(vars(layer).keys()):
+            value = getattr(layer, attr)
+            if not isinstance(value, (tf.Tensor, tf.Variable)):
+                continue
+
+            if isinstance(value, tf.Tensor) and _needs_feed(value):
+                continue
+
+            name = "{:d}/{:s}".format(i, attr)
+            if params is True or name in params:
+                out += [(name, value)]
+
+    return out
+
+def _needs_feed(tensor):
+    """Whether the tensor depends on a placeholder."""
+    seen = set()
+    ops = [tensor.op]
+    while ops:
+        op = ops.pop()
+        if op.type == 'Placeholder':
+            return True
+
+        for t in op.inputs:
+            if t.op.name not in seen:
+                seen.add(t.op.name)
+                ops += [t.op]
+
+    return False
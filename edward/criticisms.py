@@ -1,90 +1,331 @@
+import multiprocessing
 import numpy as np
 import tensorflow as tf
 
 from edward.data import Data
-from edward.util import logit, get_session
+from edward.util import get_dtype, lazy_import, logit, get_session
 
-def evaluate(metrics, model, variational, data):
+stats = lazy_import('scipy.stats')
+
+def evaluate(metrics, model, variational, data, n_minibatch=100,
+             n_chunk=None, n_data=None):
     """
     Evaluate fitted model using a set of metrics.
 
+    The posterior predictive is estimated in a streaming fashion. The
+    data is processed in chunks of n_data rows; for each chunk,
+    predictions are averaged over n_minibatch posterior samples
+    drawn n_chunk at a time. Only sufficient statistics of each
+    metric are kept across chunks, so memory is bounded by the chunk
+    sizes rather than by the size of the data set.
+
+    The predictive and metric ops are built once for each model,
+    variational model and set of metrics, and reused across calls.
+    All metrics for a chunk of data are computed in a single run.
+
     Parameters
     ----------
-    metric : list or str
+    metrics : list or str
         List of metrics or a single metric.
+    model : Model
+        class object with a 'predict' method
+    variational : Variational
+        latent variable distribution q(z) to sample from
+    data : Data
+        Held-out data, stored as a tf.Tensor or np.ndarray.
+    n_minibatch : int, optional
+        Number of posterior samples to average predictions over. It
+        is rounded up to a multiple of n_chunk.
+    n_chunk : int, optional
+        Number of posterior samples drawn at a time. Default is to
+        draw all n_minibatch samples at once.
+    n_data : int, optional
+        Number of data points evaluated at a time. Default is to use
+        all the data at once.
 
     Returns
     -------
     list or float
         A list of evaluations or a single evaluation.
+
+    Notes
+    -----
+    For 'log_lik', model.predict() must return the log predictive
+    density of each data point averaged over the given latent
+    variables, log (1/S sum_s p(y | x, z^s)). The chunks of
+    posterior samples are combined with log-sum-exp, and the
+    evaluation is the sum over all data points.
+
+    For 'accuracy' and 'crossentropy', the binary or sparse
+    categorical metric is used depending on whether the maximum of
+    y_true over all the data is at most 1.
     """
     sess = get_session()
-    # Monte Carlo estimate the mean of the posterior predictive:
-    # 1. Sample a batch of latent variables from posterior
-    xs = data.data
-    n_minibatch = 100
-    zs, samples = variational.sample(size=n_minibatch)
-    feed_dict = variational.np_dict(samples)
-    # 2. Make predictions, averaging over each sample of latent variables
-    y_pred, y_true = model.predict(xs, zs)
-
-    # Evaluate y_pred according to y_true for all metrics.
-    evaluations = []
     if isinstance(metrics, str):
         metrics = [metrics]
 
-    for metric in metrics:
+    xs = data.data
+    N = data.N
+    if n_data is None:
+        n_data = N
+
+    if n_chunk is None:
+        n_chunk = n_minibatch
+
+    n_chunk = min(n_chunk, n_minibatch)
+    n_chunks = int(np.ceil(float(n_minibatch) / n_chunk))
+
+    # 1. Build (or reuse) the posterior predictive for a chunk of data
+    # and a chunk of latent variables.
+    graph = _build_evaluate(model, variational, xs, n_chunk)
+    y_pred = graph['y_pred']
+    y_pred_log = graph['y_pred_log']
+    y_true = graph['y_true']
+
+    # 'accuracy' and 'crossentropy' are evaluated with both their
+    # binary and sparse categorical metric, and the one matching the
+    # maximum of y_true is picked after the pass over the data.
+    variants = [_metric_variants(graph, metric) for metric in metrics]
+    all_metrics = [variant for names in variants for variant in names]
+    metric_ops, sums = _build_metrics(graph, all_metrics)
+    any_log_lik = any([_is_log_lik(metric) for metric in metrics])
+    fetches = metric_ops + [graph['y_true_max']]
+
+    # 2. Accumulate sufficient statistics of each metric over chunks
+    # of data.
+    totals = np.zeros(len(all_metrics))
+    counts = np.zeros(len(all_metrics))
+    support = -np.inf
+    for n, data_dict in _data_chunks(graph, xs, N, n_data):
+        if n_chunks == 1:
+            # Predictions and all metrics in a single run.
+            feed_dict = variational.np_dict(graph['samples'])
+            feed_dict.update(data_dict)
+            evaluations = sess.run(fetches, feed_dict)
+        else:
+            # Average predictions over chunks of latent variables,
+            # both on the natural scale and on the log scale, then
+            # evaluate all metrics in a single run.
+            y_pred_mean = 0.0
+            y_pred_lse = -np.inf
+            for _ in range(n_chunks):
+                feed_dict = variational.np_dict(graph['samples'])
+                feed_dict.update(data_dict)
+                y_pred_b, y_true_b = sess.run([y_pred, y_true], feed_dict)
+                y_pred_mean += y_pred_b / float(n_chunks)
+                if any_log_lik:
+                    y_pred_lse = np.logaddexp(y_pred_lse, y_pred_b)
+
+            feed_dict = {y_true: y_true_b, y_pred: y_pred_mean}
+            if any_log_lik:
+                feed_dict[y_pred_log] = y_pred_lse - np.log(n_chunks)
+
+            evaluations = sess.run(fetches, feed_dict)
+
+        support = max(support, evaluations.pop())
+        for i, evaluation in enumerate(evaluations):
+            if sums[i]:
+                totals[i] += evaluation
+            else:
+                # Means over data points are weighted by chunk size.
+                totals[i] += evaluation * n
+                counts[i] += n
+
+    totals = dict(zip(all_metrics, totals))
+    counts = dict(zip(all_metrics, counts))
+    evaluations = []
+    for metric, names in zip(metrics, variants):
         if metric == 'accuracy' or metric == 'crossentropy':
-            # automate binary or sparse cat depending on max(y_true)
-            support = tf.reduce_max(y_true).eval()
             if support <= 1:
-                metric = 'binary_' + metric
+                name = 'binary_' + metric
             else:
-                metric = 'sparse_categorical_' + metric
-
-        if metric == 'binary_accuracy':
-            evaluations += [sess.run(binary_accuracy(y_true, y_pred), feed_dict)]
-        elif metric == 'categorical_accuracy':
-            evaluations += [sess.run(categorical_accuracy(y_true, y_pred), feed_dict)]
-        elif metric == 'sparse_categorical_accuracy':
-            evaluations += [sess.run(sparse_categorical_accuracy(y_true, y_pred), feed_dict)]
-        elif metric == 'log_loss' or metric == 'binary_crossentropy':
-            evaluations += [sess.run(binary_crossentropy(y_true, y_pred), feed_dict)]
-        elif metric == 'categorical_crossentropy':
-            evaluations += [sess.run(categorical_crossentropy(y_true, y_pred), feed_dict)]
-        elif metric == 'sparse_categorical_crossentropy':
-            evaluations += [sess.run(sparse_categorical_crossentropy(y_true, y_pred), feed_dict)]
-        elif metric == 'hinge':
-            evaluations += [sess.run(hinge(y_true, y_pred), feed_dict)]
-        elif metric == 'squared_hinge':
-            evaluations += [sess.run(squared_hinge(y_true, y_pred), feed_dict)]
-        elif metric == 'mse' or metric == 'MSE' or \
-             metric == 'mean_squared_error':
-            evaluations += [sess.run(mean_squared_error(y_true, y_pred), feed_dict)]
-        elif metric == 'mae' or metric == 'MAE' or \
-             metric == 'mean_absolute_error':
-            evaluations += [sess.run(mean_absolute_error(y_true, y_pred), feed_dict)]
-        elif metric == 'mape' or metric == 'MAPE' or \
-             metric == 'mean_absolute_percentage_error':
-            evaluations += [sess.run(mean_absolute_percentage_error(y_true, y_pred), feed_dict)]
-        elif metric == 'msle' or metric == 'MSLE' or \
-             metric == 'mean_squared_logarithmic_error':
-            evaluations += [sess.run(mean_squared_logarithmic_error(y_true, y_pred), feed_dict)]
-        elif metric == 'poisson':
-            evaluations += [sess.run(poisson(y_true, y_pred), feed_dict)]
-        elif metric == 'cosine' or metric == 'cosine_proximity':
-            evaluations += [sess.run(cosine_proximity(y_true, y_pred), feed_dict)]
-        elif metric == 'log_lik' or metric == 'log_likelihood':
-            evaluations += [sess.run(y_pred, feed_dict)]
+                name = 'sparse_categorical_' + metric
+
+            if name not in names:
+                raise ValueError("The shapes of y_true and y_pred do not "
+                                 "match {:s} for the support of "
+                                 "y_true.".format(name))
         else:
-            raise NotImplementedError()
+            name = metric
+
+        evaluations += [(totals[name], counts[name])]
 
+    evaluations = [total / count if count > 0 else total
+                   for total, count in evaluations]
     if len(evaluations) == 1:
         return evaluations[0]
     else:
         return evaluations
 
-def ppc(model, variational=None, data=Data(), T=None, size=100):
+def _data_chunks(graph, xs, N, n_data):
+    """
+    Generate the number of data points in each chunk of n_data rows,
+    and the dictionary feeding the chunk into the graph of evaluate().
+    """
+    for start in range(0, N, n_data):
+        stop = min(start + n_data, N)
+        if isinstance(xs, tf.Tensor):
+            yield stop - start, {graph['idx']: np.arange(start, stop)}
+        else:
+            yield stop - start, {graph['x_chunk']: xs[start:stop]}
+
+def _cache(obj):
+    """
+    Dictionary of the ops built for obj by the criticisms. It is
+    stored on obj, so the ops and anything they reference are
+    released along with it.
+    """
+    if not hasattr(obj, '_criticism_graphs'):
+        obj._criticism_graphs = {}
+
+    return obj._criticism_graphs
+
+def _build_evaluate(model, variational, xs, n_chunk):
+    """
+    Build the posterior predictive used by evaluate(), caching it so
+    that repeated calls, e.g., during training, reuse the same ops.
+
+    The cache is stored on the variational model, and keyed by the
+    graph, model, number of layers, number of latent variable samples
+    per chunk, and the data.
+    """
+    if isinstance(xs, tf.Tensor):
+        data_key = xs
+    elif isinstance(xs, np.ndarray):
+        data_key = xs.shape[1:]
+    else:
+        raise NotImplementedError()
+
+    cache = _cache(variational)
+    key = ('evaluate', tf.get_default_graph(), id(model),
+           len(variational.layers), n_chunk, data_key)
+    if key in cache:
+        return cache[key]
+
+    graph = {}
+    if isinstance(xs, tf.Tensor):
+        graph['idx'] = tf.placeholder(tf.int32, [None])
+        x_chunk = tf.gather(xs, graph['idx'])
+    else:
+        x_chunk = tf.placeholder(get_dtype(), (None, ) + xs.shape[1:])
+
+    # Local latent variables are those of the chunk of data.
+    variational.build(x_chunk)
+    zs, samples = variational.sample(size=n_chunk)
+    y_pred, y_true = model.predict(x_chunk, zs)
+    graph['x_chunk'] = x_chunk
+    graph['samples'] = samples
+    graph['y_pred'] = y_pred
+    # Log-scale predictions are fed separately when combining chunks
+    # of latent variables.
+    graph['y_pred_log'] = tf.identity(y_pred)
+    graph['y_true'] = y_true
+    graph['y_true_max'] = tf.reduce_max(y_true)
+    graph['metrics'] = {}
+    # Hold a reference so the id in the key is not reused.
+    graph['model'] = model
+    cache[key] = graph
+    return graph
+
+def _build_metrics(graph, metrics):
+    """
+    Build (or reuse) the metric ops on the posterior predictive of
+    graph, returning them and whether each metric is a sum over data
+    points.
+    """
+    key = tuple(metrics)
+    if key not in graph['metrics']:
+        metric_ops = []
+        sums = []
+        for metric in metrics:
+            if _is_log_lik(metric):
+                op, is_sum = _metric_op(metric, graph['y_true'],
+                                        graph['y_pred_log'])
+            else:
+                op, is_sum = _metric_op(metric, graph['y_true'],
+                                        graph['y_pred'])
+
+            metric_ops += [op]
+            sums += [is_sum]
+
+        graph['metrics'][key] = (metric_ops, sums)
+
+    return graph['metrics'][key]
+
+def _metric_variants(graph, metric):
+    """
+    Names of the metrics to evaluate for metric: both the binary and
+    the sparse categorical metric for 'accuracy' and 'crossentropy',
+    leaving out any whose shapes do not match y_true and y_pred.
+    """
+    if metric != 'accuracy' and metric != 'crossentropy':
+        return [metric]
+
+    # Binary predictions have the shape of y_true, and sparse
+    # categorical predictions an additional dimension.
+    rank_true = graph['y_true'].get_shape().ndims
+    rank_pred = graph['y_pred'].get_shape().ndims
+    variants = []
+    if rank_true is None or rank_pred is None or rank_pred == rank_true:
+        variants += ['binary_' + metric]
+    if rank_true is None or rank_pred is None or \
+       rank_pred == rank_true + 1:
+        variants += ['sparse_categorical_' + metric]
+
+    return variants
+
+def _is_log_lik(metric):
+    return metric == 'log_lik' or metric == 'log_likelihood'
+
+def _metric_op(metric, y_true, y_pred):
+    """
+    Build the tensor for a metric.
+
+    Returns
+    -------
+    tuple
+        The metric tensor, and a bool which is True if the metric is
+        a sum over data points and False if it is a mean.
+    """
+    if metric == 'binary_accuracy':
+        return binary_accuracy(y_true, y_pred), False
+    elif metric == 'categorical_accuracy':
+        return categorical_accuracy(y_true, y_pred), False
+    elif metric == 'sparse_categorical_accuracy':
+        return sparse_categorical_accuracy(y_true, y_pred), False
+    elif metric == 'log_loss' or metric == 'binary_crossentropy':
+        return binary_crossentropy(y_true, y_pred), False
+    elif metric == 'categorical_crossentropy':
+        return categorical_crossentropy(y_true, y_pred), False
+    elif metric == 'sparse_categorical_crossentropy':
+        return sparse_categorical_crossentropy(y_true, y_pred), False
+    elif metric == 'hinge':
+        return hinge(y_true, y_pred), False
+    elif metric == 'squared_hinge':
+        return squared_hinge(y_true, y_pred), False
+    elif metric == 'mse' or metric == 'MSE' or \
+         metric == 'mean_squared_error':
+        return mean_squared_error(y_true, y_pred), False
+    elif metric == 'mae' or metric == 'MAE' or \
+         metric == 'mean_absolute_error':
+        return mean_absolute_error(y_true, y_pred), False
+    elif metric == 'mape' or metric == 'MAPE' or \
+         metric == 'mean_absolute_percentage_error':
+        return mean_absolute_percentage_error(y_true, y_pred), False
+    elif metric == 'msle' or metric == 'MSLE' or \
+         metric == 'mean_squared_logarithmic_error':
+        return mean_squared_logarithmic_error(y_true, y_pred), False
+    elif metric == 'poisson':
+        return poisson(y_true, y_pred), True
+    elif metric == 'cosine' or metric == 'cosine_proximity':
+        return cosine_proximity(y_true, y_pred), True
+    elif _is_log_lik(metric):
+        return tf.reduce_sum(y_pred), True
+    else:
+        raise NotImplementedError()
+
+def ppc(model, variational=None, data=Data(), T=None, size=100,
+        n_chunk=None, n_jobs=None, seed=None):
     """
     Posterior predictive check.
     (Rubin, 1984; Meng, 1994; Gelman, Meng, and Stern, 1996)
@@ -116,6 +357,26 @@ def ppc(model, variational=None, data=Data(), T=None, size=100):
         y and optionally a set of latent variables z as input.
     size : int, optional
         number of replicated data sets
+    n_chunk : int, optional
+        If specified, use the batched path: replicated data sets are
+        generated and evaluated n_chunk at a time, and T is applied
+        once per chunk. T must then be vectorized over a leading
+        replicate axis, taking a n_chunk x dim(y) tensor of data sets
+        and a n_chunk x dim(z) tensor of latent variables, and
+        returning a tensor whose first dimension is n_chunk. T can
+        also be a list of such functions.
+    n_jobs : int, optional
+        Number of worker processes generating replicated data sets
+        in the batched path. Default is to generate them in this
+        process.
+    seed : int, optional
+        Seed from which an independent random stream is derived for
+        each chunk of replicated data sets. Given the latent
+        variables, the replicates are then reproducible and do not
+        depend on n_jobs. It only seeds the draws from the
+        likelihood: the latent variables are drawn by TensorFlow,
+        whose seed is set with ed.set_seed(). NumPy's global random
+        state is left unchanged.
 
     Returns
     -------
@@ -126,14 +387,40 @@ def ppc(model, variational=None, data=Data(), T=None, size=100):
         and the realized discrepancy, which is a NumPy vector of size
         elements,
         (T(y, z^{1}), ..., T(y, z^{size})).
+        In the batched path with a list of discrepancy functions, a
+        list of these is returned, one per function.
     """
     sess = get_session()
     y = data.data
-    if y == None:
+    if y is None:
         N = 1
     else:
         N = data.N
 
+    if n_chunk is not None:
+        Ts = T if isinstance(T, list) else [T]
+        Ts = [_identity if T is None else T for T in Ts]
+        Tyreps = [[] for T in Ts]
+        Tys = [[] for T in Ts]
+        for Tyreps_b, Tys_b in _ppc_chunks(model, variational, data, Ts,
+                                           size, n_chunk, n_jobs, seed):
+            for i in range(len(Ts)):
+                Tyreps[i] += [Tyreps_b[i]]
+                if y is not None:
+                    Tys[i] += [Tys_b[i]]
+
+        out = []
+        for i in range(len(Ts)):
+            if y is None:
+                out += [np.concatenate(Tyreps[i])]
+            else:
+                out += [[np.concatenate(Tyreps[i]), np.concatenate(Tys[i])]]
+
+        if isinstance(T, list):
+            return out
+        else:
+            return out[0]
+
     if T == None:
         T = lambda y, z=None: y
 
@@ -141,6 +428,7 @@ def ppc(model, variational=None, data=Data(), T=None, size=100):
     # We must fetch zs out of the session because sample_likelihood()
     # may require a SciPy-based sampler.
     if variational is not None:
+        _build_local(variational, data)
         zs, samples = variational.sample(size=size)
         feed_dict = variational.np_dict(samples)
         zs = sess.run(zs, feed_dict)
@@ -163,6 +451,269 @@ def ppc(model, variational=None, data=Data(), T=None, size=100):
     else:
         return sess.run([tf.pack(Tyreps), tf.pack(Tys)], feed_dict)
 
+def ppc_pvalue(model, variational=None, data=Data(), T=None, size=100,
+               n_chunk=100, n_jobs=None, seed=None):
+    """
+    Tail-area probability of a posterior predictive check,
+    Pr(T(yrep, z) >= T(y, z) | y),
+    estimated from size replicated data sets.
+    (Meng, 1994; Gelman, Meng, and Stern, 1996)
+
+    Replicated data sets are generated and evaluated n_chunk at a
+    time, and only the number of exceedances is kept, so memory is
+    bounded by the chunk size.
+
+    Parameters
+    ----------
+    model : Model
+        class object with a 'sample_likelihood' method
+    variational : Variational, optional
+        latent variable distribution q(z) to sample from. If not
+        specified, samples will be obtained from model with a
+        'sample_prior' method.
+    data : Data
+        Observed data to compare to.
+    T : function or list, optional
+        Discrepancy function written in TensorFlow, or a list of
+        them. Default is identity. It is vectorized over a leading replicate axis, taking
+        a n_chunk x dim(y) tensor of data sets and a n_chunk x dim(z)
+        tensor of latent variables, and returning a tensor whose
+        first dimension is n_chunk.
+    size : int, optional
+        number of replicated data sets
+    n_chunk : int, optional
+        number of replicated data sets generated at a time
+    n_jobs : int, optional
+        Number of worker processes generating replicated data sets.
+        Default is to generate them in this process.
+    seed : int, optional
+        Seed from which an independent random stream is derived for
+        each chunk of replicated data sets. As in ppc(), it only
+        seeds the draws from the likelihood.
+
+    Returns
+    -------
+    float, np.ndarray, or list
+        The tail-area probability, of the same shape as each
+        replicate's discrepancy; or a list of them if T is a list.
+
+    Notes
+    -----
+    The discrepancy ops are cached and reused across calls with the
+    same discrepancy functions, so define them once rather than as
+    new lambdas on each call.
+    """
+    if data.data is None:
+        raise ValueError("Tail-area probabilities require observed data.")
+
+    Ts = T if isinstance(T, list) else [T]
+    Ts = [_identity if T is None else T for T in Ts]
+    counts = [0.0] * len(Ts)
+    for Tyreps_b, Tys_b in _ppc_chunks(model, variational, data, Ts,
+                                       size, n_chunk, n_jobs, seed):
+        for i in range(len(Ts)):
+            counts[i] = counts[i] + np.sum(Tyreps_b[i] >= Tys_b[i], 0)
+
+    pvalues = [count / float(size) for count in counts]
+    if isinstance(T, list):
+        return pvalues
+    else:
+        return pvalues[0]
+
+def _identity(y, z=None):
+    return y
+
+def _ppc_chunks(model, variational, data, Ts, size, n_chunk,
+                n_jobs=None, seed=None):
+    """
+    Generate the discrepancies of chunks of replicated data sets.
+
+    If n_jobs > 1, replicated data sets are generated with
+    model.sample_likelihood() in a pool of worker processes, n_jobs
+    chunks at a time. Each chunk is seeded with its own random
+    stream, drawn in order from seed (or from NumPy's global random
+    state), so the replicates do not depend on which worker generated
+    them.
+
+    Yields
+    ------
+    tuple
+        A list of the reference discrepancies and a list of the
+        realized discrepancies (empty if there is no data), with one
+        NumPy array per discrepancy function. Each array has at most
+        n_chunk elements along its first dimension.
+
+    Notes
+    -----
+    Workers are forked, inheriting the model rather than pickling
+    it, so this is not available on platforms without fork().
+    """
+    global _PPC_MODEL
+    sess = get_session()
+    y = data.data
+    if y is None:
+        N = 1
+    else:
+        N = data.N
+
+    if seed is not None:
+        rng = np.random.RandomState(seed)
+    else:
+        rng = np.random
+
+    if n_jobs is not None and n_jobs > 1:
+        _PPC_MODEL = model
+        if hasattr(multiprocessing, 'get_context'):
+            pool = multiprocessing.get_context('fork').Pool(n_jobs)
+        else:
+            pool = multiprocessing.Pool(n_jobs)
+        n_round = n_jobs
+    else:
+        pool = None
+        n_round = 1
+
+    zs, samples = _build_ppc_sample(model, variational, n_chunk, data)
+    starts = list(range(0, size, n_chunk))
+    try:
+        for i in range(0, len(starts), n_round):
+            # 1. Sample from posterior (or prior).
+            # We must fetch zs out of the session because
+            # sample_likelihood() may require a SciPy-based sampler.
+            tasks = []
+            for start in starts[i:(i + n_round)]:
+                n = min(n_chunk, size - start)
+                if variational is not None:
+                    feed_dict = variational.np_dict(samples)
+                else:
+                    feed_dict = {}
+
+                zs_b = sess.run(zs, feed_dict)[:n]
+                if pool is not None or seed is not None:
+                    chunk_seed = rng.randint(2**31 - 1)
+                else:
+                    chunk_seed = None
+
+                tasks += [(zs_b, N, chunk_seed)]
+
+            # 2. Sample from likelihood.
+            if pool is not None:
+                yreps = pool.map(_sample_likelihood_chunk, tasks)
+            else:
+                yreps = [_sample_likelihood(model, *task) for task in tasks]
+
+            # 3. Calculate discrepancy, once for each chunk.
+            for (zs_b, _, _), yreps_b in zip(tasks, yreps):
+                graph = _build_ppc_discrepancy(model, Ts, y,
+                                               yreps_b.shape[1:],
+                                               zs_b.shape[1:])
+                out = sess.run(graph['Tyreps'] + graph['Tys'],
+                               {graph['yreps']: yreps_b,
+                                graph['zs']: zs_b})
+                yield out[:len(Ts)], out[len(Ts):]
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+            _PPC_MODEL = None
+
+_PPC_MODEL = None
+
+def _sample_likelihood(model, zs, N, seed=None):
+    if seed is None:
+        return model.sample_likelihood(zs, size=N)
+
+    # sample_likelihood() draws from NumPy's global random state, so
+    # seed it for this chunk and restore the caller's state after.
+    state = np.random.get_state()
+    np.random.seed(seed)
+    try:
+        return model.sample_likelihood(zs, size=N)
+    finally:
+        np.random.set_state(state)
+
+def _sample_likelihood_chunk(task):
+    """Worker function; the model is inherited from the parent."""
+    return _sample_likelihood(_PPC_MODEL, *task)
+
+def _build_ppc_sample(model, variational, n_chunk, data=None):
+    """
+    Build (or reuse) the op drawing a chunk of latent variables,
+    cached on the variational model, or on the model for the prior.
+    Local latent variables are those of the data.
+    """
+    if variational is not None:
+        cache = _cache(variational)
+        if data is not None and _is_local(variational):
+            data_key = id(data.data)
+        else:
+            data_key = None
+
+        key = ('ppc_sample', tf.get_default_graph(),
+               len(variational.layers), n_chunk, data_key)
+    else:
+        cache = _cache(model)
+        key = ('ppc_prior', tf.get_default_graph(), n_chunk)
+
+    if key not in cache:
+        if variational is not None:
+            _build_local(variational, data)
+            zs, samples = variational.sample(size=n_chunk)
+        else:
+            zs, samples = model.sample_prior(size=n_chunk), []
+
+        # Hold a reference to the data so the id in the key is not
+        # reused.
+        cache[key] = (zs, samples, data)
+
+    return cache[key][:2]
+
+def _is_local(variational):
+    return any([layer.is_local for layer in variational.layers])
+
+def _build_local(variational, data):
+    """
+    Build the local layers of the variational model on all of data,
+    so that their latent variables are those of the data rather than
+    of the last minibatch built.
+    """
+    if not _is_local(variational):
+        return
+
+    if data is None or data.data is None:
+        raise ValueError("The variational model has local latent "
+                         "variables, which require data.")
+
+    variational.build(data.sample(None))
+
+def _build_ppc_discrepancy(model, Ts, y, yrep_shape, z_shape):
+    """
+    Build (or reuse) the discrepancy ops for a chunk of replicated
+    data sets, cached on the model. The observed data is tiled along
+    the replicate axis.
+    """
+    cache = _cache(model)
+    key = ('ppc_discrepancy', tf.get_default_graph(), tuple(Ts), id(y),
+           tuple(yrep_shape), tuple(z_shape))
+    if key in cache:
+        return cache[key]
+
+    yreps = tf.placeholder(get_dtype(), (None, ) + tuple(yrep_shape))
+    zs = tf.placeholder(get_dtype(), (None, ) + tuple(z_shape))
+    # Hold a reference to y so the id in the key is not reused.
+    graph = {'yreps': yreps, 'zs': zs, 'y': y}
+    graph['Tyreps'] = [T(yreps, zs) for T in Ts]
+    if y is None:
+        graph['Tys'] = []
+    else:
+        y = tf.cast(tf.convert_to_tensor(y), dtype=get_dtype())
+        multiples = tf.pack([tf.shape(zs)[0]] + \
+                            [1] * len(y.get_shape()))
+        ys = tf.tile(tf.expand_dims(y, 0), multiples)
+        graph['Tys'] = [T(ys, zs) for T in Ts]
+
+    cache[key] = graph
+    return graph
+
 # Classification metrics
 
 def binary_accuracy(y_true, y_pred):
@@ -176,9 +727,9 @@ def binary_accuracy(y_true, y_pred):
     y_pred : tf.Tensor
         Tensor of probabilities.
     """
-    y_true = tf.cast(y_true, tf.float32)
-    y_pred = tf.cast(tf.round(y_pred), tf.float32)
-    return tf.reduce_mean(tf.cast(tf.equal(y_true, y_pred), tf.float32))
+    y_true = tf.cast(y_true, get_dtype())
+    y_pred = tf.cast(tf.round(y_pred), get_dtype())
+    return tf.reduce_mean(tf.cast(tf.equal(y_true, y_pred), get_dtype()))
 
 def categorical_accuracy(y_true, y_pred):
     """
@@ -195,9 +746,9 @@ def categorical_accuracy(y_true, y_pred):
         The outermost dimension denote the categorical probabilities for
         that data point per row.
     """
-    y_true = tf.cast(tf.argmax(y_true, len(y_true.get_shape()) - 1), tf.float32)
-    y_pred = tf.cast(tf.argmax(y_pred, len(y_pred.get_shape()) - 1), tf.float32)
-    return tf.reduce_mean(tf.cast(tf.equal(y_true, y_pred), tf.float32))
+    y_true = tf.cast(tf.argmax(y_true, len(y_true.get_shape()) - 1), get_dtype())
+    y_pred = tf.cast(tf.argmax(y_pred, len(y_pred.get_shape()) - 1), get_dtype())
+    return tf.reduce_mean(tf.cast(tf.equal(y_true, y_pred), get_dtype()))
 
 def sparse_categorical_accuracy(y_true, y_pred):
     """
@@ -213,9 +764,9 @@ def sparse_categorical_accuracy(y_true, y_pred):
         The outermost dimension are the categorical probabilities for
         that data point.
     """
-    y_true = tf.cast(y_true, tf.float32)
-    y_pred = tf.cast(tf.argmax(y_pred, len(y_pred.get_shape()) - 1), tf.float32)
-    return tf.reduce_mean(tf.cast(tf.equal(y_true, y_pred), tf.float32))
+    y_true = tf.cast(y_true, get_dtype())
+    y_pred = tf.cast(tf.argmax(y_pred, len(y_pred.get_shape()) - 1), get_dtype())
+    return tf.reduce_mean(tf.cast(tf.equal(y_true, y_pred), get_dtype()))
 
 def binary_crossentropy(y_true, y_pred):
     """
@@ -226,8 +777,8 @@ def binary_crossentropy(y_true, y_pred):
     y_pred : tf.Tensor
         Tensor of probabilities.
     """
-    y_true = tf.cast(y_true, tf.float32)
-    y_pred = logit(tf.cast(y_pred, tf.float32))
+    y_true = tf.cast(y_true, get_dtype())
+    y_pred = logit(tf.cast(y_pred, get_dtype()))
     return tf.reduce_mean(tf.nn.sigmoid_cross_entropy_with_logits(y_pred, y_true))
 
 def categorical_crossentropy(y_true, y_pred):
@@ -244,8 +795,8 @@ def categorical_crossentropy(y_true, y_pred):
         The outermost dimension denote the categorical probabilities for
         that data point per row.
     """
-    y_true = tf.cast(y_true, tf.float32)
-    y_pred = logit(tf.cast(y_pred, tf.float32))
+    y_true = tf.cast(y_true, get_dtype())
+    y_pred = logit(tf.cast(y_pred, get_dtype()))
     return tf.reduce_mean(tf.nn.softmax_cross_entropy_with_logits(y_pred, y_true))
 
 def sparse_categorical_crossentropy(y_true, y_pred):
@@ -263,7 +814,7 @@ def sparse_categorical_crossentropy(y_true, y_pred):
         that data point.
     """
     y_true = tf.cast(y_true, tf.int64)
-    y_pred = logit(tf.cast(y_pred, tf.float32))
+    y_pred = logit(tf.cast(y_pred, get_dtype()))
     return tf.reduce_mean(tf.nn.sparse_softmax_cross_entropy_with_logits(y_pred, y_true))
 
 def hinge(y_true, y_pred):
@@ -275,8 +826,8 @@ def hinge(y_true, y_pred):
     y_pred : tf.Tensor
         Tensor of real value.
     """
-    y_true = tf.cast(y_true, tf.float32)
-    y_pred = tf.cast(y_pred, tf.float32)
+    y_true = tf.cast(y_true, get_dtype())
+    y_pred = tf.cast(y_pred, get_dtype())
     return tf.reduce_mean(tf.maximum(1.0 - y_true * y_pred, 0.0))
 
 def squared_hinge(y_true, y_pred):
@@ -288,8 +839,8 @@ def squared_hinge(y_true, y_pred):
     y_pred : tf.Tensor
         Tensor of real value.
     """
-    y_true = tf.cast(y_true, tf.float32)
-    y_pred = tf.cast(y_pred, tf.float32)
+    y_true = tf.cast(y_true, get_dtype())
+    y_pred = tf.cast(y_pred, get_dtype())
     return tf.reduce_mean(tf.square(tf.maximum(1.0 - y_true * y_pred, 0.0)))
 
 # Regression metrics
@@ -363,3 +914,451 @@ def cosine_proximity(y_true, y_pred):
     y_true = tf.nn.l2_normalize(y_true, len(y_true.get_shape()) - 1)
     y_pred = tf.nn.l2_normalize(y_pred, len(y_pred.get_shape()) - 1)
     return tf.reduce_sum(y_true * y_pred)
+
+# Convergence diagnostics
+
+def autocorrelation(x, n_block=1000):
+    """
+    Autocorrelation of each chain and parameter as a function of lag,
+    computed with the fast Fourier transform.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        n_chains x n_draws x n_params array of samples, or n_chains x
+        n_draws for a single parameter. It can be a memory-mapped
+        array.
+    n_block : int, optional
+        Number of parameters read from x at a time.
+
+    Returns
+    -------
+    np.ndarray
+        Array of the same shape as x, where element [c, t, p] is the
+        autocorrelation at lag t of parameter p in chain c.
+    """
+    x, squeeze = _as_trace(x)
+    out = np.empty(x.shape)
+    for start in range(0, x.shape[2], n_block):
+        stop = min(start + n_block, x.shape[2])
+        acov = _autocovariance(np.asarray(x[:, :, start:stop],
+                                          dtype=np.float64))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, :, start:stop] = acov / acov[:, :1, :]
+
+    if squeeze:
+        return out[:, :, 0]
+    else:
+        return out
+
+def effective_sample_size(x, method='bulk', n_block=1000):
+    """
+    Effective sample size of each parameter.
+    (Geyer, 1992; Vehtari et al., 2019)
+
+    Parameters
+    ----------
+    x : np.ndarray
+        n_chains x n_draws x n_params array of samples, or n_chains x
+        n_draws for a single parameter. It can be a memory-mapped
+        array.
+    method : str, optional
+        'bulk' for the effective sample size of the rank-normalized
+        split chains; 'tail' for the minimum effective sample size of
+        the 5% and 95% quantiles; 'split' for the effective sample
+        size of the split chains without rank normalization.
+    n_block : int, optional
+        Number of parameters read from x at a time.
+
+    Returns
+    -------
+    np.ndarray or float
+        n_params vector of effective sample sizes; a scalar for a
+        single parameter.
+    """
+    x, squeeze = _as_trace(x)
+    out = np.empty(x.shape[2])
+    for start in range(0, x.shape[2], n_block):
+        stop = min(start + n_block, x.shape[2])
+        xb = _split_chains(np.asarray(x[:, :, start:stop],
+                                      dtype=np.float64))
+        if method == 'bulk':
+            out[start:stop] = _ess(_rank_normalize(xb))
+        elif method == 'tail':
+            q05, q95 = np.percentile(xb.reshape((-1, xb.shape[2])),
+                                     [5, 95], axis=0)
+            ess05 = _ess((xb <= q05).astype(np.float64))
+            ess95 = _ess((xb <= q95).astype(np.float64))
+            out[start:stop] = np.minimum(ess05, ess95)
+        elif method == 'split':
+            out[start:stop] = _ess(xb)
+        else:
+            raise NotImplementedError()
+
+    if squeeze:
+        return out[0]
+    else:
+        return out
+
+def rhat(x, method='rank', n_block=1000):
+    """
+    Potential scale reduction factor of each parameter.
+    (Gelman and Rubin, 1992; Vehtari et al., 2019)
+
+    Parameters
+    ----------
+    x : np.ndarray
+        n_chains x n_draws x n_params array of samples, or n_chains x
+        n_draws for a single parameter. It can be a memory-mapped
+        array.
+    method : str, optional
+        'rank' for the maximum of the rank-normalized split-R-hat of
+        the bulk and of the tails; 'split' for split-R-hat without
+        rank normalization.
+    n_block : int, optional
+        Number of parameters read from x at a time.
+
+    Returns
+    -------
+    np.ndarray or float
+        n_params vector of R-hat values; a scalar for a single
+        parameter.
+    """
+    x, squeeze = _as_trace(x)
+    out = np.empty(x.shape[2])
+    for start in range(0, x.shape[2], n_block):
+        stop = min(start + n_block, x.shape[2])
+        xb = _split_chains(np.asarray(x[:, :, start:stop],
+                                      dtype=np.float64))
+        if method == 'rank':
+            # Fold around the median to diagnose the tails.
+            folded = np.abs(xb - np.median(xb.reshape((-1, xb.shape[2])),
+                                           axis=0))
+            out[start:stop] = np.maximum(_rhat(_rank_normalize(xb)),
+                                         _rhat(_rank_normalize(folded)))
+        elif method == 'split':
+            out[start:stop] = _rhat(xb)
+        else:
+            raise NotImplementedError()
+
+    if squeeze:
+        return out[0]
+    else:
+        return out
+
+def _as_trace(x):
+    """View x as n_chains x n_draws x n_params, without copying."""
+    if len(x.shape) == 2:
+        return x[:, :, np.newaxis], True
+    elif len(x.shape) == 3:
+        return x, False
+    else:
+        raise ValueError("Samples must have shape (n_chains, n_draws) "
+                         "or (n_chains, n_draws, n_params).")
+
+def _split_chains(x):
+    """Split each chain in half, dropping the middle draw if odd."""
+    n_draws = x.shape[1] // 2
+    return np.concatenate((x[:, :n_draws], x[:, -n_draws:]), 0)
+
+def _rank_normalize(x):
+    """
+    Replace draws by the normal quantiles of their ranks, pooling
+    all chains of each parameter.
+    """
+    n_chains, n_draws, n_params = x.shape
+    flat = x.reshape((n_chains * n_draws, n_params))
+    # Tied draws, e.g., of discrete or clipped parameters, share the
+    # average of their ranks, so the result does not depend on their
+    # order.
+    ranks = np.empty(flat.shape)
+    for j in range(n_params):
+        ranks[:, j] = stats.rankdata(flat[:, j], method='average')
+
+    n_samples = flat.shape[0]
+    z = stats.norm.ppf((ranks - 0.375) / (n_samples + 0.25))
+    return z.reshape(x.shape)
+
+def _autocovariance(x):
+    """
+    Autocovariance along the draws of a n_chains x n_draws x n_params
+    array, with zero-padding to avoid circular correlation.
+    """
+    n_draws = x.shape[1]
+    n_fft = 2**int(np.ceil(np.log2(2 * n_draws)))
+    x = x - np.mean(x, 1, keepdims=True)
+    f = np.fft.rfft(x, n=n_fft, axis=1)
+    acov = np.fft.irfft(f * np.conjugate(f), n=n_fft, axis=1)[:, :n_draws]
+    return acov.real / n_draws
+
+def _rhat(x):
+    n_draws = x.shape[1]
+    chain_mean = np.mean(x, 1)
+    chain_var = np.var(x, 1, ddof=1)
+    B = n_draws * np.var(chain_mean, 0, ddof=1)
+    W = np.mean(chain_var, 0)
+    var_plus = (n_draws - 1.0) / n_draws * W + B / n_draws
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sqrt(var_plus / W)
+
+def _ess(x):
+    """
+    Effective sample size of a n_chains x n_draws x n_params array,
+    using Geyer's initial monotone sequence estimator, vectorized
+    over parameters.
+    """
+    n_chains, n_draws, _ = x.shape
+    acov = _autocovariance(x)
+    chain_mean = np.mean(x, 1)
+    W = np.mean(acov[:, 0, :] * n_draws / (n_draws - 1.0), 0)
+    var_plus = W * (n_draws - 1.0) / n_draws
+    if n_chains > 1:
+        var_plus += np.var(chain_mean, 0, ddof=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rho = 1.0 - (W - np.mean(acov, 0)) / var_plus
+
+    rho[0] = 1.0
+    # Sum autocorrelations in pairs, truncating at the first negative
+    # pair and enforcing a monotone decrease.
+    n_pairs = n_draws // 2
+    pairs = rho[0:2 * n_pairs:2] + rho[1:2 * n_pairs:2]
+    positive = np.cumprod(pairs > 0, 0).astype(bool)
+    pairs = np.minimum.accumulate(np.where(positive, pairs, 0.0), 0)
+    tau = -1.0 + 2.0 * np.sum(pairs, 0)
+    tau = np.maximum(tau, 1.0 / np.log10(n_chains * n_draws))
+    return n_chains * n_draws / tau
+
+# Posterior summaries
+
+class RunningMoments:
+    """
+    Streaming mean, variance, and optionally covariance of samples,
+    updated in place one batch at a time. It uses the batched form of
+    Welford's algorithm, which is numerically stable.
+    (Welford, 1962; Chan et al., 1979)
+
+    Parameters
+    ----------
+    num_vars : int
+        Number of variables in each sample.
+    cov : bool, optional
+        Whether to also track the num_vars x num_vars covariance.
+        Otherwise memory is O(num_vars).
+    """
+    def __init__(self, num_vars, cov=False):
+        self.num_vars = num_vars
+        self.n = 0
+        self.mean = np.zeros(num_vars)
+        self._m2 = np.zeros(num_vars)
+        if cov:
+            self._c2 = np.zeros((num_vars, num_vars))
+        else:
+            self._c2 = None
+
+    def update(self, zs):
+        """
+        Parameters
+        ----------
+        zs : np.ndarray
+            n_samples x num_vars array
+        """
+        zs = np.asarray(zs, dtype=np.float64).reshape((-1, self.num_vars))
+        m = zs.shape[0]
+        if m == 0:
+            return
+
+        mean_b = np.mean(zs, 0)
+        r = zs - mean_b
+        delta = mean_b - self.mean
+        n = self.n + m
+        scale = float(self.n) * m / n
+        self.mean = self.mean + delta * m / float(n)
+        self._m2 += np.sum(r * r, 0) + delta * delta * scale
+        if self._c2 is not None:
+            self._c2 += np.dot(r.T, r) + np.outer(delta, delta) * scale
+
+        self.n = n
+
+    @property
+    def var(self):
+        """Sample variance of each variable."""
+        return self._m2 / max(self.n - 1, 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    @property
+    def cov(self):
+        """Sample covariance matrix."""
+        if self._c2 is None:
+            raise ValueError("Covariance is not tracked; use cov=True.")
+
+        return self._c2 / max(self.n - 1, 1)
+
+class RunningQuantiles:
+    """
+    Streaming quantiles of samples using the P-square algorithm,
+    vectorized over variables and probabilities. It keeps five
+    markers per variable and probability, so memory is
+    O(num_vars * len(probs)).
+    (Jain and Chlamtac, 1985)
+
+    Parameters
+    ----------
+    num_vars : int
+        Number of variables in each sample.
+    probs : list, optional
+        Probabilities of the quantiles to track.
+
+    Notes
+    -----
+    The algorithm is sequential in the samples: each one is a few
+    NumPy operations on arrays of num_vars * len(probs) markers, so
+    the cost per sample is dominated by their overhead for small
+    num_vars. If the samples fit in memory, e.g., a Trace which is
+    read at once, np.percentile() over all of them is faster and
+    exact; use this to summarize samples which do not.
+    """
+    def __init__(self, num_vars, probs=(0.05, 0.5, 0.95)):
+        self.num_vars = num_vars
+        self.probs = np.asarray(probs, dtype=np.float64)
+        self.n = 0
+        self._buffer = []
+        # Markers of all probabilities and variables, flattened to
+        # len(probs) * num_vars rows. The desired positions of the
+        # middle markers after the first five samples, and their
+        # increments for each further sample, are the same for each
+        # variable.
+        p = np.repeat(self.probs, num_vars)
+        self._desired = np.column_stack([2.0 * p, 4.0 * p, 2.0 + 2.0 * p])
+        self._increment = np.column_stack([0.5 * p, p, 0.5 * (1.0 + p)])
+        self._heights = None
+        self._positions = None
+
+    def update(self, zs):
+        """
+        Parameters
+        ----------
+        zs : np.ndarray
+            n_samples x num_vars array
+        """
+        zs = np.asarray(zs, dtype=np.float64).reshape((-1, self.num_vars))
+        start = 0
+        if self._heights is None:
+            start = min(5 - len(self._buffer), zs.shape[0])
+            self._buffer += list(zs[:start])
+            self.n += start
+            if len(self._buffer) == 5:
+                self._initialize()
+
+        # Each marker row is a (probability, variable) pair, so tile
+        # the samples across the probabilities.
+        for z in np.tile(zs[start:], (1, self.probs.shape[0])):
+            self._update_one(z)
+            self.n += 1
+
+    @property
+    def quantiles(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            len(probs) x num_vars array of quantile estimates
+        """
+        if self._heights is None:
+            if self.n == 0:
+                raise ValueError("No samples have been added.")
+
+            return np.percentile(np.array(self._buffer), 100.0 * self.probs,
+                                 axis=0)
+
+        return self._heights[:, 2].reshape((-1, self.num_vars)).copy()
+
+    def _initialize(self):
+        heights = np.sort(np.array(self._buffer), 0).T
+        n_probs = self.probs.shape[0]
+        self._heights = np.tile(heights, (n_probs, 1))
+        self._positions = np.tile(np.arange(5.0), (heights.shape[0] * n_probs, 1))
+        self._buffer = []
+
+    def _update_one(self, z):
+        q = self._heights
+        n = self._positions
+        # Extend the extreme markers, and shift the positions of the
+        # markers above the cell which contains z.
+        np.minimum(q[:, 0], z, out=q[:, 0])
+        np.maximum(q[:, 4], z, out=q[:, 4])
+        n += z[:, np.newaxis] < q
+        n[:, 4] = self.n
+        desired = self._desired + (self.n - 4) * self._increment
+        # Adjust the heights of the middle markers which are off their
+        # desired positions, in order, as each depends on the last.
+        for i in range(1, 4):
+            d = desired[:, i-1] - n[:, i]
+            up = (d >= 1.0) & (n[:, i+1] - n[:, i] > 1.0)
+            down = (d <= -1.0) & (n[:, i-1] - n[:, i] < -1.0)
+            rows = np.flatnonzero(up | down)
+            if rows.shape[0] == 0:
+                continue
+
+            ds = np.where(up[rows], 1.0, -1.0)
+            qi, qlo, qhi = q[rows, i], q[rows, i-1], q[rows, i+1]
+            ni, nlo, nhi = n[rows, i], n[rows, i-1], n[rows, i+1]
+            parabolic = qi + ds / (nhi - nlo) * (
+                (ni - nlo + ds) * (qhi - qi) / (nhi - ni) +
+                (nhi - ni - ds) * (qi - qlo) / (ni - nlo))
+            ok = (qlo < parabolic) & (parabolic < qhi)
+            if not np.all(ok):
+                q_adj = np.where(ds > 0, qhi, qlo)
+                n_adj = np.where(ds > 0, nhi, nlo)
+                linear = qi + ds * (q_adj - qi) / (n_adj - ni)
+                parabolic = np.where(ok, parabolic, linear)
+
+            q[rows, i] = parabolic
+            n[rows, i] = ni + ds
+
+def summarize(samples, accumulators, size=1000, n_chunk=100, data=None):
+    """
+    Stream samples into accumulators, one chunk at a time.
+
+    Parameters
+    ----------
+    samples : Variational or Trace
+        Variational model to draw size samples from, n_chunk at a
+        time; or a trace of samples, e.g., from a Markov chain Monte
+        Carlo sampler, read one chunk at a time.
+    accumulators : list
+        Objects with an update() method taking a n_samples x
+        num_vars array, such as RunningMoments and RunningQuantiles.
+    size : int, optional
+        Number of samples to draw from a variational model.
+    n_chunk : int, optional
+        Number of samples drawn at a time from a variational model.
+    data : Data, optional
+        Data whose local latent variables are drawn, required if the
+        variational model has local layers, such as AmortizedNormal.
+
+    Returns
+    -------
+    list
+        The updated accumulators.
+    """
+    if hasattr(samples, 'chunks'):
+        chunks = samples.chunks()
+    else:
+        chunks = _sample_chunks(samples, size, n_chunk, data)
+
+    for zs in chunks:
+        for accumulator in accumulators:
+            accumulator.update(zs)
+
+    return accumulators
+
+def _sample_chunks(variational, size, n_chunk, data=None):
+    sess = get_session()
+    zs, samples = _build_ppc_sample(None, variational, n_chunk, data)
+    for start in range(0, size, n_chunk):
+        n = min(n_chunk, size - start)
+        yield sess.run(zs, variational.np_dict(samples))[:n]
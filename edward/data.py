@@ -1,6 +1,10 @@
 import numpy as np
 import tensorflow as tf
 
+from edward.util import get_dtype, has_dtype_policy, lazy_import
+
+sparse = lazy_import('scipy.sparse')
+
 class Data:
     """
     Base class for data.
@@ -13,9 +17,10 @@ class Data:
 
     Arguments
     ----------
-    data: tf.tensor, np.ndarray, list, dict, optional
+    data: tf.tensor, np.ndarray, scipy.sparse matrix, list, dict, optional
         Data whose type depends on the type of model it is fed into.
-        If TensorFlow, must be tf.tensor or list (see notes).
+        If TensorFlow, must be tf.tensor, scipy.sparse matrix, or list
+        (see notes).
         If Stan, must be dict.
         If PyMC3, must be np.ndarray.
         If NumPy/SciPy, must be np.ndarray or list of np.ndarrays.
@@ -29,14 +34,26 @@ class Data:
     of the np.arrays during computation. If placeholders, user must
     manually control mini-batches and feed in the placeholders.
 
+    A scipy.sparse matrix, such as a document-term or user-item
+    count matrix, is held in CSR format. Mini-batches are its rows,
+    returned as a tf.SparseTensor, so the dense matrix is never
+    formed. The tensor is built from placeholders, and inference
+    feeds the next rows into them on each update (see feed_dict()).
+
     Data subsampling is not currently available for Stan models.
 
+    If a dtype policy is set (see edward.util.set_dtype()), floating
+    point np.ndarrays are held in its storage type, and mini-batches
+    are returned in its compute type. Otherwise they keep their own
+    type.
+
     Internally, self.counter stores the last accessed data index. It
     is used to obtain the next batch of data starting from
     self.counter to the size of the data set.
     """
     def __init__(self, data=None, shuffled=True):
         self.data = data
+        self._sparse_feed = None
         if not shuffled:
             # TODO
             # shuffle self.data
@@ -48,10 +65,12 @@ class Data:
             self.N = self.data.get_shape()[0].value
             self.counter = 0
         elif isinstance(self.data, np.ndarray):
+            self.data = _cast(self.data, 'storage')
             self.N = self.data.shape[0]
             self.counter = 0
         elif isinstance(self.data, list):
             if isinstance(self.data[0], np.ndarray):
+                self.data = [_cast(x, 'storage') for x in self.data]
                 self.N = [x.shape[0] for x in self.data]
                 self.counter = [0]*len(self.data)
             else: # list of placeholders
@@ -59,6 +78,12 @@ class Data:
                 pass
         elif isinstance(self.data, dict):
             pass
+        elif sparse.issparse(self.data):
+            # scipy.sparse does not support float16, so the values are
+            # held in their own type.
+            self.data = self.data.tocsr()
+            self.N = self.data.shape[0]
+            self.counter = 0
         else:
             raise NotImplementedError()
 
@@ -67,9 +92,19 @@ class Data:
         # In general, there should be a scale factor due to data
         # subsampling, so that
         # log_lik \approx self.N / n_data * ( mini-batch log_lik )
-        if n_data is None or self.data is None:
+        if self.data is None:
             return self.data
 
+        if n_data is None:
+            if isinstance(self.data, list):
+                return [_cast(x, 'compute') for x in self.data]
+            elif isinstance(self.data, dict):
+                return self.data
+            elif sparse.issparse(self.data):
+                return _sparse_tensor(self.data)
+            else:
+                return _cast(self.data, 'compute')
+
         if isinstance(self.data, tf.Tensor):
             counter_new = self.counter + n_data
             if counter_new <= self.N:
@@ -82,7 +117,7 @@ class Data:
                                       list(range(0, counter_new)))
 
             self.counter = counter_new
-            return minibatch
+            return _cast(minibatch, 'compute')
         elif isinstance(self.data, np.ndarray):
             counter_new = self.counter + n_data
             if counter_new <= self.N:
@@ -93,7 +128,7 @@ class Data:
                                             self.data[:counter_new]))
 
             self.counter = counter_new
-            return minibatch
+            return _cast(minibatch, 'compute')
         elif isinstance(self.data, list):
             if isinstance(self.data[0], np.ndarray):
                 minibatch = [0]*len(self.data)
@@ -108,8 +143,79 @@ class Data:
 
                     self.counter[i] = counter_new
 
-                return minibatch
+                return [_cast(x, 'compute') for x in minibatch]
             else: # list of placeholders
                 raise NotImplementedError()
-        else: # dict
+        elif isinstance(self.data, dict):
             raise NotImplementedError()
+        else: # scipy.sparse matrix
+            # The rows are fed on each update, as the matrix is not a
+            # tensor which the graph can index.
+            if self._sparse_feed is None:
+                dtype = _cast(self.data.data[:0], 'compute').dtype
+                placeholders = (tf.placeholder(tf.int64, [None, 2]),
+                                tf.placeholder(tf.as_dtype(dtype), [None]),
+                                tf.placeholder(tf.int64, [2]))
+                self._sparse_feed = [placeholders,
+                                     tf.SparseTensor(*placeholders), n_data]
+
+            self._sparse_feed[2] = n_data
+            return self._sparse_feed[1]
+
+    def feed_dict(self):
+        """
+        Dictionary feeding the next mini-batch of a scipy.sparse
+        matrix into the tensor returned by sample(). It is empty for
+        other data, whose mini-batches are fixed when the graph is
+        built.
+        """
+        if self._sparse_feed is None:
+            return {}
+
+        placeholders, _, n_data = self._sparse_feed
+        counter_new = self.counter + n_data
+        if counter_new <= self.N:
+            rows = np.arange(self.counter, counter_new)
+        else:
+            counter_new = counter_new - self.N
+            rows = np.concatenate((np.arange(self.counter, self.N),
+                                   np.arange(0, counter_new)))
+
+        self.counter = counter_new
+        return dict(zip(placeholders, _sparse_value(self.data[rows])))
+
+def _cast(x, kind):
+    """
+    Cast floating point tensors and arrays to the given type of the
+    dtype policy, leaving anything else as is. Nothing is cast until
+    a policy is set.
+    """
+    if not has_dtype_policy():
+        return x
+
+    dtype = get_dtype(kind)
+    if isinstance(x, tf.Tensor):
+        if x.dtype.is_floating and x.dtype != dtype:
+            return tf.cast(x, dtype)
+    elif isinstance(x, np.ndarray):
+        if np.issubdtype(x.dtype, np.floating):
+            return x.astype(dtype.as_numpy_dtype, copy=False)
+
+    return x
+
+def _sparse_tensor(x):
+    """
+    Convert a scipy.sparse matrix to a tf.SparseTensor, with values
+    in the compute type of the dtype policy.
+    """
+    return tf.SparseTensor(*_sparse_value(x))
+
+def _sparse_value(x):
+    """
+    Indices, values and shape of a scipy.sparse matrix, with values
+    in the compute type of the dtype policy.
+    """
+    x = x.tocoo()
+    indices = np.vstack((x.row, x.col)).T.astype(np.int64)
+    values = _cast(x.data, 'compute')
+    return indices, values, np.array(x.shape, dtype=np.int64)
@@ -1,15 +1,17 @@
 from __future__ import print_function
 import numpy as np
+import os
 import tensorflow as tf
+import time
 
+from edward.callbacks import ProgressPrinter
 from edward.data import Data
 from edward.models import Variational, PointMass
-from edward.util import get_session, hessian, kl_multivariate_normal, log_sum_exp
+from edward.stats import norm
+from edward.util import dtype_policy, get_dtype, get_session, hessian, lazy_import, log_sum_exp
 
-try:
-    import prettytensor as pt
-except ImportError:
-    pass
+pt = lazy_import('prettytensor')
+timeline = lazy_import('tensorflow.python.client.timeline')
 
 class Inference:
     """
@@ -62,15 +64,26 @@ class VariationalInference(Inference):
         """
         A simple wrapper to run the inference algorithm.
         """
+        for layer in self.variational.layers:
+            idx = getattr(layer, 'idx', None)
+            if isinstance(idx, tf.Tensor) and idx.op.type == 'Placeholder':
+                raise ValueError("run() does not feed the row indices idx "
+                                 "of an IndexedNormal layer. Pass idx when "
+                                 "creating the layer, or call initialize() "
+                                 "and feed them to each update().")
+
         self.initialize(*args, **kwargs)
         for t in range(self.n_iter+1):
             loss = self.update()
             self.print_progress(t, loss)
 
         self.finalize()
+        for callback in self.callbacks:
+            callback.on_train_end(self)
 
     def initialize(self, n_iter=1000, n_data=None, n_print=100,
-        optimizer=None, scope=None):
+        optimizer=None, scope=None, profile=False, trace_steps=None,
+        trace_dir=None, callbacks=None, print_params=False, dtype=None):
         """
         Initialize inference algorithm.
 
@@ -89,14 +102,46 @@ class VariationalInference(Inference):
             optimizer if using PrettyTensor. Defaults to TensorFlow.
         scope : str, optional
             Scope of TensorFlow variable objects to optimize over.
+        profile : bool, optional
+            Whether to record the wall time of each phase of each
+            update in self.profile_stats.
+        trace_steps : list, optional
+            Steps at which to also capture TensorFlow run metadata,
+            recording the time spent in each component of the loss.
+        trace_dir : str, optional
+            Directory to write Chrome trace timelines of the traced
+            steps to, viewable at chrome://tracing.
+        callbacks : list, optional
+            Callbacks to call at each iteration, such as a
+            MetricsLogger.
+        print_params : bool, optional
+            Whether print progress also prints the variational model.
+            This fetches all of its parameters.
+        dtype : tf.DType, optional
+            Floating point type in which to compute the loss, e.g.,
+            tf.float64 for ill-conditioned models. Default is the
+            compute type of the global dtype policy (see
+            edward.util.set_dtype()).
         """
         self.n_iter = n_iter
         self.n_data = n_data
         self.n_print = n_print
+        self.profile = profile or trace_steps is not None
+        self.trace_steps = set(trace_steps or [])
+        self.trace_dir = trace_dir
+        self.profile_stats = []
+        self.t = 0
+        self.callbacks = []
+        if n_print is not None:
+            self.callbacks += [ProgressPrinter(n_print, print_params)]
+
+        if callbacks is not None:
+            self.callbacks += callbacks
 
         self.loss = tf.constant(0.0)
 
-        loss = self.build_loss()
+        with dtype_policy(compute=dtype):
+            loss = self.build_loss()
         if optimizer is None:
             var_list = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
                                          scope=scope)
@@ -107,8 +152,30 @@ class VariationalInference(Inference):
                                                 global_step,
                                                 100, 0.9, staircase=True)
             optimizer = tf.train.AdamOptimizer(learning_rate)
-            self.train = optimizer.minimize(loss, global_step=global_step,
-                                            var_list=var_list)
+            row_vars = [var for layer in self.variational.layers
+                        for var in getattr(layer, 'row_variables', [])
+                        if var in var_list]
+            if not row_vars:
+                self.train = optimizer.minimize(loss, global_step=global_step,
+                                                var_list=var_list)
+            else:
+                # Variables indexed by data row only receive gradients
+                # for the rows in the minibatch. ADAM decays its moments
+                # for every row, so use Adagrad, which updates the
+                # variables and its state at those rows only.
+                var_list = [var for var in var_list if var not in row_vars]
+                grads = tf.gradients(loss, var_list + row_vars)
+                row_optimizer = tf.train.AdagradOptimizer(learning_rate)
+                train_rows = row_optimizer.apply_gradients(
+                    list(zip(grads[len(var_list):], row_vars)))
+                if var_list:
+                    train_global = optimizer.apply_gradients(
+                        list(zip(grads[:len(var_list)], var_list)),
+                        global_step=global_step)
+                else:
+                    train_global = tf.assign_add(global_step, 1)
+
+                self.train = tf.group(train_global, train_rows)
         else:
             if scope is not None:
                 raise NotImplementedError("PrettyTensor optimizer does not accept a variable scope.")
@@ -118,17 +185,168 @@ class VariationalInference(Inference):
 
         init = tf.initialize_all_variables()
         init.run()
+        for callback in self.callbacks:
+            callback.on_train_begin(self)
+
+    def update(self, feed_dict=None):
+        """
+        Run one step of optimization.
 
-    def update(self):
+        Parameters
+        ----------
+        feed_dict : dict, optional
+            Values to feed in addition to those of build_feed_dict(),
+            such as a minibatch of data and its row indices.
+
+        Returns
+        -------
+        float
+            The loss at this step.
+        """
         sess = get_session()
-        _, loss = sess.run([self.train, self.loss])
+        if not self.profile:
+            feed_dict = self.build_feed_dict(feed_dict)
+            _, loss = sess.run([self.train, self.loss], feed_dict)
+            self.t += 1
+            return loss
+
+        start = time.time()
+        feed_dict = self.build_feed_dict(feed_dict)
+        feed_time = time.time() - start
+        if self.t in self.trace_steps:
+            run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
+            run_metadata = tf.RunMetadata()
+            start = time.time()
+            _, loss = sess.run([self.train, self.loss], feed_dict,
+                               options=run_options,
+                               run_metadata=run_metadata)
+            run_time = time.time() - start
+        else:
+            run_metadata = None
+            start = time.time()
+            _, loss = sess.run([self.train, self.loss], feed_dict)
+            run_time = time.time() - start
+
+        stats = {'step': self.t, 'feed': feed_time, 'run': run_time,
+                 'total': feed_time + run_time}
+        if run_metadata is not None:
+            stats['ops'] = _op_costs(run_metadata)
+            if self.trace_dir is not None:
+                self._write_timeline(run_metadata)
+
+        self.profile_stats += [stats]
+        self.t += 1
         return loss
 
+    def build_feed_dict(self, feed_dict=None):
+        """
+        Build the dictionary feeding an update, drawing samples for
+        any SciPy-based variational layers and the next mini-batch of
+        any sparse data, and adding the entries of feed_dict.
+        """
+        if hasattr(self, 'samples'):
+            out = self.variational.np_dict(self.samples)
+        else:
+            out = {}
+
+        out.update(self.data.feed_dict())
+
+        if feed_dict is not None:
+            out.update(feed_dict)
+
+        return out
+
+    def profile_summary(self):
+        """
+        Summarize the profile over all recorded steps.
+
+        Returns
+        -------
+        dict
+            Mean wall time in seconds of each phase of an update:
+            building the feed (including sampling in NumPy/SciPy),
+            and the TensorFlow run. If any steps were traced, also
+            the mean time spent in each component of the loss.
+        """
+        summary = {}
+        if not self.profile_stats:
+            return summary
+
+        for phase in ['feed', 'run', 'total']:
+            summary[phase] = np.mean([stats[phase]
+                                      for stats in self.profile_stats])
+
+        traced = [stats['ops'] for stats in self.profile_stats
+                  if 'ops' in stats]
+        if traced:
+            components = set().union(*[ops.keys() for ops in traced])
+            summary['ops'] = dict((c, np.mean([ops.get(c, 0.0)
+                                               for ops in traced]))
+                                  for c in components)
+
+        return summary
+
+    def graph_report(self, n_largest=10):
+        """
+        Report the size of the graph built by initialize().
+
+        Parameters
+        ----------
+        n_largest : int, optional
+            Number of largest tensors to report.
+
+        Returns
+        -------
+        dict
+            'ops', the number of ops in each component of the loss
+            (see profile_summary()) and 'n_ops', their total;
+            'unrolled', unrolled Python loops whose number of rows is
+            n_minibatch, n_data or the data set size N, with the number
+            of ops built per row, largest first; and 'memory', an
+            estimate in bytes of the peak memory of the tensors in one
+            update, the memory of the variables, the number of tensors
+            whose shape is unknown, and the largest tensors of an
+            update.
+
+        Notes
+        -----
+        A model written with a Python loop over the rows of zs, e.g.,
+        via tf.unpack(zs), builds its ops once per sample. Its graph,
+        and the time to build and run it, grows with n_minibatch.
+        Vectorizing over the rows avoids this.
+
+        The peak memory is estimated statically, by running the ops of
+        an update one at a time, in the order they were created, and
+        freeing each tensor after its last use. TensorFlow may run
+        ops in parallel and hold more tensors at once, and tensors
+        whose shape is unknown are left out. For the memory actually
+        allocated, trace a step (see trace_steps in initialize()).
+        """
+        sizes = {'n_minibatch': getattr(self, 'n_minibatch', None),
+                 'n_data': self.n_data,
+                 'N': getattr(self.data, 'N', None)}
+        sizes = dict((name, size) for name, size in sizes.items()
+                     if isinstance(size, int) and size > 1)
+        return _graph_report(tf.get_default_graph(), [self.train, self.loss],
+                             sizes, n_largest)
+
+    def _write_timeline(self, run_metadata):
+        if not os.path.exists(self.trace_dir):
+            os.makedirs(self.trace_dir)
+
+        trace = timeline.Timeline(run_metadata.step_stats)
+        path = os.path.join(self.trace_dir,
+                            'timeline_{:d}.json'.format(self.t))
+        with open(path, 'w') as f:
+            f.write(trace.generate_chrome_trace_format())
+
     def print_progress(self, t, loss):
-        if self.n_print is not None:
-            if t % self.n_print == 0:
-                print("iter {:d} loss {:.2f}".format(t, loss))
-                print(self.variational)
+        """
+        Report progress of iteration t by calling each callback. By
+        default this prints the loss every n_print iterations.
+        """
+        for callback in self.callbacks:
+            callback.on_step_end(self, t, loss)
 
     def finalize(self):
         """Run steps after all updates."""
@@ -146,7 +364,8 @@ class MFVI(VariationalInference):
     def __init__(self, *args, **kwargs):
         VariationalInference.__init__(self, *args, **kwargs)
 
-    def initialize(self, n_minibatch=1, score=None, *args, **kwargs):
+    def initialize(self, n_minibatch=1, score=None, grad_stats=False,
+                   n_grad_stats=10, *args, **kwargs):
         """
         Parameters
         ----------
@@ -156,25 +375,168 @@ class MFVI(VariationalInference):
         score : bool, optional
             Whether to force inference to use the score function
             gradient estimator. Otherwise default is to use the
-            reparameterization gradient if available.
+            reparameterization gradient for each layer where it is
+            available, and the score function gradient for the others.
+        grad_stats : bool, optional
+            Whether to estimate the variance and signal-to-noise ratio
+            of the gradient of each parameter, from the gradients of
+            the individual samples in the minibatch. This adds
+            n_minibatch gradient computations to the graph, so it is
+            meant for tuning rather than long runs.
+        n_grad_stats : int, optional
+            Number of iterations between gradient estimates.
         """
-        if score is None and self.variational.is_reparam:
+        # Models wrapping NumPy, Stan or PyMC3 have no gradients, so
+        # they require the score function estimator.
+        if score is None and \
+           getattr(self.model, 'is_differentiable', True) and \
+           any([layer.is_reparam for layer in self.variational.layers]):
             self.score = False
         else:
             self.score = True
 
         self.n_minibatch = n_minibatch
-        return VariationalInference.initialize(self, *args, **kwargs)
+        self.grad_stats = grad_stats
+        self.n_grad_stats = n_grad_stats
+        if grad_stats and n_minibatch < 2:
+            raise ValueError("Gradient statistics require n_minibatch >= 2.")
+
+        self._sample_terms = {}
+        out = VariationalInference.initialize(self, *args, **kwargs)
+        if grad_stats:
+            var_list = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                         scope=kwargs.get('scope'))
+            self.build_grad_stats(var_list)
+
+        return out
+
+    def update(self, feed_dict=None):
+        loss = VariationalInference.update(self, feed_dict)
+        if self.grad_stats and (self.t - 1) % self.n_grad_stats == 0:
+            self._update_grad_stats(feed_dict)
 
-    def update(self):
-        sess = get_session()
-        feed_dict = self.variational.np_dict(self.samples)
-        _, loss = sess.run([self.train, self.loss], feed_dict)
         return loss
 
+    def build_grad_stats(self, var_list, decay=0.9):
+        """
+        Build the per-parameter mean and variance of the single-sample
+        gradient of each estimator whose per-sample terms the loss
+        recorded.
+
+        The estimates are updated every n_grad_stats iterations and
+        smoothed with an exponential moving average of the given decay.
+        They are available, flattened and concatenated over var_list,
+        in self.grad_mean and self.grad_var, keyed by estimator.
+        """
+        self.grad_decay = decay
+        self.grad_mean = {}
+        self.grad_var = {}
+        self._grad_ops = {}
+        with tf.name_scope('grad_stats'):
+            for estimator, terms in self._sample_terms.items():
+                grads = []
+                for s in range(self.n_minibatch):
+                    grad = tf.gradients(-tf.gather(terms, s), var_list)
+                    grads += [tf.concat(0, [_flatten_grad(g, var)
+                                            for g, var in zip(grad, var_list)])]
+
+                grads = tf.pack(grads)
+                mean = tf.reduce_mean(grads, 0)
+                var = tf.reduce_sum(tf.square(grads - mean), 0) / \
+                      (self.n_minibatch - 1)
+                self._grad_ops[estimator] = [mean, var]
+
+    def gradient_snr(self, estimator=None):
+        """
+        Signal-to-noise ratio |E[g]| / sd[g] of the minibatch gradient
+        of each parameter, for the given estimator ('score' or
+        'reparam'). Default is the estimator in use.
+        """
+        if estimator is None:
+            estimator = 'score' if self.score else 'reparam'
+
+        mean = self.grad_mean[estimator]
+        var = self.grad_var[estimator] / self.n_minibatch
+        return np.abs(mean) / np.sqrt(np.maximum(var, 1e-30))
+
+    def recommend(self, target_snr=1.0):
+        """
+        Recommend a gradient estimator and minibatch size from the
+        current gradient statistics.
+
+        Parameters
+        ----------
+        target_snr : float, optional
+            Desired signal-to-noise ratio of the median parameter's
+            minibatch gradient.
+
+        Returns
+        -------
+        dict
+            'score', whether to use the score function estimator;
+            'n_minibatch', the number of samples reaching target_snr
+            with that estimator; and 'variance', the total variance of
+            the single-sample gradient of each estimator measured.
+
+        Notes
+        -----
+        The variance of a minibatch gradient is the single-sample
+        variance divided by the number of samples, so the number of
+        samples to reach an SNR is (target_snr * sd[g] / |E[g]|)^2.
+        Both estimators are only compared if the loss recorded terms
+        for both, i.e., the variational model is reparameterizable and
+        the loss does not use an analytic KL or entropy.
+        """
+        if not self.grad_mean:
+            raise ValueError("No gradient statistics; initialize with "
+                             "grad_stats=True and run an update.")
+
+        variance = dict((estimator, float(np.sum(var)))
+                        for estimator, var in self.grad_var.items())
+        estimator = min(variance, key=variance.get)
+        mean = self.grad_mean[estimator]
+        var = self.grad_var[estimator]
+        snr2 = np.square(mean) / np.maximum(var, 1e-30)
+        n_minibatch = int(np.ceil(target_snr**2 / max(np.median(snr2), 1e-30)))
+        return {'score': estimator == 'score',
+                'n_minibatch': max(n_minibatch, 1),
+                'variance': variance}
+
+    def _update_grad_stats(self, feed_dict=None):
+        sess = get_session()
+        estimators = list(self._grad_ops.keys())
+        feed_dict = self.build_feed_dict(feed_dict)
+        values = sess.run([self._grad_ops[e] for e in estimators], feed_dict)
+        for estimator, (mean, var) in zip(estimators, values):
+            if estimator in self.grad_mean:
+                decay = self.grad_decay
+                mean = decay * self.grad_mean[estimator] + (1 - decay) * mean
+                var = decay * self.grad_var[estimator] + (1 - decay) * var
+
+            self.grad_mean[estimator] = mean
+            self.grad_var[estimator] = var
+
     def build_loss(self):
+        """
+        Build the loss, using an analytic KL divergence and sampling
+        only the likelihood if the model has log_lik() and every
+        variational layer has an analytic KL divergence to its prior
+        (see _priors()).
+
+        Only this loss scales the terms of local layers to the full
+        data set (see _local_scale()), so an error is raised if they
+        need scaling and the loss cannot use an analytic KL divergence.
+        """
+        is_kl = hasattr(self.model, 'log_lik') and self._is_kl()
+        if not is_kl and self._local_scale() != 1.0:
+            raise ValueError("Local variational layers on subsampled data "
+                             "require a model with log_lik() and an "
+                             "analytic KL divergence of every layer to "
+                             "its prior, so that only their terms are "
+                             "scaled to the full data set.")
+
         if self.score:
-            if self.variational.is_normal and hasattr(self.model, 'log_lik'):
+            if is_kl:
                 return self.build_score_loss_kl()
             # Analytic entropies may lead to problems around
             # convergence; for now it is deactivated.
@@ -183,7 +545,7 @@ class MFVI(VariationalInference):
             else:
                 return self.build_score_loss()
         else:
-            if self.variational.is_normal and hasattr(self.model, 'log_lik'):
+            if is_kl:
                 return self.build_reparam_loss_kl()
             #elif self.variational.is_entropy:
             #    return self.build_reparam_loss_entropy()
@@ -198,16 +560,29 @@ class MFVI(VariationalInference):
 
         ELBO = E_{q(z; lambda)} [ log p(x, z) - log q(z; lambda) ]
         """
-        x = self.data.sample(self.n_data)
-        z, self.samples = self.variational.sample(self.n_minibatch)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
+
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch)
+
+        with tf.name_scope('q_log_prob'):
+            q_log_prob = tf.zeros([self.n_minibatch], dtype=get_dtype())
+            for i in range(self.variational.num_factors):
+                q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
 
-        q_log_prob = tf.zeros([self.n_minibatch], dtype=tf.float32)
-        for i in range(self.variational.num_factors):
-            q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
+        with tf.name_scope('log_prob'):
+            p_log_prob = self.model.log_prob(x, z)
+
+        losses = p_log_prob - q_log_prob
+        self._sample_terms['score'] = q_log_prob * tf.stop_gradient(losses)
+        if self.grad_stats and self.variational.is_reparam:
+            self._sample_terms['reparam'] = p_log_prob - \
+                self._q_log_prob(z)
 
-        losses = self.model.log_prob(x, z) - q_log_prob
         self.loss = tf.reduce_mean(losses)
-        return -tf.reduce_mean(q_log_prob * tf.stop_gradient(losses))
+        return -tf.reduce_mean(self._sample_terms['score'])
 
     def build_reparam_loss(self):
         """
@@ -216,16 +591,35 @@ class MFVI(VariationalInference):
         (Kingma and Welling, 2014)
 
         ELBO = E_{q(z; lambda)} [ log p(x, z) - log q(z; lambda) ]
+
+        Layers which are not reparameterizable use the score function
+        gradient (see _score_log_prob()).
         """
-        x = self.data.sample(self.n_data)
-        z, self.samples = self.variational.sample(self.n_minibatch)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
 
-        q_log_prob = tf.zeros([self.n_minibatch], dtype=tf.float32)
-        for i in range(self.variational.num_factors):
-            q_log_prob += self.variational.log_prob_i(i, z)
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch)
 
-        self.loss = tf.reduce_mean(self.model.log_prob(x, z) - q_log_prob)
-        return -self.loss
+        with tf.name_scope('q_log_prob'):
+            q_log_prob = tf.zeros([self.n_minibatch], dtype=get_dtype())
+            for i in range(self.variational.num_factors):
+                q_log_prob += self.variational.log_prob_i(i, z)
+
+        with tf.name_scope('log_prob'):
+            p_log_prob = self.model.log_prob(x, z)
+
+        losses = p_log_prob - q_log_prob
+        self._sample_terms['reparam'] = losses + \
+            self._score_log_prob(z) * tf.stop_gradient(losses)
+        if self.grad_stats:
+            self._sample_terms['score'] = \
+                self._q_log_prob(tf.stop_gradient(z)) * \
+                tf.stop_gradient(losses)
+
+        self.loss = tf.reduce_mean(losses)
+        return -tf.reduce_mean(self._sample_terms['reparam'])
 
     def build_score_loss_kl(self):
         """
@@ -235,21 +629,34 @@ class MFVI(VariationalInference):
         ELBO = E_{q(z; lambda)} [ log p(x | z) ] + KL(q(z; lambda) || p(z))
         where KL is analytic
 
-        It assumes the model prior is p(z) = N(z; 0, 1).
+        The prior of each layer is given by the model (see _priors()).
+        The terms of any local layers are scaled to the full data set
+        (see _local_scale()).
         """
-        x = self.data.sample(self.n_data)
-        z, self.samples = self.variational.sample(self.n_minibatch)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
+
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch)
+
+        with tf.name_scope('q_log_prob'):
+            q_log_prob = tf.zeros([self.n_minibatch], dtype=get_dtype())
+            for i in range(self.variational.num_factors):
+                q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
+
+        with tf.name_scope('log_lik'):
+            p_log_lik = self.model.log_lik(x, z)
 
-        q_log_prob = tf.zeros([self.n_minibatch], dtype=tf.float32)
-        for i in range(self.variational.num_factors):
-            q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
+        with tf.name_scope('kl'):
+            kl_local, kl_global = self._kl()
 
-        p_log_lik = self.model.log_lik(x, z)
-        mu = tf.pack([layer.loc for layer in self.variational.layers])
-        sigma = tf.pack([layer.scale for layer in self.variational.layers])
-        kl = kl_multivariate_normal(mu, sigma)
-        self.loss = tf.reduce_mean(p_log_lik) - kl
-        return -(tf.reduce_mean(q_log_prob * tf.stop_gradient(p_log_lik)) - kl)
+        scale = self._local_scale()
+        self._sample_terms['score'] = \
+            scale * q_log_prob * tf.stop_gradient(p_log_lik) - \
+            scale * kl_local - kl_global
+        self.loss = scale * (tf.reduce_mean(p_log_lik) - kl_local) - kl_global
+        return -tf.reduce_mean(self._sample_terms['score'])
 
     def build_score_loss_entropy(self):
         """
@@ -259,18 +666,28 @@ class MFVI(VariationalInference):
         ELBO = E_{q(z; lambda)} [ log p(x, z) ] + H(q(z; lambda))
         where entropy is analytic
         """
-        x = self.data.sample(self.n_data)
-        z, self.samples = self.variational.sample(self.n_minibatch)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
 
-        q_log_prob = tf.zeros([self.n_minibatch], dtype=tf.float32)
-        for i in range(self.variational.num_factors):
-            q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch)
 
-        p_log_prob = self.model.log_prob(x, z)
-        q_entropy = self.variational.entropy()
+        with tf.name_scope('q_log_prob'):
+            q_log_prob = tf.zeros([self.n_minibatch], dtype=get_dtype())
+            for i in range(self.variational.num_factors):
+                q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
+
+        with tf.name_scope('log_prob'):
+            p_log_prob = self.model.log_prob(x, z)
+
+        with tf.name_scope('entropy'):
+            q_entropy = self.variational.entropy()
+
+        self._sample_terms['score'] = \
+            q_log_prob * tf.stop_gradient(p_log_prob) + q_entropy
         self.loss = tf.reduce_mean(p_log_prob) + q_entropy
-        return -(tf.reduce_mean(q_log_prob * tf.stop_gradient(p_log_prob)) +
-                 q_entropy)
+        return -tf.reduce_mean(self._sample_terms['score'])
 
     def build_reparam_loss_kl(self):
         """
@@ -280,16 +697,31 @@ class MFVI(VariationalInference):
         ELBO = E_{q(z; lambda)} [ log p(x | z) ] + KL(q(z; lambda) || p(z))
         where KL is analytic
 
-        It assumes the model prior is p(z) = N(z; 0, 1).
+        The prior of each layer is given by the model (see _priors()).
+        The terms of any local layers are scaled to the full data set
+        (see _local_scale()).
+        Layers which are not reparameterizable use the score function
+        gradient (see _score_log_prob()).
         """
-        x = self.data.sample(self.n_data)
-        z, self.samples = self.variational.sample(self.n_minibatch)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
 
-        mu = tf.pack([layer.loc for layer in self.variational.layers])
-        sigma = tf.pack([layer.scale for layer in self.variational.layers])
-        self.loss = tf.reduce_mean(self.model.log_lik(x, z)) - \
-                    kl_multivariate_normal(mu, sigma)
-        return -self.loss
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch)
+
+        with tf.name_scope('log_lik'):
+            p_log_lik = self.model.log_lik(x, z)
+
+        with tf.name_scope('kl'):
+            kl_local, kl_global = self._kl()
+
+        scale = self._local_scale()
+        losses = scale * (p_log_lik - kl_local) - kl_global
+        self._sample_terms['reparam'] = losses + \
+            scale * self._score_log_prob(z) * tf.stop_gradient(p_log_lik)
+        self.loss = tf.reduce_mean(losses)
+        return -tf.reduce_mean(self._sample_terms['reparam'])
 
     def build_reparam_loss_entropy(self):
         """
@@ -299,12 +731,131 @@ class MFVI(VariationalInference):
         ELBO = E_{q(z; lambda)} [ log p(x, z) ] + H(q(z; lambda))
         where entropy is analytic
         """
-        x = self.data.sample(self.n_data)
-        z, self.samples = self.variational.sample(self.n_minibatch)
-        self.loss = tf.reduce_mean(self.model.log_prob(x, z)) + \
-                    self.variational.entropy()
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
+
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch)
+        with tf.name_scope('log_prob'):
+            p_log_prob = self.model.log_prob(x, z)
+
+        with tf.name_scope('entropy'):
+            q_entropy = self.variational.entropy()
+
+        self._sample_terms['reparam'] = p_log_prob + q_entropy
+        self.loss = tf.reduce_mean(self._sample_terms['reparam'])
         return -self.loss
 
+    def _kl(self):
+        """
+        Analytic KL(q(z; lambda) || p(z)) of the local layers, whose
+        latent variables are those of the current minibatch, and of
+        the global layers.
+        """
+        kl_local = tf.constant(0.0, dtype=get_dtype())
+        kl_global = tf.constant(0.0, dtype=get_dtype())
+        for layer, (p, p_params) in zip(self.variational.layers,
+                                        self._priors()):
+            kl = layer.kl(p, p_params)
+            if layer.is_local:
+                kl_local += kl
+            else:
+                kl_global += kl
+
+        return kl_local, kl_global
+
+    def _priors(self):
+        """
+        Prior of each variational layer, as a distribution in
+        edward.stats and its parameters.
+
+        A model declares them in the attribute priors, a list with one
+        (distribution, parameters) pair for each layer, e.g.,
+        [(norm, [0.0, 1.0]), (beta, [1.0, 1.0])]. The parameters
+        broadcast against those of the layer. Otherwise the prior is
+        assumed to be p(z) = N(z; 0, 1).
+        """
+        if hasattr(self.model, 'priors'):
+            priors = self.model.priors
+            if len(priors) != len(self.variational.layers):
+                raise ValueError("The model must declare one prior for "
+                                 "each variational layer.")
+
+            return priors
+        else:
+            return [(norm, [0.0, 1.0])] * len(self.variational.layers)
+
+    def _is_kl(self):
+        """
+        Whether every variational layer has an analytic KL divergence
+        to its prior.
+        """
+        for layer, (p, p_params) in zip(self.variational.layers,
+                                        self._priors()):
+            if not layer.has_kl(p):
+                return False
+
+        return True
+
+    def _local_scale(self):
+        """
+        Scale factor N / n_data of the minibatch terms, log p(x | z)
+        and the KL of the local layers, so that they estimate the
+        terms of the full data set of size N. It is 1 if the
+        variational model has no local layers, in which case the model
+        is responsible for any scaling of its likelihood, or if the
+        data set size is unknown, e.g., for placeholders.
+
+        Layers indexed by data row, such as IndexedNormal, know N and
+        the minibatch size, which then take precedence over the data.
+        """
+        local_layers = [layer for layer in self.variational.layers
+                        if layer.is_local]
+        if not local_layers:
+            return 1.0
+
+        for layer in local_layers:
+            if hasattr(layer, 'N'):
+                return float(layer.N) / layer.n_data
+
+        N = getattr(self.data, 'N', None)
+        if isinstance(N, list):
+            N = N[0]
+
+        if self.n_data is None or not isinstance(N, int):
+            return 1.0
+
+        return float(N) / self.n_data
+
+    def _score_log_prob(self, z):
+        """
+        log q(z; lambda) of the layers which are not
+        reparameterizable, whose gradients use the score function
+        estimator in the reparameterization losses. It is zero if all
+        layers are reparameterizable.
+        """
+        q_log_prob = tf.zeros([self.n_minibatch], dtype=get_dtype())
+        with tf.name_scope('q_log_prob'):
+            i = 0
+            for layer in self.variational.layers:
+                if not layer.is_reparam:
+                    for j in range(layer.num_factors):
+                        q_log_prob += self.variational.log_prob_i(
+                            i + j, tf.stop_gradient(z))
+
+                i += layer.num_factors
+
+        return q_log_prob
+
+    def _q_log_prob(self, z):
+        with tf.name_scope('q_log_prob'):
+            q_log_prob = tf.zeros([self.n_minibatch], dtype=get_dtype())
+            for i in range(self.variational.num_factors):
+                q_log_prob += self.variational.log_prob_i(i, z)
+
+        return q_log_prob
+
 class KLpq(VariationalInference):
     """
     Kullback-Leibler divergence from posterior to variational model,
@@ -318,12 +869,6 @@ class KLpq(VariationalInference):
         self.n_minibatch = n_minibatch
         return VariationalInference.initialize(self, *args, **kwargs)
 
-    def update(self):
-        sess = get_session()
-        feed_dict = self.variational.np_dict(self.samples)
-        _, loss = sess.run([self.train, self.loss], feed_dict)
-        return loss
-
     def build_loss(self):
         """
         Loss function to minimize, whose gradient is a stochastic
@@ -345,21 +890,133 @@ class KLpq(VariationalInference):
               + w_norm(z^b; lambda) = w(z^b; lambda) / sum_{b=1}^B w(z^b; lambda)
               + w(z^b; lambda) = p(x, z^b) / q(z^b; lambda)
         """
-        x = self.data.sample(self.n_data)
-        z, self.samples = self.variational.sample(self.n_minibatch)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
+
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch)
 
-        q_log_prob = tf.zeros([self.n_minibatch], dtype=tf.float32)
-        for i in range(self.variational.num_factors):
-            q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
+        with tf.name_scope('q_log_prob'):
+            q_log_prob = tf.zeros([self.n_minibatch], dtype=get_dtype())
+            for i in range(self.variational.num_factors):
+                q_log_prob += self.variational.log_prob_i(i, tf.stop_gradient(z))
 
         # normalized importance weights
-        log_w = self.model.log_prob(x, z) - q_log_prob
+        with tf.name_scope('log_prob'):
+            p_log_prob = self.model.log_prob(x, z)
+
+        log_w = p_log_prob - q_log_prob
         log_w_norm = log_w - log_sum_exp(log_w)
         w_norm = tf.exp(log_w_norm)
 
         self.loss = tf.reduce_mean(w_norm * log_w)
         return -tf.reduce_mean(q_log_prob * tf.stop_gradient(w_norm))
 
+class IWAE(VariationalInference):
+    """
+    Importance weighted variational inference, maximizing the
+    importance weighted bound
+    (Burda et al., 2016)
+
+    L_K = E_{z^1, ..., z^K ~ q(z; lambda)}
+              [ log 1/K sum_{k=1}^K p(x, z^k) / q(z^k; lambda) ]
+
+    which is at least as tight as the ELBO (K = 1), and approaches
+    log p(x) as K grows.
+    """
+    def __init__(self, *args, **kwargs):
+        VariationalInference.__init__(self, *args, **kwargs)
+        self._bounds = {}
+
+    def initialize(self, K=5, n_minibatch=1, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        K : int, optional
+            Number of importance samples in each bound.
+        n_minibatch : int, optional
+            Number of bounds to average for calculating stochastic
+            gradients. Each update draws n_minibatch * K samples.
+        """
+        self.K = K
+        self.n_minibatch = n_minibatch
+        return VariationalInference.initialize(self, *args, **kwargs)
+
+    def build_loss(self):
+        """
+        Loss function to minimize, whose gradient is a stochastic
+        gradient of L_K based on the reparameterization trick.
+
+        The n_minibatch * K samples are drawn in one batch, and their
+        log weights are reshaped to n_minibatch x K to average over
+        each row with log_sum_exp.
+        """
+        if not self.variational.is_reparam:
+            raise NotImplementedError("IWAE requires a reparameterizable "
+                                      "variational model.")
+
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
+
+        with tf.name_scope('q_sample'):
+            self.variational.build(x)
+            z, self.samples = self.variational.sample(self.n_minibatch *
+                                                      self.K)
+
+        self.loss = tf.reduce_mean(self._bound(x, z, self.n_minibatch,
+                                               self.K))
+        return -self.loss
+
+    def bound(self, K=1000, n_repeat=1):
+        """
+        Estimate the importance weighted bound L_K, e.g., with a large
+        K as a tight lower bound on log p(x) to evaluate a fit. It is
+        evaluated on the full data set, even if updates subsample it.
+
+        Parameters
+        ----------
+        K : int, optional
+            Number of importance samples.
+        n_repeat : int, optional
+            Number of independent estimates to average.
+
+        Returns
+        -------
+        float
+            The average estimate.
+
+        Notes
+        -----
+        The graph for each K is built once and cached.
+        """
+        if K not in self._bounds:
+            x = self.data.sample(None)
+            self.variational.build(x)
+            z, samples = self.variational.sample(K)
+            self._bounds[K] = (tf.squeeze(self._bound(x, z, 1, K)), samples)
+
+        sess = get_session()
+        op, samples = self._bounds[K]
+        return np.mean([sess.run(op, self.variational.np_dict(samples))
+                        for _ in range(n_repeat)])
+
+    def _bound(self, x, z, n, K):
+        """
+        Vector of n importance weighted bounds, each from K of the
+        n * K samples in z.
+        """
+        with tf.name_scope('q_log_prob'):
+            q_log_prob = tf.zeros([n * K], dtype=get_dtype())
+            for i in range(self.variational.num_factors):
+                q_log_prob += self.variational.log_prob_i(i, z)
+
+        with tf.name_scope('log_prob'):
+            p_log_prob = self.model.log_prob(x, z)
+
+        log_w = tf.reshape(p_log_prob - q_log_prob, [n, K])
+        return log_sum_exp(log_w, 1) - np.log(K)
+
 class MAP(VariationalInference):
     """
     Maximum a posteriori
@@ -375,9 +1032,13 @@ class MAP(VariationalInference):
         VariationalInference.__init__(self, model, variational, data)
 
     def build_loss(self):
-        x = self.data.sample(self.n_data)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
+
         z, _ = self.variational.sample()
-        self.loss = tf.squeeze(self.model.log_prob(x, z))
+        with tf.name_scope('log_prob'):
+            self.loss = tf.squeeze(self.model.log_prob(x, z))
+
         return -self.loss
 
 class Laplace(VariationalInference):
@@ -392,9 +1053,13 @@ class Laplace(VariationalInference):
         VariationalInference.__init__(self, model, variational, data)
 
     def build_loss(self):
-        x = self.data.sample(self.n_data)
+        with tf.name_scope('data'):
+            x = self.data.sample(self.n_data)
+
         z, _ = self.variational.sample()
-        self.loss = tf.squeeze(self.model.log_prob(x, z))
+        with tf.name_scope('log_prob'):
+            self.loss = tf.squeeze(self.model.log_prob(x, z))
+
         return -self.loss
 
     def finalize(self):
@@ -405,4 +1070,235 @@ class Laplace(VariationalInference):
                                      scope='variational')
         inv_cov = hessian(self.model.log_prob(x, z), var_list)
         print("Precision matrix:")
-        print(inv_cov.eval())
+        print(inv_cov.eval(self.data.feed_dict()))
+
+def _flatten_grad(grad, var):
+    """Flatten a gradient into a vector, as zeros if it is None."""
+    if grad is None:
+        return tf.zeros([int(np.prod(var.get_shape().as_list()))],
+                        dtype=var.dtype.base_dtype)
+
+    return tf.reshape(tf.convert_to_tensor(grad), [-1])
+
+def _op_costs(run_metadata):
+    """
+    Time spent in each component of the loss during a traced step.
+
+    Ops are attributed to a component by the name scope in which the
+    loss builds them: 'data', 'q_sample', 'q_log_prob', 'log_prob',
+    'log_lik', 'kl', or 'entropy'. Gradient ops count toward their
+    component with a '_grad' suffix, and all remaining ops toward
+    'other'. Time spent in Python functions embedded in the graph,
+    such as the log density of a Stan or PyMC3 model, is also
+    reported separately under 'py_func'.
+
+    Returns
+    -------
+    dict
+        Total time in seconds of the ops in each component.
+    """
+    costs = {}
+    for dev_stats in run_metadata.step_stats.dev_stats:
+        for node_stats in dev_stats.node_stats:
+            seconds = node_stats.all_end_rel_micros * 1e-6
+            key = _component(node_stats.node_name)
+            costs[key] = costs.get(key, 0.0) + seconds
+            if 'PyFunc' in node_stats.node_name.split('/')[-1]:
+                costs['py_func'] = costs.get('py_func', 0.0) + seconds
+
+    return costs
+
+_COMPONENTS = ['data', 'q_sample', 'q_log_prob', 'log_prob', 'log_lik',
+               'kl', 'entropy']
+
+def _component(name):
+    """Component of the loss which the op of the given name is in."""
+    scopes = name.split('/')
+    suffix = ''
+    if scopes[0] == 'gradients' and len(scopes) > 1:
+        scopes = scopes[1:]
+        suffix = '_grad'
+
+    scope = scopes[0]
+    if scope not in _COMPONENTS:
+        # Repeated name scopes are uniquified as 'log_prob_1'.
+        scope = scope.rstrip('0123456789').rstrip('_')
+
+    if scope in _COMPONENTS:
+        return scope + suffix
+    else:
+        return 'other'
+
+# Sources of the rows of unrolled loops: the name scope of the ops
+# producing them, and the sizes their rows may scale with.
+_SOURCES = {'q_sample': ['n_minibatch'], 'data': ['n_data', 'N']}
+
+def _graph_report(graph, fetches, sizes, n_largest=10):
+    """
+    Op counts, unrolled loops, and memory of the tensors in a graph.
+
+    See VariationalInference.graph_report().
+    """
+    ops = graph.get_operations()
+    counts = {}
+    for op in ops:
+        key = _component(op.name)
+        counts[key] = counts.get(key, 0) + 1
+
+    return {'ops': counts,
+            'n_ops': len(ops),
+            'unrolled': _unrolled(ops, sizes),
+            'memory': _peak_memory(ops, fetches, n_largest)}
+
+def _unrolled(ops, sizes):
+    """
+    Unrolled Python loops over the rows of the latent variables or
+    the data.
+
+    An unrolled loop unpacks a tensor into one tensor per row, or
+    packs one tensor per row back together. Such an Unpack or Pack op
+    is flagged if the rows are computed from the samples of the
+    variational model or from the data, and their number is the size
+    of that source. The ops built for a single row are those which
+    depend on exactly one row of an Unpack, or which exactly one row
+    of a Pack depends on.
+
+    Ops are labelled in one pass in topological order, the order in
+    which they were created, and one pass in reverse.
+    """
+    # 1. The sources each op depends on, and for each flagged Unpack,
+    # the row it depends on, or -1 if it depends on several.
+    sources = {}
+    unpack_rows = {}
+    flags = {}
+    for op in ops:
+        srcs = set()
+        rows = {}
+        for t in op.inputs:
+            srcs.update(sources[t.op])
+            _merge_rows(rows, unpack_rows[t.op])
+            if t.op.type == 'Unpack' and t.op in flags:
+                _merge_rows(rows, {t.op: t.value_index})
+
+        scope = _component(op.name)
+        if scope in _SOURCES:
+            srcs.add(scope)
+
+        sources[op] = srcs
+        unpack_rows[op] = rows
+        if op.type == 'Unpack':
+            _flag(flags, op, len(op.outputs), srcs, sizes)
+        elif op.type == 'Pack':
+            _flag(flags, op, len(op.inputs), srcs, sizes)
+
+    # 2. For each flagged Pack, the row which each op feeds into, or
+    # -1 if it feeds into several.
+    pack_rows = dict((op, {}) for op in ops)
+    for op in reversed(ops):
+        rows = pack_rows[op]
+        for i, t in enumerate(op.inputs):
+            if op.type == 'Pack' and op in flags:
+                _merge_rows(pack_rows[t.op], {op: i})
+
+            _merge_rows(pack_rows[t.op], rows)
+
+    # 3. Count the ops built for a single row.
+    n_single = dict((op, 0) for op in flags)
+    for op in ops:
+        for labels in [unpack_rows[op], pack_rows[op]]:
+            for flagged, row in labels.items():
+                if row >= 0:
+                    n_single[flagged] += 1
+
+    out = []
+    for op, flag in flags.items():
+        flag['ops_per_row'] = n_single[op] // flag['rows']
+        flag['ops'] = n_single[op]
+        out += [flag]
+
+    return sorted(out, key=lambda f: (-f['ops'], f['op']))
+
+def _flag(flags, op, n_rows, srcs, sizes):
+    """Flag op as an unrolled loop if n_rows is the size of a source."""
+    names = sorted(set([name for scope in srcs for name in _SOURCES[scope]
+                        if sizes.get(name) == n_rows]))
+    if names:
+        flags[op] = {'op': op.name, 'type': op.type,
+                     'component': _component(op.name),
+                     'scales_with': names, 'rows': n_rows}
+
+def _merge_rows(rows, other):
+    """Merge the row labels other into rows, in place."""
+    for op, row in other.items():
+        if rows.get(op, row) != row:
+            rows[op] = -1
+        else:
+            rows[op] = row
+
+def _peak_memory(ops, fetches, n_largest=10):
+    """
+    Estimate the peak memory of the tensors in one run of fetches.
+
+    The ops which the fetches depend on are run one at a time, in
+    topological order, and each output is freed once its last
+    consumer has run. Variables are resident throughout.
+    """
+    # Ops run in a step: the ancestors of the fetches.
+    step = set()
+    stack = [getattr(fetch, 'op', fetch) for fetch in fetches]
+    while stack:
+        op = stack.pop()
+        if op in step:
+            continue
+
+        step.add(op)
+        stack += [t.op for t in op.inputs] + list(op.control_inputs)
+
+    ops = [op for op in ops if op in step]
+    last_use = {}
+    for i, op in enumerate(ops):
+        for t in op.inputs:
+            last_use[t] = i
+
+    resident = 0
+    live = 0
+    peak = 0
+    n_unknown = 0
+    allocated = {}
+    largest = []
+    for i, op in enumerate(ops):
+        for t in op.outputs:
+            if t.dtype.is_ref_dtype and op.type not in ('Variable',
+                                                        'VariableV2'):
+                # A reference to a variable's memory.
+                continue
+
+            shape = t.get_shape()
+            if shape.ndims is None or not shape.is_fully_defined():
+                n_unknown += 1
+                continue
+
+            try:
+                itemsize = t.dtype.base_dtype.size
+            except (AttributeError, TypeError):
+                continue
+
+            n_bytes = int(np.prod(shape.as_list())) * itemsize
+            largest += [(n_bytes, t.name)]
+            if t.dtype.is_ref_dtype:
+                resident += n_bytes
+            else:
+                allocated[t] = n_bytes
+                live += n_bytes
+
+        peak = max(peak, live)
+        for t in set(op.inputs).union(op.outputs):
+            if t in allocated and last_use.get(t, i) <= i:
+                live -= allocated.pop(t)
+
+    largest = sorted(largest, reverse=True)[:n_largest]
+    return {'peak_bytes': resident + peak,
+            'variable_bytes': resident,
+            'n_unknown': n_unknown,
+            'largest': [{'tensor': name, 'bytes': n_bytes}
+                        for n_bytes, name in largest]}
@@ -1,3 +1,4 @@
 from __future__ import absolute_import
 from .models import *
 from .distributions import *
+from .gp import *
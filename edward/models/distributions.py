@@ -2,13 +2,18 @@ from __future__ import print_function
 import numpy as np
 import tensorflow as tf
 
-from edward.stats import bernoulli, beta, norm, dirichlet, invgamma, multinomial
-from edward.util import cumprod, get_session
+from edward.stats import bernoulli, beta, norm, dirichlet, gamma, invgamma, multinomial
+from edward.stats import has_kl as has_kl_divergence, kl as kl_divergence
+from edward.stats.distributions import Norm
+from edward.util import cumprod, get_dims, get_dtype, get_session
 
 class Variational:
     """A container for collecting distribution objects."""
-    def __init__(self, layers=[]):
+    def __init__(self, layers=None):
         get_session()
+        if layers is None:
+            layers = []
+
         self.layers = layers
         if layers == []:
             self.num_factors = 0
@@ -22,11 +27,10 @@ class Variational:
             self.num_factors = sum([layer.num_factors for layer in self.layers])
             self.num_vars = sum([layer.num_vars for layer in self.layers])
             self.num_params = sum([layer.num_params for layer in self.layers])
-            self.is_reparam = all(['reparam' in layer.__class__.__dict__
-                                   for layer in self.layers])
+            self.is_reparam = all([layer.is_reparam for layer in self.layers])
             self.is_normal = all([isinstance(layer, Normal)
                                   for layer in self.layers])
-            self.is_entropy = all(['entropy' in layer.__class__.__dict__
+            self.is_entropy = all([_overrides(layer, 'entropy')
                                    for layer in self.layers])
             self.sample_tensor = [layer.sample_tensor for layer in self.layers]
 
@@ -53,11 +57,21 @@ class Variational:
         self.num_factors += layer.num_factors
         self.num_vars += layer.num_vars
         self.num_params += layer.num_params
-        self.is_reparam = self.is_reparam and 'reparam' in layer.__class__.__dict__
-        self.is_entropy = self.is_entropy and 'entropy' in layer.__class__.__dict__
+        self.is_reparam = self.is_reparam and layer.is_reparam
+        self.is_entropy = self.is_entropy and _overrides(layer, 'entropy')
         self.is_normal = self.is_normal and isinstance(layer, Normal)
         self.sample_tensor += [layer.sample_tensor]
 
+    def build(self, x):
+        """
+        Build the parameters of any local layers, such as
+        AmortizedNormal, as a function of the data x. This is called
+        by inference on each minibatch before sampling.
+        """
+        for layer in self.layers:
+            if layer.is_local:
+                layer.build(x)
+
     def sample(self, size=1):
         """
         Draws a mix of tensors and placeholders, corresponding to
@@ -79,9 +93,9 @@ class Variational:
         samples = []
         for layer in self.layers:
             if layer.sample_tensor:
-                samples += [layer.sample(size)]
+                samples += [tf.cast(layer.sample(size), get_dtype())]
             else:
-                samples += [tf.placeholder(tf.float32, (size, layer.num_vars))]
+                samples += [tf.placeholder(get_dtype(), (size, layer.num_vars))]
 
         return tf.concat(1, samples), samples
 
@@ -111,7 +125,7 @@ class Variational:
         raise IndexError()
 
     def entropy(self):
-        out = tf.constant(0.0, dtype=tf.float32)
+        out = tf.constant(0.0, dtype=get_dtype())
         for layer in self.layers:
             out += layer.entropy()
 
@@ -125,6 +139,14 @@ class Distribution:
     ----------
     num_factors : int
         Number of factors.
+
+    Notes
+    -----
+    A layer is local (is_local) if its latent variables are specific
+    to each data point in the current minibatch, rather than global.
+    It is reparameterizable (is_reparam) if it implements reparam(),
+    in which case inference may use reparameterization gradients for
+    it, and score function gradients for the other layers.
     """
     def __init__(self, num_factors=1):
         get_session()
@@ -132,6 +154,8 @@ class Distribution:
         self.num_vars = None
         self.num_params = None
         self.sample_tensor = False
+        self.is_local = False
+        self.is_reparam = _overrides(self, 'reparam')
 
     def sample_noise(self, size=1):
         """
@@ -204,6 +228,42 @@ class Distribution:
         """
         raise NotImplementedError()
 
+    def kl(self, p, p_params):
+        """
+        KL(q(x | params) || p(x | p_params)), summed over factors,
+        where q is this distribution. It is analytic, from the
+        registry in edward.stats (see edward.stats.kl()).
+
+        Parameters
+        ----------
+        p : object
+            Distribution in edward.stats, e.g., norm.
+        p_params : list
+            Parameters of p, which broadcast against those of q.
+
+        Returns
+        -------
+        tf.Tensor
+            scalar
+        """
+        q, q_params = self.stats_params()
+        return tf.reduce_sum(kl_divergence(q, q_params, p, p_params))
+
+    def has_kl(self, p):
+        """
+        Whether kl() is analytic for priors of the distribution p in
+        edward.stats.
+        """
+        q, q_params = self.stats_params()
+        return q is not None and has_kl_divergence(q, p)
+
+    def stats_params(self):
+        """
+        The distribution in edward.stats of the same family, and the
+        parameters in its order, or (None, None) if there is none.
+        """
+        return None, None
+
     def entropy(self):
         """
         H(p(x| params))
@@ -229,7 +289,7 @@ class Bernoulli(Distribution):
         self.sample_tensor = False
 
         if p is None:
-            p_unconst = tf.Variable(tf.random_normal([self.num_params]))
+            p_unconst = tf.Variable(tf.random_normal([self.num_params], dtype=get_dtype()))
             p = tf.sigmoid(p_unconst)
 
         self.p = p
@@ -254,6 +314,9 @@ class Bernoulli(Distribution):
 
         return bernoulli.logpmf(xs[:, i], self.p[i])
 
+    def stats_params(self):
+        return bernoulli, [self.p]
+
     def entropy(self):
         return tf.reduce_sum(bernoulli.entropy(self.p))
 
@@ -261,19 +324,23 @@ class Beta(Distribution):
     """
     p(x | params) = prod_{i=1}^d Beta(x[i] | alpha[i], beta[i])
     where params = {alpha, beta}.
+
+    Samples are reparameterized as x = g_1 / (g_1 + g_2), for
+    g_1 ~ Gamma(alpha, 1) and g_2 ~ Gamma(beta, 1) (see
+    _gamma_noise()).
     """
     def __init__(self, num_factors=1, alpha=None, beta=None):
         Distribution.__init__(self, num_factors)
         self.num_vars = self.num_factors
         self.num_params = 2*self.num_factors
-        self.sample_tensor = False
+        self.sample_tensor = True
 
         if alpha is None:
-            alpha_unconst = tf.Variable(tf.random_normal([self.num_vars]))
+            alpha_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
             alpha = tf.nn.softplus(alpha_unconst)
 
         if beta is None:
-            beta_unconst = tf.Variable(tf.random_normal([self.num_vars]))
+            beta_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
             beta = tf.nn.softplus(beta_unconst)
 
         self.alpha = alpha
@@ -285,15 +352,22 @@ class Beta(Distribution):
         return "shape: \n" + a.__str__() + "\n" + \
                "scale: \n" + b.__str__()
 
-    def sample(self, size=1):
-        """x ~ p(x | params)"""
-        sess = get_session()
-        a, b = sess.run([self.alpha, self.beta])
-        x = np.zeros((size, self.num_vars))
-        for d in range(self.num_vars):
-            x[:, d] = beta.rvs(a[d], b[d], size=size)
+    def sample_noise(self, size=1):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return [_gamma_noise(self.alpha, size),
+                _gamma_noise(self.beta, size)]
 
-        return x
+    def reparam(self, eps):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        x = _gamma_reparam(eps[0], self.alpha)
+        y = _gamma_reparam(eps[1], self.beta)
+        return x / (x + y)
 
     def log_prob_i(self, i, xs):
         """log p(x_i | params)"""
@@ -302,6 +376,9 @@ class Beta(Distribution):
 
         return beta.logpdf(xs[:, i], self.alpha[i], self.beta[i])
 
+    def stats_params(self):
+        return beta, [self.alpha, self.beta]
+
     def entropy(self):
         return tf.reduce_sum(beta.entropy(self.alpha, self.beta))
 
@@ -310,6 +387,9 @@ class Dirichlet(Distribution):
     p(x | params) = prod_{i=1}^d Dirichlet(x_i | alpha[i, :])
     where x is a flattened vector such that x_i represents
     the ith factor x[(i-1)*K:i*K], and params = alpha.
+
+    Samples are reparameterized by normalizing K independent
+    Gamma(alpha[i, k], 1) variables (see _gamma_noise()).
     """
     def __init__(self, shape, alpha=None):
         num_factors = shape[0]
@@ -318,10 +398,10 @@ class Dirichlet(Distribution):
         self.num_vars = K*num_factors
         self.num_params = K*num_factors
         self.K = K # dimension of each factor
-        self.sample_tensor = False
+        self.sample_tensor = True
 
         if alpha is None:
-            alpha_unconst = tf.Variable(tf.random_normal([self.num_factors, self.K]))
+            alpha_unconst = tf.Variable(tf.random_normal([self.num_factors, self.K], dtype=get_dtype()))
             alpha = tf.nn.softplus(alpha_unconst)
 
         self.alpha = alpha
@@ -330,15 +410,21 @@ class Dirichlet(Distribution):
         alpha = self.alpha.eval()
         return "concentration vector: \n" + alpha.__str__()
 
-    def sample(self, size=1):
-        """x ~ p(x | params)"""
-        alpha = self.alpha.eval()
-        x = np.zeros((size, self.num_vars))
-        for i in range(self.num_factors):
-            x[:, (i*self.K):((i+1)*self.K)] = dirichlet.rvs(alpha[i, :],
-                                                            size=size)
+    def sample_noise(self, size=1):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return _gamma_noise(self.alpha, size)
 
-        return x
+    def reparam(self, eps):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        g = _gamma_reparam(eps, self.alpha)
+        x = g / tf.reduce_sum(g, 2, keep_dims=True)
+        return tf.reshape(x, [-1, self.num_vars])
 
     def log_prob_i(self, i, xs):
         """log p(x_i | params)"""
@@ -350,26 +436,90 @@ class Dirichlet(Distribution):
         return dirichlet.logpdf(xs[:, (i*self.K):((i+1)*self.K)],
                                 self.alpha[i, :])
 
+    def stats_params(self):
+        return dirichlet, [self.alpha]
+
     def entropy(self):
         return tf.reduce_sum(dirichlet.entropy(self.alpha))
 
+class Gamma(Distribution):
+    """
+    p(x | params) = prod_{i=1}^d Gamma(x[i] | alpha[i], beta[i])
+    where params = {alpha, beta}, and beta is the scale.
+
+    Samples are reparameterized as x = beta * g, for g ~ Gamma(alpha, 1)
+    (see _gamma_noise()).
+    """
+    def __init__(self, num_factors=1, alpha=None, beta=None):
+        Distribution.__init__(self, num_factors)
+        self.num_vars = self.num_factors
+        self.num_params = 2*self.num_factors
+        self.sample_tensor = True
+
+        if alpha is None:
+            alpha_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
+            alpha = tf.nn.softplus(alpha_unconst)
+
+        if beta is None:
+            beta_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
+            beta = tf.nn.softplus(beta_unconst)
+
+        self.alpha = alpha
+        self.beta = beta
+
+    def __str__(self):
+        sess = get_session()
+        a, b = sess.run([self.alpha, self.beta])
+        return "shape: \n" + a.__str__() + "\n" + \
+               "scale: \n" + b.__str__()
+
+    def sample_noise(self, size=1):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return _gamma_noise(self.alpha, size)
+
+    def reparam(self, eps):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return self.beta * _gamma_reparam(eps, self.alpha)
+
+    def log_prob_i(self, i, xs):
+        """log p(x_i | params)"""
+        if i >= self.num_factors:
+            raise IndexError()
+
+        return gamma.logpdf(xs[:, i], self.alpha[i], self.beta[i])
+
+    def stats_params(self):
+        return gamma, [self.alpha, self.beta]
+
+    def entropy(self):
+        return tf.reduce_sum(gamma.entropy(self.alpha, self.beta))
+
 class InvGamma(Distribution):
     """
     p(x | params) = prod_{i=1}^d Inv_Gamma(x[i] | alpha[i], beta[i])
     where params = {alpha, beta}.
+
+    Samples are reparameterized as x = beta / g, for
+    g ~ Gamma(alpha, 1) (see _gamma_noise()).
     """
     def __init__(self, num_factors=1, alpha=None, beta=None):
         Distribution.__init__(self, num_factors)
         self.num_vars = self.num_factors
         self.num_params = 2*self.num_factors
-        self.sample_tensor = False
+        self.sample_tensor = True
 
         if alpha is None:
-            alpha_unconst = tf.Variable(tf.random_normal([self.num_vars]))
+            alpha_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
             alpha = tf.nn.softplus(alpha_unconst) + 1e-2
 
         if beta is None:
-            beta_unconst = tf.Variable(tf.random_normal([self.num_vars]))
+            beta_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
             beta = tf.nn.softplus(beta_unconst) + 1e-2
 
         self.alpha = alpha
@@ -381,15 +531,19 @@ class InvGamma(Distribution):
         return "shape: \n" + a.__str__() + "\n" + \
                "scale: \n" + b.__str__()
 
-    def sample(self, size=1):
-        """x ~ p(x | params)"""
-        sess = get_session()
-        a, b = sess.run([self.alpha, self.beta])
-        x = np.zeros((size, self.num_vars))
-        for d in range(self.num_vars):
-            x[:, d] = invgamma.rvs(a[d], b[d], size=size)
+    def sample_noise(self, size=1):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return _gamma_noise(self.alpha, size)
 
-        return x
+    def reparam(self, eps):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return self.beta / _gamma_reparam(eps, self.alpha)
 
     def log_prob_i(self, i, xs):
         """log p(x_i | params)"""
@@ -398,9 +552,41 @@ class InvGamma(Distribution):
 
         return invgamma.logpdf(xs[:, i], self.alpha[i], self.beta[i])
 
+    def stats_params(self):
+        return invgamma, [self.alpha, self.beta]
+
     def entropy(self):
         return tf.reduce_sum(invgamma.entropy(self.alpha, self.beta))
 
+class Empirical(Distribution):
+    """
+    Empirical distribution of a set of samples,
+
+    p(x | params) = 1/S sum_{s=1}^S Dirac(x | params[s, :])
+
+    where params is a Trace of S samples, e.g., from a Markov chain
+    Monte Carlo sampler. Sampling draws rows of the trace uniformly at
+    random, reading only the chunks which contain them.
+
+    Parameters
+    ----------
+    trace : Trace
+        Samples, each of size num_vars.
+    """
+    def __init__(self, trace):
+        Distribution.__init__(self, 1)
+        self.num_vars = trace.num_vars
+        self.num_params = 0
+        self.sample_tensor = False
+        self.trace = trace
+
+    def __str__(self):
+        return self.trace.__str__()
+
+    def sample(self, size=1):
+        """x ~ p(x | params)"""
+        return self.trace.sample(size)
+
 class Multinomial(Distribution):
     """
     p(x | params ) = prod_{i=1}^d Multinomial(x_i | pi[i, :])
@@ -426,11 +612,11 @@ class Multinomial(Distribution):
 
         if pi is None:
             # Transform a real (K-1)-vector to K-dimensional simplex.
-            pi_unconst = tf.Variable(tf.random_normal([self.num_factors, self.K-1]))
-            eq = -tf.log(tf.cast(self.K - 1 - tf.range(self.K-1), dtype=tf.float32))
+            pi_unconst = tf.Variable(tf.random_normal([self.num_factors, self.K-1], dtype=get_dtype()))
+            eq = -tf.log(tf.cast(self.K - 1 - tf.range(self.K-1), dtype=get_dtype()))
             x = tf.sigmoid(eq + pi_unconst)
-            pil = tf.concat(1, [x, tf.ones([self.num_factors, 1])])
-            piu = tf.concat(1, [tf.ones([self.num_factors, 1]), 1.0 - x])
+            pil = tf.concat(1, [x, tf.ones([self.num_factors, 1], dtype=get_dtype())])
+            piu = tf.concat(1, [tf.ones([self.num_factors, 1], dtype=get_dtype()), 1.0 - x])
             # cumulative product along 1st axis
             S = tf.pack([cumprod(piu_x) for piu_x in tf.unpack(piu)])
             pi = S * pil
@@ -461,6 +647,9 @@ class Multinomial(Distribution):
         return multinomial.logpmf(xs[:, (i*self.K):((i+1)*self.K)],
                                   1, self.pi[i, :])
 
+    def stats_params(self):
+        return multinomial, [1, self.pi]
+
     def entropy(self):
         return tf.reduce_sum(multinomial.entropy(1, self.pi))
 
@@ -476,10 +665,10 @@ class Normal(Distribution):
         self.sample_tensor = True
 
         if loc is None:
-            loc = tf.Variable(tf.random_normal([self.num_vars]))
+            loc = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
 
         if scale is None:
-            scale_unconst = tf.Variable(tf.random_normal([self.num_vars]))
+            scale_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
             scale = tf.nn.softplus(scale_unconst)
 
         self.loc = loc
@@ -496,7 +685,7 @@ class Normal(Distribution):
         eps = sample_noise() ~ s(eps)
         s.t. x = reparam(eps; params) ~ p(x | params)
         """
-        return tf.random_normal((size, self.num_vars))
+        return tf.random_normal((size, self.num_vars), dtype=self.loc.dtype)
 
     def reparam(self, eps):
         """
@@ -514,9 +703,482 @@ class Normal(Distribution):
         scalei = self.scale[i]
         return norm.logpdf(xs[:, i], loci, scalei)
 
+    def stats_params(self):
+        return norm, [self.loc, self.scale]
+
     def entropy(self):
         return tf.reduce_sum(norm.entropy(scale=self.scale))
 
+class AmortizedNormal(Normal):
+    """
+    p(z | x) = prod_{n=1}^{n_data} prod_{k=1}^K
+               Normal(z[n, k] | loc(x_n)[k], scale(x_n)[k])
+    where loc, scale = network(x) is an inference network, whose
+    parameters are shared across data points.
+
+    The latent variables are local: there are K for each data point in
+    the current minibatch x, so only the minibatch's are represented.
+    z is flattened such that z_n is z[(n-1)*K:n*K].
+
+    Parameters
+    ----------
+    shape : tuple
+        (n_data, K), the number of data points in a minibatch and the
+        number of latent variables for each.
+    network : function
+        Function taking a minibatch of data x and returning the
+        tensors [loc, scale], each n_data x K.
+    scope : str, optional
+        Variable scope in which to build the network. Its variables are
+        reused when the network is built again, e.g., on held-out data.
+
+    Notes
+    -----
+    The parameters loc and scale only exist after build() is called on
+    a minibatch, which inference does before sampling. They are those
+    of the last data built, e.g., by criticisms on held-out data.
+    """
+    def __init__(self, shape, network, scope='inference_network'):
+        n_data = shape[0]
+        K = shape[-1]
+        Distribution.__init__(self, n_data*K)
+        self.num_vars = self.num_factors
+        self.num_params = 0 # parameters are those of the network
+        self.sample_tensor = True
+        self.is_local = True
+        self.n_data = n_data
+        self.K = K
+        self.network = network
+        self.scope = scope
+        self._scope = None
+        self.loc = None
+        self.scale = None
+
+    def __str__(self):
+        return "inference network: \n" + \
+               "{:d} data points x {:d} latent variables".format(self.n_data,
+                                                                 self.K)
+
+    def build(self, x):
+        """
+        Set loc and scale to the output of the network on the
+        minibatch x.
+        """
+        if self._scope is None:
+            with tf.variable_scope(self.scope) as scope:
+                loc, scale = self.network(x)
+
+            self._scope = scope
+        else:
+            with tf.variable_scope(self._scope, reuse=True):
+                loc, scale = self.network(x)
+
+        self.loc = tf.reshape(loc, [-1])
+        self.scale = tf.reshape(scale, [-1])
+
+    def sample_noise(self, size=1):
+        # The number of latent variables is that of the data last
+        # built, which need not be a minibatch of n_data points.
+        n_vars = self.loc.get_shape()[0].value
+        if n_vars is None:
+            shape = tf.pack([size, tf.shape(self.loc)[0]])
+        else:
+            shape = (size, n_vars)
+
+        return tf.random_normal(shape, dtype=self.loc.dtype)
+
+class IndexedNormal(Normal):
+    """
+    p(z | params) = prod_{n in idx} prod_{k=1}^K
+                    Normal(z[n, k] | loc[n, k], scale[n, k])
+    where params = {loc, scale} are N x K matrices, one row for each
+    data point, and idx are the rows of the current minibatch.
+
+    The latent variables are local, and only the rows idx of the
+    parameters are gathered and sampled, so the cost of a step scales
+    with the minibatch size n_data rather than N. Their gradients are
+    sparse (tf.IndexedSlices), and inference updates only those rows.
+    z is flattened such that z_n is z[(n-1)*K:n*K], for the nth row
+    in idx.
+
+    Parameters
+    ----------
+    shape : tuple
+        (N, K), the number of data points and the number of latent
+        variables for each.
+    n_data : int
+        Number of data points in a minibatch.
+    idx : tf.Tensor, optional
+        n_data vector of the row indices of the minibatch. Default is
+        a placeholder, to be fed with each minibatch of data, e.g., via
+        inference.update(feed_dict). As inference.run() feeds nothing,
+        it requires idx to be given.
+
+    Notes
+    -----
+    loc and scale are the parameters of the minibatch's rows, and
+    loc_all and scale_all those of all rows.
+    """
+    def __init__(self, shape, n_data, idx=None):
+        N = shape[0]
+        K = shape[-1]
+        Distribution.__init__(self, n_data*K)
+        self.num_vars = self.num_factors
+        self.num_params = 2*N*K
+        self.sample_tensor = True
+        self.is_local = True
+        self.N = N
+        self.n_data = n_data
+        self.K = K
+
+        if idx is None:
+            idx = tf.placeholder(tf.int32, [n_data], name='idx')
+
+        self.idx = idx
+        loc_all = tf.Variable(tf.random_normal([N, K], dtype=get_dtype()))
+        scale_unconst = tf.Variable(tf.random_normal([N, K], dtype=get_dtype()))
+        self.row_variables = [loc_all, scale_unconst]
+        self.loc_all = loc_all
+        self.scale_all = tf.nn.softplus(scale_unconst)
+        # Gather before transforming, so the gradients stay sparse.
+        self.loc = tf.reshape(tf.gather(loc_all, idx), [-1])
+        self.scale = tf.reshape(tf.nn.softplus(tf.gather(scale_unconst, idx)),
+                                [-1])
+
+    def __str__(self):
+        sess = get_session()
+        m, s = sess.run([self.loc_all, self.scale_all])
+        return "mean: \n" + m.__str__() + "\n" + \
+               "std dev: \n" + s.__str__()
+
+    def build(self, x):
+        """The minibatch's rows are given by idx, so this does nothing."""
+        pass
+
+class NormalFullRank(Distribution):
+    """
+    p(x | params) = Normal(x | loc, scale_tril scale_tril^T)
+    where params = {loc, scale_tril}, and scale_tril is the lower
+    triangular Cholesky factor of the covariance.
+
+    Unlike Normal, the latent variables are correlated. It is a single
+    factor of num_vars variables. Sampling and the log density cost
+    O(d^2) for d = num_vars, using triangular matrix products and
+    solves, and the entropy O(d).
+
+    Parameters
+    ----------
+    num_vars : int, optional
+        Number of latent variables d.
+    loc : tf.Tensor, optional
+        d vector.
+    scale_tril : tf.Tensor, optional
+        d x d lower triangular matrix with positive diagonal. Default
+        is a diagonal with softplus-transformed entries plus an
+        unconstrained strictly lower triangle, initialized to zero.
+    """
+    def __init__(self, num_vars=1, loc=None, scale_tril=None):
+        Distribution.__init__(self, 1)
+        self.num_vars = num_vars
+        self.num_params = num_vars + num_vars*(num_vars+1)//2
+        self.sample_tensor = True
+
+        if loc is None:
+            loc = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
+
+        if scale_tril is None:
+            diag_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
+            lower = tf.Variable(tf.zeros([self.num_vars, self.num_vars], dtype=get_dtype()))
+            mask = np.tril(np.ones((self.num_vars, self.num_vars)), -1)
+            scale_tril = lower * tf.constant(mask, dtype=get_dtype()) + \
+                         tf.diag(tf.nn.softplus(diag_unconst))
+
+        self.loc = loc
+        self.scale_tril = scale_tril
+
+    def __str__(self):
+        sess = get_session()
+        m, L = sess.run([self.loc, self.scale_tril])
+        return "mean: \n" + m.__str__() + "\n" + \
+               "covariance: \n" + np.dot(L, L.T).__str__()
+
+    def sample_noise(self, size=1):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return tf.random_normal((size, self.num_vars), dtype=self.loc.dtype)
+
+    def reparam(self, eps):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return self.loc + tf.matmul(eps, self.scale_tril, transpose_b=True)
+
+    def log_prob_i(self, i, xs):
+        """log p(x_i | params)"""
+        if i >= self.num_factors:
+            raise IndexError()
+
+        # Solve scale_tril y = x - loc for each row of xs.
+        r = tf.cast(xs, self.loc.dtype) - self.loc
+        y = tf.matrix_triangular_solve(self.scale_tril, tf.transpose(r),
+                                       lower=True)
+        return -0.5 * self.num_vars * np.log(2*np.pi) - \
+               0.5 * self._log_det_cov() - \
+               0.5 * tf.reduce_sum(tf.square(y), 0)
+
+    def has_kl(self, p):
+        return isinstance(p, Norm)
+
+    def kl(self, p, p_params):
+        """
+        KL(q(x | params) || prod_{i=1}^d Normal(x[i] | loc[i], scale[i]))
+        where p_params = [loc, scale], in O(d^2).
+        """
+        var_diag = tf.reduce_sum(tf.square(self.scale_tril), 1)
+        return _kl_full_normal(self.loc, var_diag, self._log_det_cov(),
+                               p_params)
+
+    def entropy(self):
+        return 0.5 * self.num_vars * (1.0 + np.log(2*np.pi)) + \
+               0.5 * self._log_det_cov()
+
+    def _log_det_cov(self):
+        return 2.0 * tf.reduce_sum(tf.log(tf.diag_part(self.scale_tril)))
+
+class NormalLowRank(Distribution):
+    """
+    p(x | params) = Normal(x | loc, diag(scale)^2 + factor factor^T)
+    where params = {loc, scale, factor}, and factor is a d x k matrix
+    for a rank k much smaller than d.
+
+    Unlike Normal, the latent variables are correlated. It is a single
+    factor of num_vars variables. Sampling, the log density and the
+    entropy cost O(dk^2) for d = num_vars, rather than O(d^3), by the
+    Woodbury identity and the matrix determinant lemma: only k x k
+    matrices are factorized.
+
+    Parameters
+    ----------
+    num_vars : int, optional
+        Number of latent variables d.
+    rank : int, optional
+        Rank k of the low-rank part of the covariance.
+    loc : tf.Tensor, optional
+        d vector.
+    scale : tf.Tensor, optional
+        d vector of the standard deviations of the diagonal part.
+    factor : tf.Tensor, optional
+        d x k matrix.
+    """
+    def __init__(self, num_vars=1, rank=1, loc=None, scale=None,
+                 factor=None):
+        Distribution.__init__(self, 1)
+        self.num_vars = num_vars
+        self.num_params = (2 + rank)*num_vars
+        self.rank = rank
+        self.sample_tensor = True
+
+        if loc is None:
+            loc = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
+
+        if scale is None:
+            scale_unconst = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
+            scale = tf.nn.softplus(scale_unconst)
+
+        if factor is None:
+            factor = tf.Variable(tf.random_normal([self.num_vars, self.rank],
+                                                  stddev=0.1,
+                                                  dtype=get_dtype()))
+
+        self.loc = loc
+        self.scale = scale
+        self.factor = factor
+
+    def __str__(self):
+        sess = get_session()
+        m, s, W = sess.run([self.loc, self.scale, self.factor])
+        return "mean: \n" + m.__str__() + "\n" + \
+               "covariance: \n" + (np.diag(s**2) + np.dot(W, W.T)).__str__()
+
+    def sample_noise(self, size=1):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return tf.random_normal((size, self.num_vars + self.rank),
+                                dtype=self.loc.dtype)
+
+    def reparam(self, eps):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        eps_diag = tf.slice(eps, [0, 0], [-1, self.num_vars])
+        eps_factor = tf.slice(eps, [0, self.num_vars], [-1, self.rank])
+        return self.loc + eps_diag * self.scale + \
+               tf.matmul(eps_factor, self.factor, transpose_b=True)
+
+    def log_prob_i(self, i, xs):
+        """log p(x_i | params)"""
+        if i >= self.num_factors:
+            raise IndexError()
+
+        # By the Woodbury identity, with D = diag(scale)^2, W = factor,
+        # and C = I + W^T D^{-1} W,
+        # r^T (D + W W^T)^{-1} r = r^T D^{-1} r - b^T C^{-1} b
+        # for b = W^T D^{-1} r.
+        r = tf.cast(xs, self.loc.dtype) - self.loc
+        r_scaled = r / tf.square(self.scale)
+        b = tf.matmul(r_scaled, self.factor)
+        y = tf.matrix_triangular_solve(self._chol_capacitance(),
+                                       tf.transpose(b), lower=True)
+        quad = tf.reduce_sum(r * r_scaled, 1) - tf.reduce_sum(tf.square(y), 0)
+        return -0.5 * self.num_vars * np.log(2*np.pi) - \
+               0.5 * self._log_det_cov() - 0.5 * quad
+
+    def has_kl(self, p):
+        return isinstance(p, Norm)
+
+    def kl(self, p, p_params):
+        """
+        KL(q(x | params) || prod_{i=1}^d Normal(x[i] | loc[i], scale[i]))
+        where p_params = [loc, scale], in O(dk^2).
+        """
+        var_diag = tf.square(self.scale) + \
+                   tf.reduce_sum(tf.square(self.factor), 1)
+        return _kl_full_normal(self.loc, var_diag, self._log_det_cov(),
+                               p_params)
+
+    def entropy(self):
+        return 0.5 * self.num_vars * (1.0 + np.log(2*np.pi)) + \
+               0.5 * self._log_det_cov()
+
+    def _chol_capacitance(self):
+        """Cholesky factor of C = I + W^T D^{-1} W, a k x k matrix."""
+        factor_scaled = self.factor / tf.expand_dims(tf.square(self.scale), 1)
+        capacitance = tf.matmul(factor_scaled, self.factor, transpose_a=True) + \
+                      tf.diag(tf.ones([self.rank], dtype=self.factor.dtype))
+        return tf.cholesky(capacitance)
+
+    def _log_det_cov(self):
+        # By the matrix determinant lemma,
+        # log det(D + W W^T) = log det(D) + log det(C).
+        return 2.0 * tf.reduce_sum(tf.log(self.scale)) + \
+               2.0 * tf.reduce_sum(tf.log(tf.diag_part(
+                   self._chol_capacitance())))
+
+class TransformedNormal(Distribution):
+    """
+    p(x | params) = prod_{i=1}^d Normal(u_i | loc[i], scale[i]) /
+                    |det dT(u_i) / du_i|
+    where x_i = T(u_i) for a bijection T from the unconstrained space
+    of u_i, and params = {loc, scale}.
+
+    This places a Normal on an unconstrained space, so that
+    constrained latent variables are sampled in the graph with
+    reparameterization gradients. The transforms are
+    + 'log' : x = exp(u), for positive x,
+    + 'softplus' : x = log(1 + exp(u)), for positive x,
+    + 'logit' : x = 1 / (1 + exp(-u)), for x in (0, 1), and
+    + 'stick_breaking' : x in the K-simplex from u in R^{K-1}, where x
+      is a flattened vector such that x_i represents the ith factor
+      x[(i-1)*K:i*K], as for Dirichlet.
+
+    Parameters
+    ----------
+    shape : int or list, optional
+        Number of factors d, or [d, K] for 'stick_breaking'.
+    transform : str, optional
+        Name of the transform T.
+    loc : tf.Tensor, optional
+        Mean of u, a d vector, or d x (K-1) matrix for
+        'stick_breaking'.
+    scale : tf.Tensor, optional
+        Standard deviation of u, of the same shape as loc.
+    """
+    def __init__(self, shape=1, transform='softplus', loc=None, scale=None):
+        if transform not in _TRANSFORMS:
+            raise ValueError("transform must be one of " +
+                             ", ".join(sorted(_TRANSFORMS.keys())) + ".")
+
+        if transform == 'stick_breaking':
+            num_factors = shape[0]
+            K = shape[-1]
+            if K == 1:
+                raise ValueError("The simplex must have dimension K > 1.")
+
+            param_shape = [num_factors, K-1]
+        else:
+            num_factors = shape
+            K = 1
+            param_shape = [num_factors]
+
+        Distribution.__init__(self, num_factors)
+        self.num_vars = K*num_factors
+        self.num_params = 2*int(np.prod(param_shape))
+        self.K = K # dimension of each factor
+        self.sample_tensor = True
+        self.transform = transform
+
+        if loc is None:
+            loc = tf.Variable(tf.random_normal(param_shape, dtype=get_dtype()))
+
+        if scale is None:
+            scale_unconst = tf.Variable(tf.random_normal(param_shape, dtype=get_dtype()))
+            scale = tf.nn.softplus(scale_unconst)
+
+        self.loc = loc
+        self.scale = scale
+
+    def __str__(self):
+        sess = get_session()
+        m, s = sess.run([self.loc, self.scale])
+        return "transform: " + self.transform + "\n" + \
+               "unconstrained mean: \n" + m.__str__() + "\n" + \
+               "unconstrained std dev: \n" + s.__str__()
+
+    def sample_noise(self, size=1):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        return tf.random_normal([size] + get_dims(self.loc),
+                                dtype=self.loc.dtype)
+
+    def reparam(self, eps):
+        """
+        eps = sample_noise() ~ s(eps)
+        s.t. x = reparam(eps; params) ~ p(x | params)
+        """
+        forward, _, _ = _TRANSFORMS[self.transform]
+        u = self.loc + eps * self.scale
+        if self.transform == 'stick_breaking':
+            u = tf.reshape(u, [-1, self.K-1])
+            return tf.reshape(forward(u), [-1, self.num_vars])
+        else:
+            return forward(u)
+
+    def log_prob_i(self, i, xs):
+        """log p(x_i | params)"""
+        # Note this calculates the log density with respect to x_i,
+        # which is the ith factor and not the ith latent variable.
+        if i >= self.num_factors:
+            raise IndexError()
+
+        _, inverse, log_det_jacobian = _TRANSFORMS[self.transform]
+        if self.transform == 'stick_breaking':
+            u = inverse(xs[:, (i*self.K):((i+1)*self.K)])
+            log_prob = tf.reduce_sum(
+                norm.logpdf(u, self.loc[i, :], self.scale[i, :]), 1)
+        else:
+            u = inverse(xs[:, i])
+            log_prob = norm.logpdf(u, self.loc[i], self.scale[i])
+
+        return log_prob - log_det_jacobian(u)
+
 class PointMass(Distribution):
     """
     Point mass distribution
@@ -533,7 +1195,7 @@ class PointMass(Distribution):
         self.sample_tensor = True
 
         if params is None:
-            params = tf.Variable(tf.random_normal([self.num_vars]))
+            params = tf.Variable(tf.random_normal([self.num_vars], dtype=get_dtype()))
 
         self.params = params
 
@@ -561,4 +1223,161 @@ class PointMass(Distribution):
 
         # a vector where the jth element is 1 if xs[j, i] is equal to
         # params[i], 0 otherwise
-        return tf.cast(tf.equal(xs[:, i], self.params[i]), dtype=tf.float32)
+        return tf.cast(tf.equal(xs[:, i], tf.cast(self.params[i], xs.dtype)),
+                       dtype=get_dtype())
+
+def _kl_full_normal(loc, var_diag, log_det_cov, p_params):
+    """
+    KL(Normal(loc, cov) || prod_i Normal(loc_two[i], scale_two[i])) for
+    p_params = [loc_two, scale_two], given the diagonal and the log
+    determinant of cov.
+    """
+    loc_two, scale_two = [tf.cast(param, loc.dtype) for param in p_params]
+    var_two = tf.square(scale_two) + tf.zeros_like(loc)
+    return 0.5 * (tf.reduce_sum((var_diag + tf.square(loc - loc_two)) /
+                                var_two) -
+                  tf.cast(get_dims(loc)[0], loc.dtype) +
+                  tf.reduce_sum(tf.log(var_two)) - log_det_cov)
+
+def _overrides(layer, name):
+    """
+    Whether the class of the layer implements the method of the
+    given name, rather than inheriting it from Distribution.
+    """
+    method = getattr(layer.__class__, name)
+    base = getattr(Distribution, name)
+    return getattr(method, '__func__', method) is not \
+           getattr(base, '__func__', base)
+
+def _gamma_noise(alpha, size=1, n_boost=1, n_proposal=10):
+    """
+    Noise for reparameterized samples of Gamma(alpha, 1), from the
+    rejection sampler of Marsaglia and Tsang (2000) (Naesseth et al.,
+    2017).
+
+    The sampler proposes g = (a - 1/3) (1 + eps / sqrt(9a - 3))^3 for
+    eps ~ N(0, 1), and accepts with a probability depending on a and
+    eps. It is run on the boosted shape a = alpha + n_boost, which
+    the sampler requires to be at least 1, and n_boost uniforms map
+    samples back to shape alpha (see _gamma_reparam()).
+
+    The accepted eps is held fixed, so the gradient is taken through
+    the proposal only. This omits a correction term of the gradient,
+    whose magnitude decreases quickly with the shape; the boost keeps
+    it negligible.
+
+    Parameters
+    ----------
+    alpha : tf.Tensor
+        Shape parameters, of any shape.
+    size : int, optional
+        Number of samples.
+    n_boost : int, optional
+        Number of boosting steps.
+    n_proposal : int, optional
+        Number of proposals drawn in parallel for each sample. Each is
+        accepted with probability above 0.95, so the first accepted
+        one is taken.
+
+    Returns
+    -------
+    list
+        [eps, u], the accepted proposals, of shape [size] +
+        alpha.shape, and the uniforms, of shape [n_boost, size] +
+        alpha.shape.
+    """
+    a = tf.stop_gradient(alpha) + n_boost
+    shape = [size] + get_dims(a)
+    d = a - 1.0/3.0
+    c = 1.0 / tf.sqrt(9.0 * d)
+    eps = tf.random_normal([n_proposal] + shape, dtype=a.dtype)
+    u = tf.random_uniform([n_proposal] + shape, dtype=a.dtype)
+    v = tf.pow(1.0 + c * eps, 3)
+    log_accept = 0.5 * tf.square(eps) + d - d * v + \
+                 d * tf.log(tf.maximum(v, 1e-30))
+    accept = tf.logical_and(tf.greater(v, 0.0),
+                            tf.less(tf.log(u), log_accept))
+    # Select the first accepted proposal for each sample. If none is
+    # accepted, this falls back to the first proposal.
+    first = tf.argmax(tf.cast(accept, a.dtype), 0)
+    index = tf.reshape(tf.range(n_proposal), [n_proposal] + [1] * len(shape))
+    chosen = tf.equal(index, tf.expand_dims(tf.cast(first, tf.int32), 0))
+    eps = tf.reduce_sum(eps * tf.cast(chosen, a.dtype), 0)
+    u_boost = tf.random_uniform([n_boost] + shape, dtype=a.dtype)
+    return [tf.stop_gradient(eps), tf.stop_gradient(u_boost)]
+
+def _gamma_reparam(eps, alpha):
+    """
+    Reparameterized samples of Gamma(alpha, 1), given the noise
+    [eps, u] of _gamma_noise(), using
+
+    g = g' prod_{i=0}^{n_boost-1} u_i^{1 / (alpha + i)}
+    for g' ~ Gamma(alpha + n_boost, 1) and u_i ~ Uniform(0, 1).
+    """
+    eps, u = eps
+    u = tf.unpack(u)
+    d = alpha + len(u) - 1.0/3.0
+    g = d * tf.pow(1.0 + eps / tf.sqrt(9.0 * d), 3)
+    for i, u_i in enumerate(u):
+        g *= tf.pow(u_i, 1.0 / (alpha + i))
+
+    return g
+
+# Each transform from an unconstrained space is given as (forward,
+# inverse, log_det_jacobian), where log_det_jacobian(u) is
+# log |det dforward(u) / du|. The stick-breaking transform acts on
+# the rows of n x (K-1) matrices, and the others elementwise.
+def _stick_breaking_offset(K, dtype):
+    # The offset maps u = 0 to the center of the simplex.
+    return tf.constant(np.log(K - 1 - np.arange(K - 1)), dtype=dtype)
+
+def _stick_breaking_mask(K, dtype):
+    # mask[j, k] = 1 if j < k, so that matmul(y, mask) sums y[:, j] for
+    # j < k.
+    return tf.constant(np.triu(np.ones((K - 1, K - 1)), 1), dtype=dtype)
+
+def _stick_breaking_forward(u):
+    K = get_dims(u)[1] + 1
+    v = u - _stick_breaking_offset(K, u.dtype)
+    # log of the fraction z of the remaining stick which is broken
+    # off at each step, of 1 - z, and of the stick remaining before it
+    log_z = -tf.nn.softplus(-v)
+    log_one_minus_z = -tf.nn.softplus(v)
+    log_remaining = tf.matmul(log_one_minus_z,
+                              _stick_breaking_mask(K, u.dtype))
+    x = tf.exp(log_z + log_remaining)
+    x_last = tf.exp(tf.reduce_sum(log_one_minus_z, 1, keep_dims=True))
+    return tf.concat(1, [x, x_last])
+
+def _stick_breaking_inverse(x):
+    K = get_dims(x)[1]
+    x = x[:, :(K-1)]
+    remaining = 1.0 - tf.matmul(x, _stick_breaking_mask(K, x.dtype))
+    z = x / remaining
+    return tf.log(z) - tf.log(1.0 - z) + _stick_breaking_offset(K, x.dtype)
+
+def _stick_breaking_log_det_jacobian(u):
+    # The Jacobian of the first K-1 coordinates of x is triangular,
+    # with diagonal z (1 - z) times the remaining stick.
+    K = get_dims(u)[1] + 1
+    v = u - _stick_breaking_offset(K, u.dtype)
+    log_one_minus_z = -tf.nn.softplus(v)
+    log_remaining = tf.matmul(log_one_minus_z,
+                              _stick_breaking_mask(K, u.dtype))
+    return tf.reduce_sum(-tf.nn.softplus(-v) + log_one_minus_z +
+                         log_remaining, 1)
+
+_TRANSFORMS = {
+    'log': (tf.exp,
+            tf.log,
+            lambda u: u),
+    'logit': (tf.sigmoid,
+              lambda x: tf.log(x) - tf.log(1.0 - x),
+              lambda u: -tf.nn.softplus(-u) - tf.nn.softplus(u)),
+    'softplus': (tf.nn.softplus,
+                 lambda x: x + tf.log(1.0 - tf.exp(-x)),
+                 lambda u: -tf.nn.softplus(-u)),
+    'stick_breaking': (_stick_breaking_forward,
+                       _stick_breaking_inverse,
+                       _stick_breaking_log_det_jacobian),
+}
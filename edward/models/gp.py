@@ -0,0 +1,94 @@
+from __future__ import print_function
+import tensorflow as tf
+
+from edward.stats import bernoulli, norm
+from edward.util import get_dtype, kernel_rbf
+
+class SparseGaussianProcess:
+    """
+    Gaussian process regression or classification with inducing
+    points, in the whitened parameterization
+
+    p((x,y), z) = prod_{n=1}^N p(y_n | f_n) * Normal(z | 0, I),
+    f = K_nm L^{-T} z,
+
+    where L is the Cholesky factor of the kernel matrix K_mm of the M
+    inducing points, K_nm is the kernel matrix between the inputs and
+    the inducing points, and u = L z are the function values at the
+    inducing points. The latent variables z have a standard normal
+    prior, so MFVI with a Normal variational model uses the analytic
+    KL divergence.
+
+    Each evaluation costs O(M^3 + N M^2) rather than O(N^3) for the
+    full Gaussian process. Data have labels in the first column and
+    features in subsequent columns. Mini-batches of data are supported:
+    the log-likelihood of a mini-batch is scaled to the full data set.
+
+    Parameters
+    ----------
+    inducing : np.ndarray or tf.Tensor
+        M x D matrix of inducing point locations.
+    N : int
+        Number of data points in the full data set.
+    kernel : function, optional
+        Function taking two matrices and returning the kernel matrix
+        between their rows, such as edward.util.kernel_rbf().
+    likelihood : str, optional
+        'bernoulli' for classification with labels in {0, 1} and a
+        logistic link, or 'normal' for regression.
+    noise : float, optional
+        Standard deviation of the observation noise for regression.
+    jitter : float, optional
+        Added to the diagonal of K_mm for numerical stability.
+    """
+    def __init__(self, inducing, N, kernel=kernel_rbf,
+                 likelihood='bernoulli', noise=1.0, jitter=1e-6):
+        if likelihood not in ('bernoulli', 'normal'):
+            raise ValueError("likelihood must be 'bernoulli' or 'normal'.")
+
+        self.inducing = inducing
+        self.N = N
+        self.kernel = kernel
+        self.likelihood = likelihood
+        self.noise = noise
+        self.jitter = jitter
+
+        if isinstance(inducing, tf.Tensor):
+            self.num_vars = inducing.get_shape()[0].value
+        else:
+            self.num_vars = inducing.shape[0]
+
+    def project(self, xs):
+        """
+        Returns the N x M matrix K_nm L^{-T}, so that the function
+        values at the inputs xs are project(xs) z.
+        """
+        inducing = tf.cast(self.inducing, dtype=get_dtype())
+        K_mm = self.kernel(inducing, inducing) + \
+               self.jitter * tf.diag(tf.ones([self.num_vars],
+                                             dtype=get_dtype()))
+        L = tf.cholesky(K_mm)
+        K_mn = self.kernel(inducing, xs[:, 1:])
+        return tf.transpose(tf.matrix_triangular_solve(L, K_mn, lower=True))
+
+    def log_lik(self, xs, zs):
+        """
+        Returns a vector [log p(xs | zs[1,:]), ..., log p(xs | zs[S,:])],
+        scaled by N over the number of data points in xs.
+        """
+        xs = tf.cast(xs, dtype=get_dtype())
+        y = xs[:, 0]
+        # n_batch x S matrix of function values for each sample.
+        f = tf.matmul(self.project(xs), zs, transpose_b=True)
+        if self.likelihood == 'bernoulli':
+            log_lik = bernoulli.logpmf(tf.expand_dims(y, 1), tf.sigmoid(f))
+        else:
+            log_lik = norm.logpdf(tf.expand_dims(y, 1), f, self.noise)
+
+        scale = self.N / tf.cast(tf.shape(xs)[0], dtype=get_dtype())
+        return scale * tf.reduce_sum(log_lik, 0)
+
+    def log_prob(self, xs, zs):
+        """Returns a vector [log p(xs, zs[1,:]), ..., log p(xs, zs[S,:])]."""
+        log_prior = tf.reduce_sum(norm.logpdf(zs), 1)
+        return log_prior + self.log_lik(xs, zs)
@@ -2,16 +2,13 @@ from __future__ import print_function
 import numpy as np
 import tensorflow as tf
 
-try:
-    import pystan
-    from collections import OrderedDict
-except ImportError:
-    pass
+from collections import OrderedDict
+from edward.util import get_dtype, lazy_import
 
-try:
-    import pymc3 as pm
-except ImportError:
-    pass
+# PyMC3 (and Theano) and PyStan are slow to import, and only needed
+# when a model uses them.
+pm = lazy_import('pymc3')
+pystan = lazy_import('pystan')
 
 class PyMC3Model:
     """
@@ -22,6 +19,10 @@ class PyMC3Model:
     model : pymc3.Model object
     observed : The shared theano tensor passed to the model likelihood
     """
+    # The log density is computed outside TensorFlow, so inference
+    # cannot differentiate through it.
+    is_differentiable = False
+
     def __init__(self, model, observed):
         self.model = model
         self.observed = observed
@@ -35,7 +36,7 @@ class PyMC3Model:
         self.num_vars = len(vars)
 
     def log_prob(self, xs, zs):
-        return tf.py_func(self._py_log_prob, [xs, zs], [tf.float32])[0]
+        return _py_func(self._py_log_prob, [xs, zs])
 
     def _py_log_prob(self, xs, zs):
         n_minibatch = zs.shape[0]
@@ -50,11 +51,13 @@ class PythonModel:
     """
     Model wrapper for models written in NumPy/SciPy.
     """
+    is_differentiable = False
+
     def __init__(self):
         self.num_vars = None
 
     def log_prob(self, xs, zs):
-        return tf.py_func(self._py_log_prob, [xs, zs], [tf.float32])[0]
+        return _py_func(self._py_log_prob, [xs, zs])
 
     def _py_log_prob(self, xs, zs):
         """
@@ -83,6 +86,8 @@ class StanModel:
     file: see documentation for argument in pystan.stan
     model_code: see documentation for argument in pystan.stan
     """
+    is_differentiable = False
+
     def __init__(self, file=None, model_code=None):
         if file is not None:
             self.file =  file
@@ -97,7 +102,7 @@ class StanModel:
         if self.flag_init is False:
             self._initialize(xs)
 
-        return tf.py_func(self._py_log_prob, [zs], [tf.float32])[0]
+        return _py_func(self._py_log_prob, [zs])
 
     def _initialize(self, xs):
         print("The following message exists as Stan instantiates the model.")
@@ -143,3 +148,14 @@ class StanModel:
             lp[b] = self.model.log_prob(z_unconst, adjust_transform=False)
 
         return lp
+
+def _py_func(func, inp):
+    """
+    Wrap a NumPy function returning a vector of log densities as a
+    TensorFlow op, returning the compute type of the dtype policy.
+    """
+    dtype = get_dtype()
+    def _func(*args):
+        return np.asarray(func(*args), dtype=dtype.as_numpy_dtype)
+
+    return tf.py_func(_func, inp, [dtype])[0]
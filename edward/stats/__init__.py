@@ -1,2 +1,3 @@
 from __future__ import absolute_import
 from .distributions import *
+from .divergences import *
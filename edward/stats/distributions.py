@@ -1,9 +1,10 @@
 import numpy as np
 import tensorflow as tf
 
-from edward.util import dot, get_dims, digamma, lbeta, lgamma
+from edward.util import dot, get_dims, get_dtype, digamma, lazy_import, lbeta, lgamma, log_sum_exp
 from itertools import product
-from scipy import stats
+
+stats = lazy_import('scipy.stats')
 
 class Distribution:
     """Template for all distributions."""
@@ -73,12 +74,12 @@ class Bernoulli:
         return stats.bernoulli.rvs(p, size=size)
 
     def logpmf(self, x, p):
-        x = tf.cast(x, dtype=tf.float32)
-        p = tf.cast(p, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        p = tf.cast(p, dtype=get_dtype())
         return tf.mul(x, tf.log(p)) + tf.mul(1.0 - x, tf.log(1.0-p))
 
     def entropy(self, p):
-        p = tf.cast(p, dtype=tf.float32)
+        p = tf.cast(p, dtype=get_dtype())
         return -tf.mul(p, tf.log(p)) - tf.mul(1.0 - p, tf.log(1.0-p))
 
 class Beta:
@@ -86,14 +87,14 @@ class Beta:
         return stats.beta.rvs(a, b, size=size)
 
     def logpdf(self, x, a, b):
-        x = tf.cast(x, dtype=tf.float32)
-        a = tf.cast(tf.squeeze(a), dtype=tf.float32)
-        b = tf.cast(tf.squeeze(b), dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        a = tf.cast(tf.squeeze(a), dtype=get_dtype())
+        b = tf.cast(tf.squeeze(b), dtype=get_dtype())
         return (a-1) * tf.log(x) + (b-1) * tf.log(1-x) - lbeta(tf.pack([a, b]))
 
     def entropy(self, a, b):
-        a = tf.cast(tf.squeeze(a), dtype=tf.float32)
-        b = tf.cast(tf.squeeze(b), dtype=tf.float32)
+        a = tf.cast(tf.squeeze(a), dtype=get_dtype())
+        b = tf.cast(tf.squeeze(b), dtype=get_dtype())
         if len(a.get_shape()) == 0:
             return lbeta(tf.pack([a, b])) - \
                    tf.mul(a - 1.0, digamma(a)) - \
@@ -111,9 +112,9 @@ class Binom:
         return stats.binom.rvs(n, p, size=size)
 
     def logpmf(self, x, n, p):
-        x = tf.cast(x, dtype=tf.float32)
-        n = tf.cast(n, dtype=tf.float32)
-        p = tf.cast(p, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        n = tf.cast(n, dtype=get_dtype())
+        p = tf.cast(p, dtype=get_dtype())
         return lgamma(n + 1.0) - lgamma(x + 1.0) - lgamma(n - x + 1.0) + \
                tf.mul(x, tf.log(p)) + tf.mul(n - x, tf.log(1.0-p))
 
@@ -125,10 +126,10 @@ class Chi2:
         return stats.chi2.rvs(df, size=size)
 
     def logpdf(self, x, df):
-        x = tf.cast(x, dtype=tf.float32)
-        df = tf.cast(df, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        df = tf.cast(df, dtype=get_dtype())
         return tf.mul(0.5*df - 1, tf.log(x)) - 0.5*x - \
-               tf.mul(0.5*df, tf.log(2.0)) - lgamma(0.5*df)
+               tf.mul(0.5*df, np.log(2.0)) - lgamma(0.5*df)
 
     def entropy(self, df):
         raise NotImplementedError()
@@ -146,8 +147,8 @@ class Dirichlet:
         alpha : np.array or tf.Tensor
             vector
         """
-        x = tf.cast(x, dtype=tf.float32)
-        alpha = tf.cast(tf.convert_to_tensor(alpha), dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        alpha = tf.cast(tf.convert_to_tensor(alpha), dtype=get_dtype())
         if len(get_dims(x)) == 1:
             return -lbeta(alpha) + tf.reduce_sum(tf.mul(alpha-1, tf.log(x)))
         else:
@@ -160,7 +161,7 @@ class Dirichlet:
         alpha: np.array or tf.Tensor
             vector or matrix
         """
-        alpha = tf.cast(tf.convert_to_tensor(alpha), dtype=tf.float32)
+        alpha = tf.cast(tf.convert_to_tensor(alpha), dtype=get_dtype())
         if len(get_dims(alpha)) == 1:
             K = get_dims(alpha)[0]
             a = tf.reduce_sum(alpha)
@@ -179,8 +180,8 @@ class Expon:
         return stats.expon.rvs(scale=scale, size=size)
 
     def logpdf(self, x, scale=1):
-        x = tf.cast(x, dtype=tf.float32)
-        scale = tf.cast(scale, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
         return - x/scale - tf.log(scale)
 
     def entropy(self, scale=1):
@@ -192,14 +193,14 @@ class Gamma:
         return stats.gamma.rvs(a, scale=scale, size=size)
 
     def logpdf(self, x, a, scale=1):
-        x = tf.cast(x, dtype=tf.float32)
-        a = tf.cast(a, dtype=tf.float32)
-        scale = tf.cast(scale, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        a = tf.cast(a, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
         return (a - 1.0) * tf.log(x) - x/scale - a * tf.log(scale) - lgamma(a)
 
     def entropy(self, a, scale=1):
-        a = tf.cast(a, dtype=tf.float32)
-        scale = tf.cast(scale, dtype=tf.float32)
+        a = tf.cast(a, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
         return a + tf.log(scale) + lgamma(a) + \
                tf.mul(1.0 - a, digamma(a))
 
@@ -208,8 +209,8 @@ class Geom:
         return stats.geom.rvs(p, size=size)
 
     def logpmf(self, x, p):
-        x = tf.cast(x, dtype=tf.float32)
-        p = tf.cast(p, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        p = tf.cast(p, dtype=get_dtype())
         return tf.mul(x-1, tf.log(1.0-p)) + tf.log(p)
 
     def entropy(self, p):
@@ -226,15 +227,15 @@ class InvGamma:
         return x
 
     def logpdf(self, x, a, scale=1):
-        x = tf.cast(x, dtype=tf.float32)
-        a = tf.cast(a, dtype=tf.float32)
-        scale = tf.cast(scale, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        a = tf.cast(a, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
         return tf.mul(a, tf.log(scale)) - lgamma(a) + \
                tf.mul(-a-1, tf.log(x)) - tf.truediv(scale, x)
 
     def entropy(self, a, scale=1):
-        a = tf.cast(a, dtype=tf.float32)
-        scale = tf.cast(scale, dtype=tf.float32)
+        a = tf.cast(a, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
         return a + tf.log(scale*tf.exp(lgamma(a))) - \
                (1.0 + a) * digamma(a)
 
@@ -243,14 +244,87 @@ class LogNorm:
         return stats.lognorm.rvs(s, size=size)
 
     def logpdf(self, x, s):
-        x = tf.cast(x, dtype=tf.float32)
-        s = tf.cast(s, dtype=tf.float32)
-        return -0.5*tf.log(2*np.pi) - tf.log(s) - tf.log(x) - \
+        x = tf.cast(x, dtype=get_dtype())
+        s = tf.cast(s, dtype=get_dtype())
+        return -0.5*np.log(2*np.pi) - tf.log(s) - tf.log(x) - \
                0.5*tf.square(tf.log(x) / s)
 
     def entropy(self, s):
         raise NotImplementedError()
 
+class Mixture:
+    """
+    Mixture of Gaussians with diagonal covariance. There is no
+    equivalent version implemented in SciPy.
+    """
+    def rvs(self, pi, loc, scale, size=1):
+        """
+        Parameters
+        ----------
+        pi : np.ndarray
+            vector of K mixture weights
+        loc : np.ndarray
+            K x D matrix of component means
+        scale : np.ndarray
+            K x D matrix of component standard deviations
+        """
+        c = np.random.choice(len(pi), size=size, p=pi)
+        return np.random.normal(loc[c], scale[c])
+
+    def logpdf(self, x, pi, loc, scale):
+        """
+        Log density of each data point, marginalizing the mixture
+        components with log-sum-exp. The densities of all data points,
+        components, and sets of parameters are evaluated in one
+        broadcasted operation.
+
+        Parameters
+        ----------
+        x : np.ndarray or tf.Tensor
+            N x D matrix of data points
+        pi : np.ndarray or tf.Tensor
+            vector of K mixture weights, or S x K matrix with a set
+            of weights in each row
+        loc : np.ndarray or tf.Tensor
+            K x D matrix of component means, or S x K x D tensor
+        scale : np.ndarray or tf.Tensor
+            K x D matrix of component standard deviations, or
+            S x K x D tensor
+
+        Returns
+        -------
+        tf.Tensor
+            vector of N log densities, or S x N matrix for each set of
+            parameters if pi is a matrix
+        """
+        x = tf.cast(x, dtype=get_dtype())
+        pi = tf.cast(pi, dtype=get_dtype())
+        loc = tf.cast(loc, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
+        is_batch = len(get_dims(pi)) == 2
+        if not is_batch:
+            pi = tf.expand_dims(pi, 0)
+            loc = tf.expand_dims(loc, 0)
+            scale = tf.expand_dims(scale, 0)
+
+        # S x N x K x D
+        z = (tf.expand_dims(tf.expand_dims(x, 0), 2) -
+             tf.expand_dims(loc, 1)) / tf.expand_dims(scale, 1)
+        log_scale = tf.reduce_sum(tf.log(scale), 2)
+        # S x N x K
+        log_components = -0.5 * tf.reduce_sum(tf.square(z), 3) - \
+                         tf.expand_dims(log_scale, 1) - \
+                         0.5 * get_dims(x)[1] * np.log(2*np.pi)
+        log_joint = tf.expand_dims(tf.log(pi), 1) + log_components
+        out = log_sum_exp(log_joint, 2)
+        if not is_batch:
+            out = tf.squeeze(out, [0])
+
+        return out
+
+    def entropy(self, pi, loc, scale):
+        raise NotImplementedError()
+
 class Multinomial:
     """There is no equivalent version implemented in SciPy."""
     def rvs(self, n, p, size=1):
@@ -260,17 +334,41 @@ class Multinomial:
         """
         Parameters
         ----------
-        x : np.array or tf.Tensor
+        x : np.array, tf.Tensor, or tf.SparseTensor
             vector of length K, where x[i] is the number of outcomes
-            in the ith bucket, or matrix with column length K
+            in the ith bucket, or matrix with column length K. A
+            sparse matrix may also be given as a tf.SparseTensorValue
+            (indices, values, shape).
         n : int or tf.Tensor
             number of outcomes equal to sum x[i]
         p : np.array or tf.Tensor
-            vector of probabilities summing to 1
+            vector of probabilities summing to 1, or matrix whose
+            rows are the probabilities of each row of x
+
+        Notes
+        -----
+        For a sparse matrix x, only its nonzero entries are
+        evaluated, as a zero count contributes nothing to the log
+        mass. It returns the vector of log masses of each row.
         """
-        x = tf.cast(x, dtype=tf.float32)
-        n = tf.cast(n, dtype=tf.float32)
-        p = tf.cast(p, dtype=tf.float32)
+        if _is_sparse(x):
+            x = _as_sparse_tensor(x)
+            n = tf.cast(n, dtype=get_dtype())
+            p = tf.cast(p, dtype=get_dtype())
+            rows, cols, values = _sparse_entries(x)
+            if len(get_dims(p)) == 1:
+                p_nonzero = tf.gather(p, cols)
+            else:
+                p_nonzero = _gather_entries(p, rows, cols)
+
+            terms = tf.mul(values, tf.log(p_nonzero)) - lgamma(values + 1.0)
+            n_rows = tf.cast(x.shape[0], tf.int32)
+            return lgamma(n + 1.0) + \
+                   tf.unsorted_segment_sum(terms, rows, n_rows)
+
+        x = tf.cast(x, dtype=get_dtype())
+        n = tf.cast(n, dtype=get_dtype())
+        p = tf.cast(p, dtype=get_dtype())
         if len(get_dims(x)) == 1:
             return lgamma(n + 1.0) - \
                    tf.reduce_sum(lgamma(x + 1.0)) + \
@@ -289,7 +387,7 @@ class Multinomial:
         sess = tf.Session()
         n = sess.run(tf.cast(tf.squeeze(n), dtype=tf.int32))
         sess.close()
-        p = tf.cast(tf.squeeze(p), dtype=tf.float32)
+        p = tf.cast(tf.squeeze(p), dtype=get_dtype())
         if isinstance(n, np.int32):
             k = get_dims(p)[0]
             max_range = np.zeros(k, dtype=np.int32) + n
@@ -324,7 +422,7 @@ class Multivariate_Normal:
         cov : np.array or tf.Tensor, optional
             vector or matrix. Defaults to identity.
         """
-        x = tf.cast(tf.convert_to_tensor(x), dtype=tf.float32)
+        x = tf.cast(tf.convert_to_tensor(x), dtype=get_dtype())
         x_shape = get_dims(x)
         if len(x_shape) == 1:
             d = x_shape[0]
@@ -334,14 +432,14 @@ class Multivariate_Normal:
         if mean is None:
             r = x
         else:
-            mean = tf.cast(tf.convert_to_tensor(mean), dtype=tf.float32)
+            mean = tf.cast(tf.convert_to_tensor(mean), dtype=get_dtype())
             r = x - mean
 
         if cov is 1:
-            cov_inv = tf.diag(tf.ones([d]))
-            det_cov = tf.constant(1.0)
+            cov_inv = tf.diag(tf.ones([d], dtype=get_dtype()))
+            det_cov = tf.constant(1.0, dtype=get_dtype())
         else:
-            cov = tf.cast(tf.convert_to_tensor(cov), dtype=tf.float32)
+            cov = tf.cast(tf.convert_to_tensor(cov), dtype=get_dtype())
             if len(cov.get_shape()) == 1: # vector
                 cov_inv = tf.diag(1.0 / cov)
                 det_cov = tf.reduce_prod(cov)
@@ -349,7 +447,7 @@ class Multivariate_Normal:
                 cov_inv = tf.matrix_inverse(cov)
                 det_cov = tf.matrix_determinant(cov)
 
-        lps = -0.5*d*tf.log(2*np.pi) - 0.5*tf.log(det_cov)
+        lps = -0.5*d*np.log(2*np.pi) - 0.5*tf.log(det_cov)
         if len(x_shape) == 1:
             r = tf.reshape(r, shape=(d, 1))
             lps -= 0.5 * tf.matmul(tf.matmul(r, cov_inv, transpose_a=True), r)
@@ -369,7 +467,7 @@ class Multivariate_Normal:
         L_inv = tf.matrix_inverse(L)
         det_cov = tf.pow(tf.matrix_determinant(L), 2)
         inner = dot(L_inv, r)
-        out = -0.5*d*tf.log(2*np.pi) - \
+        out = -0.5*d*np.log(2*np.pi) - \
               0.5*tf.log(det_cov) - \
               0.5*tf.matmul(inner, inner, transpose_a=True)
         """
@@ -390,23 +488,23 @@ class Multivariate_Normal:
             d = 1
             det_cov = 1.0
         else:
-            cov = tf.cast(tf.convert_to_tensor(cov), dtype=tf.float32)
+            cov = tf.cast(tf.convert_to_tensor(cov), dtype=get_dtype())
             d = get_dims(cov)[0]
             if len(cov.get_shape()) == 1:
                 det_cov = tf.reduce_prod(cov)
             else:
                 det_cov = tf.matrix_determinant(cov)
 
-        return 0.5 * (d + d*tf.log(2*np.pi) + tf.log(det_cov))
+        return 0.5 * (d + d*np.log(2*np.pi) + tf.log(det_cov))
 
 class NBinom:
     def rvs(self, n, p, size=1):
         return stats.nbinom.rvs(n, p, size=size)
 
     def logpmf(self, x, n, p):
-        x = tf.cast(x, dtype=tf.float32)
-        n = tf.cast(n, dtype=tf.float32)
-        p = tf.cast(p, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        n = tf.cast(n, dtype=get_dtype())
+        p = tf.cast(p, dtype=get_dtype())
         return lgamma(x + n) - lgamma(x + 1.0) - lgamma(n) + \
                tf.mul(n, tf.log(p)) + tf.mul(x, tf.log(1.0-p))
 
@@ -418,24 +516,62 @@ class Norm:
         return stats.norm.rvs(loc, scale, size=size)
 
     def logpdf(self, x, loc=0, scale=1):
-        x = tf.cast(x, dtype=tf.float32)
-        loc = tf.cast(loc, dtype=tf.float32)
-        scale = tf.cast(scale, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        loc = tf.cast(loc, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
         z = (x - loc) / scale
-        return -0.5*tf.log(2*np.pi) - tf.log(scale) - 0.5*tf.square(z)
+        return -0.5*np.log(2*np.pi) - tf.log(scale) - 0.5*tf.square(z)
 
     def entropy(self, loc=0, scale=1):
         """Note entropy does not depend on the mean."""
-        scale = tf.cast(scale, dtype=tf.float32)
-        return 0.5 * (1 + tf.log(2*np.pi)) + tf.log(scale)
+        scale = tf.cast(scale, dtype=get_dtype())
+        return 0.5 * (1 + np.log(2*np.pi)) + tf.log(scale)
 
 class Poisson:
     def rvs(self, mu, size=1):
         return stats.poisson.rvs(mu, size=size)
 
-    def logpmf(self, x, mu):
-        x = tf.cast(x, dtype=tf.float32)
-        mu = tf.cast(mu, dtype=tf.float32)
+    def logpmf(self, x, mu, mu_sum=None):
+        """
+        Parameters
+        ----------
+        x : np.array, tf.Tensor, or tf.SparseTensor
+            counts. A sparse matrix may also be given as a
+            tf.SparseTensorValue (indices, values, shape).
+        mu : np.array or tf.Tensor
+            rates, of the same shape as x. If x is sparse and mu_sum
+            is given, the vector of rates at the nonzero entries of x
+            instead, in the order of x.indices.
+        mu_sum : tf.Tensor, optional
+            For a sparse matrix x, the sum of the rates in each row.
+            This lets models with structured rates, e.g., Poisson
+            factorization with mu = theta beta^T, avoid forming the
+            dense matrix of rates.
+
+        Notes
+        -----
+        For a sparse matrix x, only its nonzero entries are
+        evaluated; a zero count contributes -mu, so the zeros add up
+        to the row sums of mu minus the rates at the nonzero entries.
+        It returns the vector of log masses of each row.
+        """
+        if _is_sparse(x):
+            x = _as_sparse_tensor(x)
+            mu = tf.cast(mu, dtype=get_dtype())
+            rows, cols, values = _sparse_entries(x)
+            if mu_sum is None:
+                mu_nonzero = _gather_entries(mu, rows, cols)
+                mu_sum = tf.reduce_sum(mu, 1)
+            else:
+                mu_nonzero = mu
+                mu_sum = tf.cast(mu_sum, dtype=get_dtype())
+
+            terms = values * tf.log(mu_nonzero) - lgamma(values + 1.0)
+            n_rows = tf.cast(x.shape[0], tf.int32)
+            return tf.unsorted_segment_sum(terms, rows, n_rows) - mu_sum
+
+        x = tf.cast(x, dtype=get_dtype())
+        mu = tf.cast(mu, dtype=get_dtype())
         return x * tf.log(mu) - mu - lgamma(x + 1.0)
 
     def entropy(self, mu):
@@ -446,13 +582,13 @@ class T:
         return stats.t.rvs(df, loc=loc, scale=scale, size=size)
 
     def logpdf(self, x, df, loc=0, scale=1):
-        x = tf.cast(x, dtype=tf.float32)
-        df = tf.cast(df, dtype=tf.float32)
-        loc = tf.cast(loc, dtype=tf.float32)
-        scale = tf.cast(scale, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
+        df = tf.cast(df, dtype=get_dtype())
+        loc = tf.cast(loc, dtype=get_dtype())
+        scale = tf.cast(scale, dtype=get_dtype())
         z = (x - loc) / scale
         return lgamma(0.5 * (df + 1.0)) - lgamma(0.5 * df) - \
-               0.5 * (tf.log(np.pi) + tf.log(df)) - tf.log(scale) - \
+               0.5 * (np.log(np.pi) + tf.log(df)) - tf.log(scale) - \
                0.5 * (df + 1.0) * tf.log(1.0 + (1.0/df) * tf.square(z))
 
     def entropy(self, df, loc=0, scale=1):
@@ -464,18 +600,18 @@ class TruncNorm:
 
     def logpdf(self, x, a, b, loc=0, scale=1):
         # Note there is no error checking if x is outside domain.
-        x = tf.cast(x, dtype=tf.float32)
+        x = tf.cast(x, dtype=get_dtype())
         # This is slow, as we require use of stats.norm.cdf.
         sess = tf.Session()
-        a = sess.run(tf.cast(a, dtype=tf.float32))
-        b = sess.run(tf.cast(b, dtype=tf.float32))
-        loc = sess.run(tf.cast(loc, dtype=tf.float32))
-        scale = sess.run(tf.cast(scale, dtype=tf.float32))
+        a = sess.run(tf.cast(a, dtype=get_dtype()))
+        b = sess.run(tf.cast(b, dtype=get_dtype()))
+        loc = sess.run(tf.cast(loc, dtype=get_dtype()))
+        scale = sess.run(tf.cast(scale, dtype=get_dtype()))
         sess.close()
         return -tf.log(scale) + norm.logpdf(x, loc, scale) - \
                tf.log(tf.cast(stats.norm.cdf((b - loc)/scale) - \
                       stats.norm.cdf((a - loc)/scale),
-                      dtype=tf.float32))
+                      dtype=get_dtype()))
 
     def entropy(self, a, b, loc=0, scale=1):
         raise NotImplementedError()
@@ -486,13 +622,39 @@ class Uniform:
 
     def logpdf(self, x, loc=0, scale=1):
         # Note there is no error checking if x is outside domain.
-        scale = tf.cast(scale, dtype=tf.float32)
-        return tf.squeeze(tf.ones(get_dims(x)) * -tf.log(scale))
+        scale = tf.cast(scale, dtype=get_dtype())
+        return tf.squeeze(tf.ones(get_dims(x), dtype=get_dtype()) * -tf.log(scale))
 
     def entropy(self, loc=0, scale=1):
-        scale = tf.cast(scale, dtype=tf.float32)
+        scale = tf.cast(scale, dtype=get_dtype())
         return tf.log(scale)
 
+def _is_sparse(x):
+    # Plain tuples and lists are dense inputs, so sparse matrices are
+    # only recognized from TensorFlow's own sparse types.
+    return isinstance(x, (tf.SparseTensor, tf.SparseTensorValue))
+
+def _as_sparse_tensor(x):
+    """Convert a tf.SparseTensorValue to a tf.SparseTensor."""
+    if isinstance(x, tf.SparseTensorValue):
+        indices, values, shape = x
+        x = tf.SparseTensor(tf.cast(indices, tf.int64), values,
+                            tf.cast(shape, tf.int64))
+
+    return x
+
+def _sparse_entries(x):
+    """Row indices, column indices, and values of a sparse matrix."""
+    rows = tf.cast(x.indices[:, 0], tf.int32)
+    cols = tf.cast(x.indices[:, 1], tf.int32)
+    values = tf.cast(x.values, dtype=get_dtype())
+    return rows, cols, values
+
+def _gather_entries(x, rows, cols):
+    """Entries x[rows[i], cols[i]] of a dense matrix."""
+    n_cols = tf.shape(x)[1]
+    return tf.gather(tf.reshape(x, [-1]), rows * n_cols + cols)
+
 bernoulli = Bernoulli()
 beta = Beta()
 binom = Binom()
@@ -503,6 +665,7 @@ gamma = Gamma()
 geom = Geom()
 invgamma = InvGamma()
 lognorm = LogNorm()
+mixture = Mixture()
 multinomial = Multinomial()
 multivariate_normal = Multivariate_Normal()
 nbinom = NBinom()
@@ -0,0 +1,122 @@
+import tensorflow as tf
+
+from edward.stats.distributions import Bernoulli, Beta, Dirichlet, Gamma, \
+    InvGamma, Multinomial, Norm
+from edward.util import digamma, get_dims, get_dtype, lgamma
+
+_KL = {}
+
+def kl(q, q_params, p, p_params):
+    """
+    Analytic KL divergence between two distributions,
+
+    KL(q || p) = E_{q(x)} [ log q(x) - log p(x) ]
+
+    Parameters
+    ----------
+    q : object
+        Distribution in edward.stats, e.g., norm.
+    q_params : list
+        Parameters of q, in the order of its logpdf() or logpmf().
+    p : object
+        Distribution in edward.stats.
+    p_params : list
+        Parameters of p, which broadcast against those of q.
+
+    Returns
+    -------
+    tf.Tensor
+        KL divergence of each factor: elementwise for univariate
+        distributions, and for each row of the parameters of
+        multivariate distributions (Dirichlet and Multinomial).
+
+    Raises
+    ------
+    NotImplementedError
+        If no KL divergence is registered for the pair (see
+        register_kl()).
+    """
+    if not has_kl(q, p):
+        raise NotImplementedError(
+            "No analytic KL divergence from {:s} to {:s}.".format(
+                q.__class__.__name__, p.__class__.__name__))
+
+    params = [tf.cast(param, dtype=get_dtype())
+              for param in list(q_params) + list(p_params)]
+    return _KL[(q.__class__, p.__class__)](*params)
+
+def has_kl(q, p):
+    """Whether an analytic KL divergence is registered for (q, p)."""
+    return (q.__class__, p.__class__) in _KL
+
+def register_kl(q_class, p_class):
+    """
+    Decorator registering a function as the KL divergence from
+    distributions of class q_class to those of class p_class.
+
+    The function takes the parameters of q followed by those of p, as
+    tensors, and returns the KL divergence of each factor.
+
+    Examples
+    --------
+    >>> @register_kl(Norm, Norm)
+    ... def kl_norm_norm(loc_one, scale_one, loc_two, scale_two):
+    ...     ...
+    """
+    def decorator(fn):
+        _KL[(q_class, p_class)] = fn
+        return fn
+
+    return decorator
+
+@register_kl(Bernoulli, Bernoulli)
+def _kl_bernoulli_bernoulli(p_one, p_two):
+    return p_one * (tf.log(p_one) - tf.log(p_two)) + \
+           (1.0 - p_one) * (tf.log(1.0 - p_one) - tf.log(1.0 - p_two))
+
+@register_kl(Beta, Beta)
+def _kl_beta_beta(a_one, b_one, a_two, b_two):
+    ab_one = a_one + b_one
+    return lgamma(ab_one) - lgamma(a_one) - lgamma(b_one) - \
+           lgamma(a_two + b_two) + lgamma(a_two) + lgamma(b_two) + \
+           (a_one - a_two) * digamma(a_one) + \
+           (b_one - b_two) * digamma(b_one) + \
+           (a_two + b_two - ab_one) * digamma(ab_one)
+
+@register_kl(Dirichlet, Dirichlet)
+def _kl_dirichlet_dirichlet(alpha_one, alpha_two):
+    alpha_two = alpha_two + tf.zeros_like(alpha_one)
+    axis = len(get_dims(alpha_one)) - 1
+    sum_one = tf.reduce_sum(alpha_one, axis)
+    sum_two = tf.reduce_sum(alpha_two, axis)
+    return lgamma(sum_one) - lgamma(sum_two) - \
+           tf.reduce_sum(lgamma(alpha_one) - lgamma(alpha_two), axis) + \
+           tf.reduce_sum((alpha_one - alpha_two) *
+                         (digamma(alpha_one) -
+                          digamma(tf.expand_dims(sum_one, axis))), axis)
+
+@register_kl(Gamma, Gamma)
+def _kl_gamma_gamma(a_one, scale_one, a_two, scale_two):
+    return (a_one - a_two) * digamma(a_one) - lgamma(a_one) + lgamma(a_two) + \
+           a_two * (tf.log(scale_two) - tf.log(scale_one)) + \
+           a_one * (scale_one - scale_two) / scale_two
+
+@register_kl(InvGamma, InvGamma)
+def _kl_invgamma_invgamma(a_one, scale_one, a_two, scale_two):
+    # x ~ InvGamma(a, scale) if and only if 1/x ~ Gamma(a, 1/scale),
+    # and the KL divergence is invariant to the change of variables.
+    return _kl_gamma_gamma(a_one, 1.0 / scale_one, a_two, 1.0 / scale_two)
+
+@register_kl(Multinomial, Multinomial)
+def _kl_multinomial_multinomial(n_one, p_one, n_two, p_two):
+    # The KL divergence is only finite if the number of trials agree.
+    p_two = p_two + tf.zeros_like(p_one)
+    axis = len(get_dims(p_one)) - 1
+    return n_one * tf.reduce_sum(p_one * (tf.log(p_one) - tf.log(p_two)),
+                                 axis)
+
+@register_kl(Norm, Norm)
+def _kl_norm_norm(loc_one, scale_one, loc_two, scale_two):
+    return tf.log(scale_two) - tf.log(scale_one) + \
+           (tf.square(scale_one) + tf.square(loc_one - loc_two)) / \
+           (2.0 * tf.square(scale_two)) - 0.5
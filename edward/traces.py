@@ -0,0 +1,243 @@
+import json
+import numpy as np
+import os
+
+class Trace:
+    """
+    Append-only, on-disk store of posterior samples.
+
+    Samples are buffered in memory and written to disk in chunks of
+    n_chunk rows, each chunk a .npy file in the directory path, so
+    any sampler can stream its output without holding it in memory.
+    Chunks are read back as memory-mapped arrays.
+
+    Arguments
+    ----------
+    path : str
+        Directory of the trace. If it already holds a trace, the trace
+        is opened and further samples are appended to it.
+    num_vars : int, optional
+        Number of latent variables in each sample. Required when
+        creating a new trace.
+    dtype : str, optional
+        Storage type, 'float32' (default) or 'float16'. Samples are
+        always read as float32.
+    thin : int, optional
+        Keep only every thin-th sample appended. Default is 1.
+    n_chunk : int, optional
+        Number of samples per chunk on disk. Default is 1000.
+
+    Notes
+    -----
+    The metadata (storage type, thinning, chunk sizes, and the number
+    of samples appended so far) is stored in trace.json, so that
+    thinning continues seamlessly when a trace is reopened. It is
+    written along with each chunk, so buffered samples and the
+    metadata are only persisted once a chunk is full or by flush().
+    If the trace is reopened without a flush, e.g., after a crash,
+    appending resumes right after the last sample on disk.
+
+    When reopening a trace, num_vars, dtype and thin must either be
+    omitted or agree with the stored trace; n_chunk may differ, and
+    applies to the chunks written from then on.
+    """
+    def __init__(self, path, num_vars=None, dtype=None, thin=None,
+                 n_chunk=None):
+        self.path = path
+        self._meta_path = os.path.join(path, 'trace.json')
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+
+            for name, value in [('num_vars', num_vars), ('dtype', dtype),
+                                ('thin', thin)]:
+                if value is not None and value != meta[name]:
+                    raise ValueError(
+                        "{:s} does not match the stored trace, which has "
+                        "{:s} = {}.".format(name, name, meta[name]))
+
+            if n_chunk is not None:
+                meta['n_chunk'] = n_chunk
+        else:
+            if num_vars is None:
+                raise ValueError("num_vars is required to create a trace.")
+
+            if dtype is None:
+                dtype = 'float32'
+
+            if dtype not in ('float32', 'float16'):
+                raise ValueError("dtype must be 'float32' or 'float16'.")
+
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+            meta = {'num_vars': num_vars, 'dtype': dtype,
+                    'thin': thin or 1, 'n_chunk': n_chunk or 1000,
+                    'n_appended': 0, 'chunk_sizes': []}
+
+        self.num_vars = meta['num_vars']
+        self.dtype = meta['dtype']
+        self.thin = meta['thin']
+        self.n_chunk = meta['n_chunk']
+        self.n_appended = meta['n_appended']
+        self.chunk_sizes = meta['chunk_sizes']
+        self._buffer = []
+        self._n_buffer = 0
+        self._offsets = np.cumsum([0] + self.chunk_sizes)
+        # Number of samples appended, as of the last sample on disk.
+        self._n_flushed = self.n_appended
+        if not os.path.exists(self._meta_path):
+            self._write_meta()
+
+    def __len__(self):
+        """Number of samples stored, including any not yet flushed."""
+        return int(self._offsets[-1]) + self._n_buffer
+
+    def __str__(self):
+        return "trace of {:d} samples: \n".format(len(self)) + self.path
+
+    def append(self, samples):
+        """
+        Append samples to the trace, keeping every thin-th one.
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            n_samples x num_vars array, or a num_vars vector for a
+            single sample.
+        """
+        samples = np.asarray(samples)
+        if len(samples.shape) == 1:
+            samples = samples[np.newaxis, :]
+
+        if samples.shape[1] != self.num_vars:
+            raise ValueError("Samples must have num_vars columns.")
+
+        # Indices of the kept samples, counting from the first sample
+        # ever appended to the trace.
+        start = (-self.n_appended) % self.thin
+        kept = samples[start::self.thin]
+        self.n_appended += samples.shape[0]
+        if kept.shape[0] > 0:
+            self._buffer += [kept.astype(self.dtype)]
+            self._n_buffer += kept.shape[0]
+
+        while self._n_buffer >= self.n_chunk:
+            self._write_chunk(self.n_chunk)
+
+    def flush(self):
+        """Write any buffered samples, and the metadata, to disk."""
+        if self._n_buffer > 0:
+            self._write_chunk(self._n_buffer)
+        elif self._n_flushed != self.n_appended:
+            self._n_flushed = self.n_appended
+            self._write_meta()
+
+    def chunks(self):
+        """
+        Iterate over the stored samples, one chunk at a time.
+
+        Yields
+        ------
+        np.ndarray
+            A read-only memory-mapped array of a chunk of samples,
+            in the storage type. Buffered samples are yielded last.
+        """
+        for i in range(len(self.chunk_sizes)):
+            yield self._load_chunk(i)
+
+        if self._n_buffer > 0:
+            yield np.concatenate(self._buffer)
+
+    def read(self, start=0, stop=None):
+        """
+        Read a contiguous range of samples as a float32 array.
+        """
+        if stop is None:
+            stop = len(self)
+
+        return self.get(np.arange(start, stop))
+
+    def get(self, idx):
+        """
+        Read samples by index as a float32 array, loading only the
+        chunks which contain them.
+
+        Parameters
+        ----------
+        idx : np.ndarray
+            vector of sample indices
+
+        Returns
+        -------
+        np.ndarray
+            len(idx) x num_vars array of type np.float32
+        """
+        idx = np.asarray(idx, dtype=np.int64)
+        out = np.empty((idx.shape[0], self.num_vars), dtype=np.float32)
+        if idx.shape[0] == 0:
+            return out
+
+        if np.any(idx < 0) or np.any(idx >= len(self)):
+            raise IndexError()
+
+        # Chunk index of each sample; the buffer is the last chunk.
+        which = np.searchsorted(self._offsets, idx, side='right') - 1
+        for i in np.unique(which):
+            mask = which == i
+            rows = idx[mask] - self._offsets[i]
+            if i < len(self.chunk_sizes):
+                out[mask] = self._load_chunk(i)[rows]
+            else:
+                out[mask] = np.concatenate(self._buffer)[rows]
+
+        return out
+
+    def sample(self, size=1):
+        """
+        Draw samples uniformly at random with replacement.
+
+        Returns
+        -------
+        np.ndarray
+            size x num_vars array of type np.float32
+        """
+        n = len(self)
+        if n == 0:
+            raise ValueError("Cannot sample from an empty trace.")
+
+        return self.get(np.random.randint(0, n, size=size))
+
+    def _load_chunk(self, i):
+        return np.load(self._chunk_path(i), mmap_mode='r')
+
+    def _chunk_path(self, i):
+        return os.path.join(self.path, 'chunk_{:06d}.npy'.format(i))
+
+    def _write_chunk(self, n):
+        data = np.concatenate(self._buffer)
+        np.save(self._chunk_path(len(self.chunk_sizes)), data[:n])
+        if n < data.shape[0]:
+            self._buffer = [data[n:]]
+        else:
+            self._buffer = []
+
+        self._n_buffer = data.shape[0] - n
+        self.chunk_sizes += [n]
+        self._offsets = np.cumsum([0] + self.chunk_sizes)
+        if self._n_buffer == 0:
+            self._n_flushed = self.n_appended
+        else:
+            # Kept samples are every thin-th one appended, so the last
+            # one on disk is sample (number stored - 1) * thin.
+            self._n_flushed = (int(self._offsets[-1]) - 1) * self.thin + 1
+
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {'num_vars': self.num_vars, 'dtype': self.dtype,
+                'thin': self.thin, 'n_chunk': self.n_chunk,
+                'n_appended': self._n_flushed,
+                'chunk_sizes': [int(n) for n in self.chunk_sizes]}
+        with open(self._meta_path, 'w') as f:
+            json.dump(meta, f)
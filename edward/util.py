@@ -1,5 +1,12 @@
+import contextlib
+import importlib
 import tensorflow as tf
 import numpy as np
+import types
+
+# The floating point types used to compute densities and losses, and
+# to store data and samples, if they have been set (see set_dtype()).
+_DTYPES = {}
 
 def cumprod(xs):
     """
@@ -55,6 +62,25 @@ def dot(x, y):
         vec = y
         return tf.matmul(mat, tf.expand_dims(vec, 1))
 
+@contextlib.contextmanager
+def dtype_policy(compute=None, storage=None):
+    """
+    Context manager setting the floating point types for the
+    operations built within it, e.g.,
+
+    >>> with dtype_policy(compute=tf.float64):
+    >>>     inference.initialize()
+
+    See set_dtype() for the arguments.
+    """
+    old = dict(_DTYPES)
+    set_dtype(compute, storage)
+    try:
+        yield
+    finally:
+        _DTYPES.clear()
+        _DTYPES.update(old)
+
 def get_dims(x):
     """
     Get values of each dimension.
@@ -69,6 +95,30 @@ def get_dims(x):
     else: # array
         return [dim.value for dim in dims]
 
+def get_dtype(kind='compute'):
+    """
+    Get the floating point type of the current policy.
+
+    Arguments
+    ----------
+    kind: str, optional
+        'compute', the type in which densities and losses are
+        computed, or 'storage', the type in which data and samples
+        are held.
+    """
+    if kind == 'storage' and 'storage' not in _DTYPES:
+        kind = 'compute'
+
+    return _DTYPES.get(kind, tf.float32)
+
+def has_dtype_policy():
+    """
+    Whether a floating point type has been set, by set_dtype() or
+    within dtype_policy(). Until then, Data holds and returns arrays
+    in their own type.
+    """
+    return len(_DTYPES) > 0
+
 def get_session():
     """Get the session defined globally; if not already defined, then
     the function will create a global session."""
@@ -106,7 +156,7 @@ def hessian(y, xs):
             hij = gradjgrads[l]
             # return 0 if gradient doesn't exist; TensorFlow returns None
             if hij is None:
-                hij = tf.zeros(xs[l].get_shape(), dtype=tf.float32)
+                hij = tf.zeros(xs[l].get_shape(), dtype=get_dtype())
 
             hij = tf.reshape(hij, [-1])
             hi.append(hij)
@@ -117,6 +167,106 @@ def hessian(y, xs):
     # Form matrix where each row is grad_{xs} ( [ grad_{xs} y ]_j ).
     return tf.pack(mat)
 
+def kernel_linear(x, y=None, sigma=1.0, c=0.0):
+    """
+    Linear kernel matrix between the rows of x and y
+    k(x, y) = sum_i sigma_i^2 x_i y_i + c
+
+    Parameters
+    ----------
+    x : tf.Tensor
+        N x D matrix
+    y : tf.Tensor, optional
+        M x D matrix. Default is x.
+    sigma : float or tf.Tensor, optional
+        Scale, or D-vector of scales of each dimension (ARD).
+    c : float or tf.Tensor, optional
+        Bias.
+
+    Returns
+    -------
+    tf.Tensor
+        N x M matrix
+    """
+    x = tf.cast(x, dtype=get_dtype())
+    y = x if y is None else tf.cast(y, dtype=get_dtype())
+    sigma = tf.cast(sigma, dtype=get_dtype())
+    return tf.matmul(x * sigma, y * sigma, transpose_b=True) + c
+
+def kernel_matern(x, y=None, sigma=1.0, l=1.0, nu=2.5):
+    """
+    Matern kernel matrix between the rows of x and y
+    k(x, y) = sigma^2 exp(-r)                                 (nu = 1/2)
+    k(x, y) = sigma^2 (1 + sqrt(3) r) exp(-sqrt(3) r)         (nu = 3/2)
+    k(x, y) = sigma^2 (1 + sqrt(5) r + 5/3 r^2) exp(-sqrt(5) r) (nu = 5/2)
+    where r^2 = sum_i (x_i - y_i)^2 / l_i^2.
+
+    Parameters
+    ----------
+    x : tf.Tensor
+        N x D matrix
+    y : tf.Tensor, optional
+        M x D matrix. Default is x.
+    sigma : float or tf.Tensor, optional
+        Signal standard deviation.
+    l : float or tf.Tensor, optional
+        Length scale, or D-vector of length scales of each dimension
+        (ARD).
+    nu : float, optional
+        Smoothness, one of 0.5, 1.5, or 2.5.
+
+    Returns
+    -------
+    tf.Tensor
+        N x M matrix
+    """
+    if nu not in (0.5, 1.5, 2.5):
+        raise ValueError("nu must be 0.5, 1.5, or 2.5.")
+
+    sigma = tf.cast(sigma, dtype=get_dtype())
+    # Bound the squared distance away from zero, where the gradient of
+    # its square root is infinite.
+    r = tf.sqrt(tf.maximum(_sq_dist(x, y, l), 1e-12))
+    if nu == 0.5:
+        poly = 1.0
+        r_scaled = r
+    elif nu == 1.5:
+        r_scaled = np.sqrt(3.0) * r
+        poly = 1.0 + r_scaled
+    else:
+        r_scaled = np.sqrt(5.0) * r
+        poly = 1.0 + r_scaled + tf.square(r_scaled) / 3.0
+
+    return tf.square(sigma) * poly * tf.exp(-r_scaled)
+
+def kernel_rbf(x, y=None, sigma=1.0, l=1.0):
+    """
+    Squared-exponential kernel matrix between the rows of x and y
+    k(x, y) = sigma^2 exp{ -1/2 sum_i (x_i - y_i)^2 / l_i^2 }
+
+    Unlike multivariate_rbf(), it computes all pairs at once with
+    matrix operations, building O(1) ops instead of N x M.
+
+    Parameters
+    ----------
+    x : tf.Tensor
+        N x D matrix
+    y : tf.Tensor, optional
+        M x D matrix. Default is x.
+    sigma : float or tf.Tensor, optional
+        Signal standard deviation.
+    l : float or tf.Tensor, optional
+        Length scale, or D-vector of length scales of each dimension
+        (ARD).
+
+    Returns
+    -------
+    tf.Tensor
+        N x M matrix
+    """
+    sigma = tf.cast(sigma, dtype=get_dtype())
+    return tf.square(sigma) * tf.exp(-0.5 * _sq_dist(x, y, l))
+
 def kl_multivariate_normal(loc_one, scale_one, loc_two=0, scale_two=1):
     """
     Calculates the KL of multivariate normal distributions with
@@ -156,6 +306,20 @@ def kl_multivariate_normal(loc_one, scale_one, loc_two=0, scale_two=1):
             tf.square((loc_two - loc_one)/scale_two) - \
             1.0 + 2.0 * tf.log(scale_two) - 2.0 * tf.log(scale_one), 1)
 
+def lazy_import(name):
+    """
+    Returns a module which is only imported on first attribute access.
+
+    Use it for dependencies which are slow to import and only needed
+    by some functions, so that importing edward stays fast.
+
+    Parameters
+    ----------
+    name : str
+        Absolute name of the module, e.g., 'scipy.stats'.
+    """
+    return _LazyModule(name)
+
 def lbeta(x):
     """
     Computes the log of Beta(x), reducing along the last dimension.
@@ -175,7 +339,7 @@ def lbeta(x):
     tf.Tensor
         scalar if vector input, rank-(n-1) if rank-n tensor input
     """
-    x = tf.cast(tf.squeeze(x), dtype=tf.float32)
+    x = tf.cast(tf.squeeze(x), dtype=get_dtype())
     if len(get_dims(x)) == 1:
         return tf.reduce_sum(lgamma(x)) - lgamma(tf.reduce_sum(x))
     else:
@@ -204,18 +368,40 @@ def lgamma(x):
     xp3 = 3.0 + x
     return -2.081061466 - x + 0.0833333 / xp3 - logterm + (2.5 + x) * tf.log(xp3)
 
-def log_sum_exp(x):
+def log_sum_exp(x, axis=None, keep_dims=False):
     """
-    Computes the log_sum_exp of the elements in x.
+    Computes log(sum(exp(x))) of the elements of x along an axis,
+    stably, by subtracting their maximum before exponentiating.
 
-    Works for x with
-        shape=TensorShape([Dimension(N)])
-        shape=TensorShape([Dimension(N), Dimension(1)])
+    Parameters
+    ----------
+    x : tf.Tensor
+        tensor of any shape
+    axis : int, optional
+        Axis to reduce. Default is to reduce all elements.
+    keep_dims : bool, optional
+        Whether to keep the reduced axis with length 1.
 
-    Not tested for anything beyond that.
+    Returns
+    -------
+    tf.Tensor
+        scalar if axis is None, otherwise x with the axis reduced
     """
-    x_max = tf.reduce_max(x)
-    return tf.add(x_max, tf.log(tf.reduce_sum(tf.exp(tf.sub(x, x_max)))))
+    if axis is not None and axis < 0:
+        axis += len(x.get_shape())
+
+    x_max = tf.reduce_max(x, axis, keep_dims=True)
+    # If all elements are -inf, the result is -inf rather than nan.
+    x_max = tf.stop_gradient(tf.select(tf.is_finite(x_max), x_max,
+                                       tf.zeros_like(x_max)))
+    out = tf.log(tf.reduce_sum(tf.exp(x - x_max), axis, keep_dims=True)) + \
+          x_max
+    if keep_dims:
+        return out
+    elif axis is None:
+        return tf.reshape(out, [])
+    else:
+        return tf.squeeze(out, [axis])
 
 def logit(x):
     """log(x / (1 - x))"""
@@ -239,6 +425,34 @@ def rbf(x, y=0.0, sigma=1.0, l=1.0):
     return tf.pow(sigma, 2.0) * \
            tf.exp(-1.0/(2.0*tf.pow(l, 2.0)) * tf.pow(x - y , 2.0))
 
+def set_dtype(compute=None, storage=None):
+    """
+    Set the floating point types of the global policy.
+
+    Parameters
+    ----------
+    compute : tf.DType or str, optional
+        Type in which densities, variational parameters, and losses
+        are computed. Default is tf.float32; use tf.float64 for
+        ill-conditioned models.
+    storage : tf.DType or str, optional
+        Type in which data and samples are held, e.g., tf.float16 to
+        reduce memory. They are cast to the compute type when used.
+        Default is the compute type: until a storage type is set,
+        setting the compute type also sets the type in which data
+        and samples are held.
+
+    Notes
+    -----
+    Until either type is set, Data leaves arrays in their own type,
+    e.g., float64 arrays are held and returned as float64.
+    """
+    if compute is not None:
+        _DTYPES['compute'] = tf.as_dtype(compute)
+
+    if storage is not None:
+        _DTYPES['storage'] = tf.as_dtype(storage)
+
 def set_seed(x):
     """
     Set seed for both NumPy and TensorFlow.
@@ -252,3 +466,33 @@ def softplus(x):
     tf.nn.softplus().
     """
     return tf.log(1.0 + tf.exp(x))
+
+def _sq_dist(x, y=None, l=1.0):
+    """
+    Squared distances between the rows of x and y, scaled by the
+    length scales l, via ||x||^2 + ||y||^2 - 2 x y^T.
+    """
+    l = tf.cast(l, dtype=get_dtype())
+    x = tf.cast(x, dtype=get_dtype()) / l
+    if y is None:
+        y = x
+    else:
+        y = tf.cast(y, dtype=get_dtype()) / l
+
+    xx = tf.reduce_sum(tf.square(x), 1)
+    yy = tf.reduce_sum(tf.square(y), 1)
+    sq = tf.expand_dims(xx, 1) + tf.expand_dims(yy, 0) - \
+         2.0 * tf.matmul(x, y, transpose_b=True)
+    # Rounding can make the squared distances slightly negative.
+    return tf.maximum(sq, 0.0)
+
+class _LazyModule(types.ModuleType):
+    def __init__(self, name):
+        types.ModuleType.__init__(self, name)
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self.__dict__['_module'] is None:
+            self.__dict__['_module'] = importlib.import_module(self.__name__)
+
+        return getattr(self.__dict__['_module'], attr)
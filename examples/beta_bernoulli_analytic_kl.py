@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+A simple coin flipping example, using an analytic KL divergence. The
+model is written in TensorFlow.
+
+Probability model
+    Prior: Beta
+    Likelihood: Bernoulli
+Variational model
+    Likelihood: Mean-field Beta
+"""
+import edward as ed
+import tensorflow as tf
+
+from edward.models import Variational, Beta
+from edward.stats import bernoulli, beta
+
+class BetaBernoulli:
+    """
+    p(x, z) = Bernoulli(x | z) * Beta(z | 1, 1)
+    """
+    def __init__(self):
+        # The prior of each variational layer, as a distribution in
+        # edward.stats and its parameters.
+        self.priors = [(beta, [1.0, 1.0])]
+
+    def log_lik(self, xs, zs):
+        return tf.pack([tf.reduce_sum(bernoulli.logpmf(xs, z))
+                        for z in tf.unpack(zs)])
+
+ed.set_seed(42)
+model = BetaBernoulli()
+variational = Variational()
+variational.add(Beta())
+data = ed.Data(tf.constant((0, 1, 0, 0, 0, 0, 0, 0, 0, 1), dtype=tf.float32))
+
+# model.log_lik() is defined and the Beta-Beta KL divergence is
+# analytic, so MFVI only estimates the expected log-likelihood.
+inference = ed.MFVI(model, variational, data)
+inference.run(n_iter=10000)
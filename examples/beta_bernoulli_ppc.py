@@ -48,3 +48,8 @@ inference.run(n_iter=200)
 
 T = lambda y, z=None: tf.reduce_mean(y)
 print(ed.ppc(model, variational, data, T))
+
+# Batched check: T is vectorized over a leading replicate axis.
+T_batch = lambda ys, zs=None: tf.reduce_mean(ys, 1)
+print(ed.ppc_pvalue(model, variational, data, T_batch, size=1000,
+                    n_chunk=100))
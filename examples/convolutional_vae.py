@@ -8,6 +8,7 @@ Probability model
     Likelihood: Bernoulli parameterized by convolutional NN
 Variational model
     Likelihood: Mean-field Normal parameterized by convolutional NN
+    (an amortized inference network)
 """
 from __future__ import print_function
 import os
@@ -16,9 +17,8 @@ import prettytensor as pt
 import tensorflow as tf
 
 from convolutional_vae_util import deconv2d
-from edward.models import Variational, Normal
+from edward.models import Variational, AmortizedNormal
 from edward.stats import bernoulli
-from edward.util import kl_multivariate_normal
 from progressbar import ETA, Bar, Percentage, ProgressBar
 from scipy.misc import imsave
 from tensorflow.examples.tutorials.mnist import input_data
@@ -98,10 +98,10 @@ def neural_network(x):
                 flatten().
                 fully_connected(num_vars * 2, activation_fn=None)).tensor
 
-    # Return list of vectors where mean[i], stddev[i] are the
-    # parameters of the local variational factor for data point i.
-    loc = tf.reshape(params[:, :num_vars], [-1])
-    scale = tf.reshape(tf.sqrt(tf.exp(params[:, num_vars:])), [-1])
+    # Return matrices where row i of loc, scale are the parameters of
+    # the local variational factor for data point i.
+    loc = params[:, :num_vars]
+    scale = tf.sqrt(tf.exp(params[:, num_vars:]))
     return [loc, scale]
 
 ed.set_seed(42)
@@ -117,10 +117,11 @@ model = NormalBernoulli(num_vars=10)
 # to explicitly represent the corresponding variational factors for a
 # mini-batch,
 # q(z_{batch} | x) = prod_{m=1}^{n_data} Normal(z_m | loc, scale = phi(x))
-x_ph = tf.placeholder(tf.float32, [FLAGS.n_data, 28 * 28])
-loc, scale = neural_network(x_ph)
+# AmortizedNormal applies the inference network to each mini-batch
+# that inference draws from the data.
 variational = Variational()
-variational.add(Normal(model.num_vars * FLAGS.n_data, loc=loc, scale=scale))
+variational.add(AmortizedNormal((FLAGS.n_data, model.num_vars),
+                                neural_network))
 
 if not os.path.exists(FLAGS.data_directory):
     os.makedirs(FLAGS.data_directory)
@@ -151,7 +152,7 @@ for epoch in range(n_epoch):
         pbar.update(t)
         x_train, _ = mnist.train.next_batch(FLAGS.n_data)
         _, loss = sess.run([inference.train, inference.loss],
-                           feed_dict={x: x_train, x_ph: x_train})
+                           feed_dict={x: x_train})
         avg_loss += loss
 
     # Take average over all ELBOs during the epoch, and over minibatch
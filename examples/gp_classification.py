@@ -15,7 +15,7 @@ import numpy as np
 
 from edward.models import Variational, Normal
 from edward.stats import bernoulli, multivariate_normal
-from edward.util import multivariate_rbf
+from edward.util import kernel_rbf
 
 class GaussianProcess:
     """
@@ -46,19 +46,7 @@ class GaussianProcess:
         self.inverse_link = tf.sigmoid
 
     def kernel(self, xs):
-        mat = []
-        for i in range(self.N):
-            mat += [[]]
-            xi = xs[i, 1:]
-            for j in range(self.N):
-                if j == i:
-                    mat[i] += [multivariate_rbf(xi, xi, self.sigma, self.l)]
-                else:
-                    mat[i] += [multivariate_rbf(xi, xs[j, 1:], self.sigma, self.l)]
-
-            mat[i] = tf.pack(mat[i])
-
-        return tf.pack(mat)
+        return kernel_rbf(xs[:, 1:], sigma=self.sigma, l=self.l)
 
     def log_prob(self, xs, zs):
         """Returns a vector [log p(xs, zs[1,:]), ..., log p(xs, zs[S,:])]."""
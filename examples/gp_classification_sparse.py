@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+Sparse Gaussian process classification using mean-field variational
+inference, with inducing points and data subsampling.
+
+Probability model:
+    Gaussian process classification with M inducing points
+    Prior: Gaussian process, whitened
+    Likelihood: Bernoulli-Logit
+Variational model
+    Likelihood: Mean-field Normal
+"""
+import edward as ed
+import tensorflow as tf
+import numpy as np
+
+from edward.models import SparseGaussianProcess, Variational, Normal
+from edward.util import kernel_rbf
+
+ed.set_seed(42)
+df = np.loadtxt('data/crabs_train.txt', dtype='float32', delimiter=',')
+df[:, 0] = (df[:, 0] + 1.0) / 2.0 # labels in {0, 1}
+data = ed.Data(tf.constant(df, dtype=tf.float32))
+
+M = 20
+inducing = df[np.random.choice(len(df), M, replace=False), 1:]
+model = SparseGaussianProcess(inducing, N=len(df),
+                              kernel=lambda x, y: kernel_rbf(x, y, l=2.0))
+variational = Variational()
+variational.add(Normal(model.num_vars))
+inference = ed.MFVI(model, variational, data)
+inference.run(n_iter=2500, n_data=50, n_minibatch=5, n_print=250)
@@ -14,9 +14,9 @@ Probability model
 Variational model
     Likelihood:
         q(pi) prod_{k=1}^K q(mu_k) q(sigma_k)
-        q(pi) = Dirichlet(alpha')
+        q(pi) = stick-breaking transform of N(u'; m', s')
         q(mu_k) = N(mu'_k, Sigma'_k)
-        q(sigma_k) = Inv-Gamma(a'_k, b'_k)
+        q(sigma_k) = softplus transform of N(v'_k; m'_k, s'_k)
     (We collapse the c_n latent variables in the probability model's
     joint density.)
 
@@ -26,8 +26,8 @@ import edward as ed
 import tensorflow as tf
 import numpy as np
 
-from edward.models import Variational, Dirichlet, Normal, InvGamma
-from edward.stats import dirichlet, invgamma, multivariate_normal, norm
+from edward.models import Variational, Normal, TransformedNormal
+from edward.stats import dirichlet, invgamma, mixture, norm
 from edward.util import get_dims
 
 class MixtureGaussian:
@@ -66,25 +66,18 @@ class MixtureGaussian:
 
     def log_prob(self, xs, zs):
         """Returns a vector [log p(xs, zs[1,:]), ..., log p(xs, zs[S,:])]."""
-        N = get_dims(xs)[0]
         pi, mus, sigmas = self.unpack_params(zs)
         log_prior = dirichlet.logpdf(pi, self.alpha)
         log_prior += tf.reduce_sum(norm.logpdf(mus, 0, np.sqrt(self.c)), 1)
         log_prior += tf.reduce_sum(invgamma.logpdf(sigmas, self.a, self.b), 1)
 
-        # Loop over each mini-batch zs[b,:]
-        log_lik = []
+        # Evaluate all data points, components, and samples at once,
+        # marginalizing the components.
         n_minibatch = get_dims(zs)[0]
-        for s in range(n_minibatch):
-            log_lik_z = N*tf.reduce_sum(tf.log(pi), 1)
-            for k in range(self.K):
-                log_lik_z += tf.reduce_sum(multivariate_normal.logpdf(xs,
-                    mus[s, (k*self.D):((k+1)*self.D)],
-                    sigmas[s, (k*self.D):((k+1)*self.D)]))
-
-            log_lik += [log_lik_z]
-
-        return log_prior + tf.pack(log_lik)
+        mus = tf.reshape(mus, [n_minibatch, self.K, self.D])
+        sigmas = tf.reshape(sigmas, [n_minibatch, self.K, self.D])
+        log_lik = tf.reduce_sum(mixture.logpdf(xs, pi, mus, tf.sqrt(sigmas)), 1)
+        return log_prior + log_lik
 
 ed.set_seed(42)
 x = np.loadtxt('data/mixture_data.txt', dtype='float32', delimiter=',')
@@ -92,9 +85,12 @@ data = ed.Data(tf.constant(x, dtype=tf.float32))
 
 model = MixtureGaussian(K=2, D=2)
 variational = Variational()
-variational.add(Dirichlet([1, model.K]))
+# Normals on unconstrained spaces, mapped to the simplex and to
+# positive reals, so all latent variables are sampled in the graph
+# with reparameterization gradients.
+variational.add(TransformedNormal([1, model.K], transform='stick_breaking'))
 variational.add(Normal(model.K*model.D))
-variational.add(InvGamma(model.K*model.D))
+variational.add(TransformedNormal(model.K*model.D, transform='softplus'))
 
 inference = ed.MFVI(model, variational, data)
 inference.run(n_iter=500, n_minibatch=5, n_data=5)
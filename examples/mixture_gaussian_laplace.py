@@ -19,7 +19,7 @@ import edward as ed
 import tensorflow as tf
 import numpy as np
 
-from edward.stats import dirichlet, invgamma, multivariate_normal, norm
+from edward.stats import dirichlet, invgamma, mixture, norm
 from edward.util import get_dims
 
 class MixtureGaussian:
@@ -63,25 +63,18 @@ class MixtureGaussian:
 
     def log_prob(self, xs, zs):
         """Returns a vector [log p(xs, zs[1,:]), ..., log p(xs, zs[S,:])]."""
-        N = get_dims(xs)[0]
         pi, mus, sigmas = self.unpack_params(zs)
         log_prior = dirichlet.logpdf(pi, self.alpha)
         log_prior += tf.reduce_sum(norm.logpdf(mus, 0, np.sqrt(self.c)))
         log_prior += tf.reduce_sum(invgamma.logpdf(sigmas, self.a, self.b))
 
-        # Loop over each mini-batch zs[b,:]
-        log_lik = []
+        # Evaluate all data points, components, and samples at once,
+        # marginalizing the components.
         n_minibatch = get_dims(zs)[0]
-        for s in range(n_minibatch):
-            log_lik_z = N*tf.reduce_sum(tf.log(pi))
-            for k in range(self.K):
-                log_lik_z += tf.reduce_sum(multivariate_normal.logpdf(xs,
-                    mus[s, (k*self.D):((k+1)*self.D)],
-                    sigmas[s, (k*self.D):((k+1)*self.D)]))
-
-            log_lik += [log_lik_z]
-
-        return log_prior + tf.pack(log_lik)
+        mus = tf.reshape(mus, [n_minibatch, self.K, self.D])
+        sigmas = tf.reshape(sigmas, [n_minibatch, self.K, self.D])
+        log_lik = tf.reduce_sum(mixture.logpdf(xs, pi, mus, tf.sqrt(sigmas)), 1)
+        return log_prior + log_lik
 
 ed.set_seed(42)
 x = np.loadtxt('data/mixture_data.txt', dtype='float32', delimiter=',')
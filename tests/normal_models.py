@@ -0,0 +1,38 @@
+from __future__ import print_function
+import numpy as np
+import tensorflow as tf
+
+from edward.stats import norm
+
+class NormalModel:
+    """
+    p(x, z) = Normal(x | z, 1) * Normal(z | 0, 1)
+    """
+    def __init__(self):
+        self.num_vars = 1
+
+    def log_prob(self, xs, zs):
+        log_prior = norm.logpdf(zs[:, 0])
+        log_lik = tf.pack([tf.reduce_sum(norm.logpdf(xs, z)) for z in
+                           tf.unpack(zs[:, 0])])
+        return log_prior + log_lik
+
+    def sample_prior(self, size):
+        return tf.random_normal((size, self.num_vars))
+
+    def sample_likelihood(self, zs, size):
+        out = np.zeros((zs.shape[0], size))
+        for s in range(zs.shape[0]):
+            out[s, :] = norm.rvs(zs[s, 0], 1.0, size=size)
+
+        return out
+
+class LocalNormalModel:
+    """
+    p(x, z) = prod_n Normal(x_n | z_n, 1) Normal(z_n | 0, 1)
+    """
+    def __init__(self, n_data):
+        self.num_vars = n_data
+
+    def log_lik(self, xs, zs):
+        return tf.reduce_sum(-0.5 * tf.square(tf.transpose(xs) - zs), 1)
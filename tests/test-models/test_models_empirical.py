@@ -0,0 +1,21 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import os
+import tempfile
+import tensorflow as tf
+
+from edward.models import Variational, Empirical
+
+def test_sample():
+    trace = ed.Trace(os.path.join(tempfile.mkdtemp(), 'trace'),
+                     num_vars=2, n_chunk=4)
+    trace.append(np.array([[1.0, 2.0], [3.0, 4.0]] * 5))
+    variational = Variational()
+    variational.add(Empirical(trace))
+    assert not variational.is_reparam
+    zs, samples = variational.sample(size=6)
+    sess = ed.get_session()
+    zs = sess.run(zs, variational.np_dict(samples))
+    assert zs.shape == (6, 2)
+    assert np.all(zs[:, 1] - zs[:, 0] == 1.0)
@@ -0,0 +1,54 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import NormalFullRank, NormalLowRank
+from edward.stats import norm
+from scipy import stats
+
+sess = tf.Session()
+ed.set_seed(98765)
+
+loc = np.array([0.5, -1.0, 2.0], dtype=np.float32)
+scale_tril = np.array([[1.0, 0.0, 0.0],
+                       [0.5, 0.8, 0.0],
+                       [-0.3, 0.2, 0.6]], dtype=np.float32)
+scale = np.array([0.5, 1.0, 0.3], dtype=np.float32)
+factor = np.array([[1.0, 0.0], [0.5, -0.5], [0.2, 1.0]], dtype=np.float32)
+
+def _kl_true(mean, cov, loc_two, scale_two):
+    var_two = np.square(scale_two) * np.ones(len(mean))
+    return 0.5 * (np.sum(np.diag(cov) / var_two) +
+                  np.sum(np.square(mean - loc_two) / var_two) -
+                  len(mean) + np.sum(np.log(var_two)) -
+                  np.log(np.linalg.det(cov)))
+
+def _test(layer, cov):
+    z = np.random.randn(4, 3).astype(np.float32)
+    with sess.as_default():
+        assert np.allclose(layer.log_prob_i(0, tf.constant(z)).eval(),
+                           stats.multivariate_normal.logpdf(z, loc, cov),
+                           atol=1e-4)
+        assert np.allclose(layer.entropy().eval(),
+                           stats.multivariate_normal.entropy(loc, cov),
+                           atol=1e-4)
+        assert np.allclose(layer.kl(norm, [0.0, 2.0]).eval(),
+                           _kl_true(loc, cov, 0.0, 2.0), atol=1e-4)
+        x = layer.sample(50000).eval()
+
+    assert np.allclose(np.cov(x.T), cov, atol=0.05)
+
+def test_full_rank():
+    layer = NormalFullRank(3, loc=tf.constant(loc),
+                           scale_tril=tf.constant(scale_tril))
+    assert layer.is_reparam
+    assert layer.has_kl(norm)
+    _test(layer, np.dot(scale_tril, scale_tril.T))
+
+def test_low_rank():
+    layer = NormalLowRank(3, rank=2, loc=tf.constant(loc),
+                          scale=tf.constant(scale),
+                          factor=tf.constant(factor))
+    assert layer.is_reparam
+    _test(layer, np.diag(np.square(scale)) + np.dot(factor, factor.T))
@@ -0,0 +1,54 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Beta, Dirichlet, Gamma, InvGamma
+from scipy import stats
+
+sess = tf.Session()
+ed.set_seed(98765)
+
+def _assert_moments(x, mean, var, rtol=0.05):
+    assert np.allclose(np.mean(x, 0), mean, rtol=rtol)
+    assert np.allclose(np.var(x, 0), var, rtol=4*rtol)
+
+def test_gamma():
+    alpha = np.array([0.3, 1.0, 5.0], dtype=np.float32)
+    beta = np.array([2.0, 1.0, 0.5], dtype=np.float32)
+    layer = Gamma(3, alpha=tf.constant(alpha), beta=tf.constant(beta))
+    assert layer.is_reparam
+    x = sess.run(layer.sample(20000))
+    _assert_moments(x, stats.gamma.mean(alpha, scale=beta),
+                    stats.gamma.var(alpha, scale=beta))
+
+def test_gamma_grad():
+    # d/d alpha E[x] = 1 for x ~ Gamma(alpha, 1).
+    alpha = tf.constant([0.5, 2.0])
+    layer = Gamma(2, alpha=alpha, beta=tf.constant([1.0, 1.0]))
+    grad = tf.gradients(tf.reduce_mean(layer.sample(20000), 0), alpha)[0]
+    assert np.allclose(sess.run(grad), [1.0, 1.0], atol=0.05)
+
+def test_beta():
+    a = np.array([0.5, 2.0], dtype=np.float32)
+    b = np.array([0.5, 5.0], dtype=np.float32)
+    layer = Beta(2, alpha=tf.constant(a), beta=tf.constant(b))
+    x = sess.run(layer.sample(20000))
+    _assert_moments(x, stats.beta.mean(a, b), stats.beta.var(a, b))
+
+def test_dirichlet():
+    alpha = np.array([[1.0, 2.0, 3.0], [0.5, 0.5, 0.5]], dtype=np.float32)
+    layer = Dirichlet([2, 3], alpha=tf.constant(alpha))
+    x = sess.run(layer.sample(20000))
+    assert x.shape == (20000, 6)
+    assert np.allclose(np.sum(x[:, :3], 1), 1.0, atol=1e-5)
+    mean = (alpha / alpha.sum(1, keepdims=True)).flatten()
+    assert np.allclose(np.mean(x, 0), mean, atol=0.01)
+
+def test_invgamma():
+    alpha = np.array([10.0, 20.0], dtype=np.float32)
+    beta = np.array([1.0, 2.0], dtype=np.float32)
+    layer = InvGamma(2, alpha=tf.constant(alpha), beta=tf.constant(beta))
+    x = sess.run(layer.sample(20000))
+    _assert_moments(x, stats.invgamma.mean(alpha, scale=beta),
+                    stats.invgamma.var(alpha, scale=beta))
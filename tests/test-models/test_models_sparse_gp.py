@@ -0,0 +1,29 @@
+from __future__ import print_function
+import numpy as np
+import tensorflow as tf
+
+from edward.models import SparseGaussianProcess
+from edward.util import kernel_rbf
+
+sess = tf.Session()
+
+def test_project():
+    # With the inducing points at the inputs, the sparse GP prior
+    # covariance K_nm K_mm^{-1} K_mn recovers the full kernel matrix.
+    features = np.random.randn(6, 2).astype(np.float32)
+    xs = np.hstack([np.ones((6, 1)), features]).astype(np.float32)
+    model = SparseGaussianProcess(features, N=6, jitter=1e-8)
+    A = model.project(tf.constant(xs))
+    val_ed = sess.run(tf.matmul(A, A, transpose_b=True))
+    val_true = sess.run(kernel_rbf(features))
+    assert np.allclose(val_ed, val_true, atol=1e-3)
+
+def test_log_prob_shape():
+    features = np.random.randn(10, 2).astype(np.float32)
+    xs = np.hstack([np.random.randint(0, 2, (10, 1)),
+                    features]).astype(np.float32)
+    model = SparseGaussianProcess(features[:3], N=100)
+    zs = tf.constant(np.random.randn(4, 3).astype(np.float32))
+    val = sess.run(model.log_prob(tf.constant(xs), zs))
+    assert val.shape == (4, )
+    assert np.all(np.isfinite(val))
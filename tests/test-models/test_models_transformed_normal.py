@@ -0,0 +1,59 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import TransformedNormal
+from scipy import stats
+
+sess = tf.Session()
+ed.set_seed(98765)
+
+def _log_prob(layer, i, z):
+    with sess.as_default():
+        return layer.log_prob_i(i, tf.constant(z, dtype=tf.float32)).eval()
+
+def test_log():
+    layer = TransformedNormal(2, transform='log',
+                              loc=tf.constant([0.0, 1.0]),
+                              scale=tf.constant([1.0, 0.5]))
+    z = np.exp(np.random.randn(3, 2)).astype(np.float32)
+    assert np.allclose(_log_prob(layer, 1, z),
+                       stats.lognorm.logpdf(z[:, 1], 0.5, scale=np.exp(1.0)),
+                       atol=1e-4)
+
+def test_logit():
+    layer = TransformedNormal(1, transform='logit',
+                              loc=tf.constant([0.5]),
+                              scale=tf.constant([2.0]))
+    z = np.array([[0.1], [0.5], [0.9]], dtype=np.float32)
+    u = np.log(z[:, 0]) - np.log(1.0 - z[:, 0])
+    val_true = stats.norm.logpdf(u, 0.5, 2.0) - \
+        np.log(z[:, 0]) - np.log(1.0 - z[:, 0])
+    assert np.allclose(_log_prob(layer, 0, z), val_true, atol=1e-4)
+
+def test_softplus_sample():
+    layer = TransformedNormal(3, transform='softplus')
+    with sess.as_default():
+        tf.initialize_all_variables().run()
+        x = layer.sample(100).eval()
+
+    assert x.shape == (100, 3)
+    assert np.all(x > 0)
+
+def test_stick_breaking():
+    layer = TransformedNormal([2, 3], transform='stick_breaking',
+                              loc=tf.zeros([2, 2]),
+                              scale=tf.ones([2, 2]))
+    with sess.as_default():
+        x = layer.sample(100).eval()
+
+    assert x.shape == (100, 6)
+    assert np.all(x > 0)
+    assert np.allclose(np.sum(x[:, :3], 1), 1.0, atol=1e-5)
+    assert np.allclose(np.sum(x[:, 3:], 1), 1.0, atol=1e-5)
+    # The center of the simplex is the image of u = 0, where
+    # dx/du is diag(z (1 - z) * remaining) = diag(2/9, 1/6).
+    z = np.array([[1.0/3, 1.0/3, 1.0/3]], dtype=np.float32)
+    val_true = 2 * stats.norm.logpdf(0.0) - np.log(2.0/9 * 1.0/6)
+    assert np.allclose(_log_prob(layer, 0, z), val_true, atol=1e-4)
@@ -0,0 +1,74 @@
+from __future__ import print_function
+import numpy as np
+import tensorflow as tf
+
+from edward.stats import bernoulli, beta, dirichlet, gamma, invgamma, \
+    multinomial, norm, has_kl, kl
+from scipy import integrate, special, stats
+
+sess = tf.Session()
+
+def _assert_eq(val_ed, val_true):
+    with sess.as_default():
+        # NOTE: since Tensorflow has no special functions, the values here are
+        # only an approximation
+        assert np.allclose(val_ed.eval(), val_true, atol=1e-3)
+
+def _kl_numerical(q, p, lower, upper):
+    integrand = lambda x: q.pdf(x) * (q.logpdf(x) - p.logpdf(x))
+    return integrate.quad(integrand, lower, upper)[0]
+
+def test_bernoulli():
+    val_true = 0.2 * np.log(0.2 / 0.6) + 0.8 * np.log(0.8 / 0.4)
+    _assert_eq(kl(bernoulli, [0.2], bernoulli, [0.6]), val_true)
+
+def test_beta():
+    val_true = _kl_numerical(stats.beta(2.0, 3.0), stats.beta(1.5, 0.7),
+                             0.0, 1.0)
+    _assert_eq(kl(beta, [2.0, 3.0], beta, [1.5, 0.7]), val_true)
+
+def test_dirichlet():
+    # KL(Dir(alpha_one) || Dir(alpha_two)) in closed form, from
+    # the log normalizers and E[log x_k] = psi(alpha_k) - psi(sum alpha).
+    alpha_one = np.array([1.0, 2.0, 3.0])
+    alpha_two = np.array([0.5, 0.5, 4.0])
+    val_true = special.gammaln(alpha_one.sum()) - \
+        special.gammaln(alpha_two.sum()) - \
+        np.sum(special.gammaln(alpha_one) - special.gammaln(alpha_two)) + \
+        np.sum((alpha_one - alpha_two) *
+               (special.psi(alpha_one) - special.psi(alpha_one.sum())))
+    _assert_eq(kl(dirichlet, [alpha_one], dirichlet, [alpha_two]), val_true)
+    _assert_eq(kl(dirichlet, [np.vstack([alpha_one, alpha_one])],
+                  dirichlet, [alpha_two]), [val_true, val_true])
+
+def test_gamma():
+    val_true = _kl_numerical(stats.gamma(2.0, scale=3.0),
+                             stats.gamma(1.5, scale=0.7), 0.0, np.inf)
+    _assert_eq(kl(gamma, [2.0, 3.0], gamma, [1.5, 0.7]), val_true)
+
+def test_invgamma():
+    val_true = _kl_numerical(stats.invgamma(2.0, scale=3.0),
+                             stats.invgamma(1.5, scale=0.7), 0.0, np.inf)
+    _assert_eq(kl(invgamma, [2.0, 3.0], invgamma, [1.5, 0.7]), val_true)
+
+def test_multinomial():
+    p_one = np.array([0.2, 0.3, 0.5])
+    p_two = np.array([0.4, 0.4, 0.2])
+    val_true = np.sum(p_one * np.log(p_one / p_two))
+    _assert_eq(kl(multinomial, [1, p_one], multinomial, [1, p_two]), val_true)
+
+def test_norm():
+    val_true = _kl_numerical(stats.norm(0.3, 0.5), stats.norm(-1.0, 2.0),
+                             -np.inf, np.inf)
+    _assert_eq(kl(norm, [0.3, 0.5], norm, [-1.0, 2.0]), val_true)
+    _assert_eq(kl(norm, [tf.constant([0.3, 0.3]), 0.5], norm, [-1.0, 2.0]),
+               [val_true, val_true])
+
+def test_not_registered():
+    assert not has_kl(norm, beta)
+    try:
+        kl(norm, [0.0, 1.0], beta, [1.0, 1.0])
+    except NotImplementedError:
+        pass
+    else:
+        assert False
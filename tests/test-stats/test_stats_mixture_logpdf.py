@@ -0,0 +1,34 @@
+from __future__ import print_function
+import numpy as np
+import tensorflow as tf
+
+from edward.stats import mixture
+from scipy import stats
+
+sess = tf.Session()
+
+def _logpdf(x, pi, loc, scale):
+    log_components = np.array([np.log(pi[k]) +
+                               stats.norm.logpdf(x, loc[k], scale[k]).sum(1)
+                               for k in range(len(pi))])
+    m = log_components.max(0)
+    return m + np.log(np.exp(log_components - m).sum(0))
+
+x = np.random.randn(6, 2).astype(np.float32)
+pi = np.array([0.3, 0.7], dtype=np.float32)
+loc = np.array([[-1.0, 0.0], [1.0, 2.0]], dtype=np.float32)
+scale = np.array([[1.0, 0.5], [2.0, 1.0]], dtype=np.float32)
+
+def test_single():
+    val_ed = sess.run(mixture.logpdf(x, pi, loc, scale))
+    assert np.allclose(val_ed, _logpdf(x, pi, loc, scale), atol=1e-5)
+
+def test_batch():
+    pis = np.array([pi, pi[::-1]])
+    locs = np.array([loc, loc + 1.0])
+    scales = np.array([scale, scale * 2.0])
+    val_ed = sess.run(mixture.logpdf(x, pis, locs, scales))
+    assert val_ed.shape == (2, 6)
+    for s in range(2):
+        val_true = _logpdf(x, pis[s], locs[s], scales[s])
+        assert np.allclose(val_ed[s], val_true, atol=1e-5)
@@ -0,0 +1,49 @@
+from __future__ import print_function
+import numpy as np
+import tensorflow as tf
+
+from edward.stats import multinomial, poisson
+from scipy import sparse, stats
+
+sess = tf.Session()
+
+def _sparse(x):
+    x = sparse.coo_matrix(x)
+    indices = np.vstack((x.row, x.col)).T
+    return tf.SparseTensorValue(indices, x.data.astype(np.float32), x.shape)
+
+def test_poisson_sparse():
+    x = np.array([[0, 2, 0, 1], [0, 0, 0, 0], [3, 0, 0, 0]])
+    mu = np.random.uniform(0.5, 2.0, size=x.shape).astype(np.float32)
+    val_true = stats.poisson.logpmf(x, mu).sum(1)
+    val_ed = sess.run(poisson.logpmf(_sparse(x), tf.constant(mu)))
+    assert np.allclose(val_ed, val_true, atol=1e-4)
+
+def test_poisson_sparse_mu_sum():
+    x = np.array([[0, 2, 0, 1], [3, 0, 0, 0]])
+    mu = np.random.uniform(0.5, 2.0, size=x.shape).astype(np.float32)
+    indices, values, shape = _sparse(x)
+    mu_nonzero = mu[indices[:, 0], indices[:, 1]]
+    val_true = stats.poisson.logpmf(x, mu).sum(1)
+    val_ed = sess.run(poisson.logpmf(tf.SparseTensorValue(indices, values,
+                                                          shape),
+                                     tf.constant(mu_nonzero),
+                                     mu_sum=tf.constant(mu.sum(1))))
+    assert np.allclose(val_ed, val_true, atol=1e-4)
+
+def test_multinomial_sparse():
+    x = np.array([[0, 2, 0, 1], [1, 0, 2, 0]])
+    p = np.array([0.1, 0.2, 0.3, 0.4], dtype=np.float32)
+    val_true = np.array([stats.multinomial.logpmf(row, 3, p) for row in x])
+    val_ed = sess.run(multinomial.logpmf(_sparse(x), 3, tf.constant(p)))
+    assert np.allclose(val_ed, val_true, atol=1e-4)
+
+def test_dense_tuple():
+    # Tuples are dense inputs, not (indices, values, shape).
+    x = (1.0, 0.0, 2.0)
+    mu = np.array([0.5, 1.0, 1.5], dtype=np.float32)
+    val_ed = sess.run(poisson.logpmf(x, tf.constant(mu)))
+    assert np.allclose(val_ed, stats.poisson.logpmf(x, mu), atol=1e-4)
+    p = np.array([0.2, 0.3, 0.5], dtype=np.float32)
+    val_ed = sess.run(multinomial.logpmf(x, 3, tf.constant(p)))
+    assert np.allclose(val_ed, stats.multinomial.logpmf(x, 3, p), atol=1e-4)
@@ -0,0 +1,87 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.criticisms import RunningMoments
+from edward.models import Variational, AmortizedNormal, Normal
+
+class ZeroLikelihood:
+    """
+    p(x, z) = Normal(z | 0, 1), with log p(x | z) = 0
+    """
+    def __init__(self, num_vars):
+        self.num_vars = num_vars
+
+    def log_lik(self, xs, zs):
+        return 0.0 * tf.reduce_sum(zs, 1)
+
+def network(x):
+    w = tf.get_variable('w', [1], initializer=tf.constant_initializer(1.0))
+    loc = w * x
+    return [loc, tf.ones_like(loc)]
+
+x = np.array([[0.5], [1.5], [1.0], [-2.0], [0.0],
+              [0.5], [1.0], [3.0], [-1.0], [2.0]], dtype=np.float32)
+
+def test_build():
+    sess = tf.Session()
+    layer = AmortizedNormal((2, 1), network, scope='test_build')
+    variational = Variational()
+    variational.add(layer)
+    assert layer.is_local
+    assert variational.num_vars == 2
+
+    variational.build(tf.constant(x[:2]))
+    variational.build(tf.constant(x[2:4]))
+    sess.run(tf.initialize_all_variables())
+    assert np.allclose(sess.run(layer.loc), x[2:4, 0])
+    # The network is built twice with shared variables.
+    assert len([v for v in tf.all_variables()
+                if v.name.startswith('test_build/')]) == 1
+
+def test_local_scale():
+    model = ZeroLikelihood(3)
+    variational = Variational()
+    variational.add(AmortizedNormal((2, 1), network, scope='test_scale'))
+    variational.add(Normal(1, loc=tf.constant([1.0]),
+                           scale=tf.constant([1.0])))
+    inference = ed.MFVI(model, variational, ed.Data(x))
+    inference.initialize(n_data=2, n_print=None)
+    # KL to N(0, 1) of the minibatch's local variables is scaled by
+    # N / n_data = 5, and that of the global variable is not.
+    kl_local = 0.5 * np.sum(np.square(x[:2]))
+    kl_global = 0.5
+    loss = ed.get_session().run(inference.loss)
+    assert np.allclose(loss, -5.0 * kl_local - kl_global)
+
+def test_local_scale_requires_kl():
+    # log_prob() mixes local and global terms, so they cannot be scaled.
+    class JointModel:
+        num_vars = 2
+
+        def log_prob(self, xs, zs):
+            return tf.reduce_sum(zs, 1)
+
+    variational = Variational()
+    variational.add(AmortizedNormal((2, 1), network, scope='test_joint'))
+    inference = ed.MFVI(JointModel(), variational, ed.Data(x))
+    try:
+        inference.initialize(n_data=2, n_print=None)
+    except ValueError:
+        pass
+    else:
+        assert False
+
+def test_summarize():
+    # Local variables are drawn for the data summarized, rather than
+    # for the last minibatch trained on.
+    ed.set_seed(42)
+    layer = AmortizedNormal((2, 1), network, scope='test_summarize')
+    variational = Variational()
+    variational.add(layer)
+    inference = ed.MFVI(ZeroLikelihood(2), variational, ed.Data(x))
+    inference.initialize(n_data=2, n_print=None)
+    moments, = ed.criticisms.summarize(variational, [RunningMoments(10)],
+                                       size=5000, data=ed.Data(x))
+    assert np.allclose(moments.mean, x[:, 0], atol=0.1)
@@ -0,0 +1,42 @@
+from __future__ import print_function
+import csv
+import edward as ed
+import json
+import os
+import tempfile
+import tensorflow as tf
+
+from edward.models import Variational, Normal
+from normal_models import NormalModel
+
+def _run(logger):
+    ed.set_seed(42)
+    model = NormalModel()
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(tf.constant([0.5, 1.5, 1.0], dtype=tf.float32))
+    inference = ed.MFVI(model, variational, data)
+    inference.run(n_iter=20, n_minibatch=2, n_print=None,
+                  callbacks=[logger])
+
+def test_jsonl():
+    path = os.path.join(tempfile.mkdtemp(), 'log.jsonl')
+    _run(ed.MetricsLogger(path, n_log=5, params=['0/loc'],
+                          dump_params=True, async_write=True))
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+
+    assert [r['iter'] for r in records] == [0, 5, 10, 15, 20]
+    assert records[-1]['samples_per_sec'] > 0
+    assert records[-1]['0/loc/min'] <= records[-1]['0/loc/max']
+    assert len(records[-1]['0/loc']) == 1
+    assert '0/scale/mean' not in records[-1]
+
+def test_csv():
+    path = os.path.join(tempfile.mkdtemp(), 'log.csv')
+    _run(ed.MetricsLogger(path, n_log=10, params=True))
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+
+    assert [int(row['iter']) for row in rows] == [0, 10, 20]
+    assert '0/scale/std' in rows[0]
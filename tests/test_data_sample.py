@@ -46,6 +46,19 @@ def test_ndarray_multiple_samples():
     data_ndarray = ed.Data(np.array(data))
     _test(data_ndarray, 2, _assert_eq_ndarray)
 
+def test_sparse_sample():
+    from scipy import sparse
+    x = sparse.csr_matrix(np.array([[0, 2, 0], [1, 0, 0], [0, 0, 3]]))
+    data_sparse = ed.Data(x)
+    minibatch = data_sparse.sample(n_data=2)
+    assert isinstance(minibatch, tf.SparseTensor)
+    dense = tf.sparse_tensor_to_dense(minibatch)
+    assert np.all(sess.run(dense, data_sparse.feed_dict()) ==
+                  x[[0, 1]].toarray())
+    # a new mini-batch is fed each time, wrapping around to the first row
+    assert np.all(sess.run(dense, data_sparse.feed_dict()) ==
+                  x[[2, 0]].toarray())
+
 # TODO: test dict
 #def test_dict_single_sample():
 #    data_dict = ed.Data(dict(N=len(data), y=data))
@@ -0,0 +1,70 @@
+from __future__ import print_function
+import numpy as np
+import os
+import tempfile
+
+from edward.criticisms import autocorrelation, effective_sample_size, rhat, \
+    _rank_normalize
+
+def _ar1(phi, n_chains, n_draws, n_params):
+    eps = np.random.randn(n_chains, n_draws, n_params)
+    x = np.zeros(eps.shape)
+    for t in range(1, n_draws):
+        x[:, t] = phi * x[:, t-1] + eps[:, t]
+
+    return x
+
+def test_autocorrelation():
+    np.random.seed(42)
+    x = _ar1(0.5, 2, 5000, 3)
+    acf = autocorrelation(x, n_block=2)
+    assert acf.shape == x.shape
+    assert np.allclose(acf[:, 0], 1.0)
+    assert np.allclose(acf[:, 1:4], 0.5**np.arange(1, 4)[:, np.newaxis],
+                       atol=0.05)
+
+def test_ess_iid():
+    np.random.seed(42)
+    x = np.random.randn(4, 1000, 5)
+    for method in ['bulk', 'tail', 'split']:
+        ess = effective_sample_size(x, method)
+        assert ess.shape == (5, )
+        assert np.all(ess > 3000)
+
+def test_ess_ar1():
+    np.random.seed(42)
+    phi = 0.9
+    x = _ar1(phi, 4, 5000, 2)
+    ess = effective_sample_size(x, 'split')
+    ess_true = 4 * 5000 * (1.0 - phi) / (1.0 + phi)
+    assert np.allclose(ess, ess_true, rtol=0.2)
+
+def test_rhat():
+    np.random.seed(42)
+    x = np.random.randn(4, 1000)
+    assert np.isclose(rhat(x), 1.0, atol=0.01)
+    x[0] += 3.0
+    assert rhat(x) > 1.1
+    assert rhat(x, 'split') > 1.1
+
+def test_memmap():
+    np.random.seed(42)
+    x = np.random.randn(2, 100, 7).astype(np.float32)
+    path = os.path.join(tempfile.mkdtemp(), 'trace.npy')
+    np.save(path, x)
+    x_mmap = np.load(path, mmap_mode='r')
+    assert np.allclose(rhat(x_mmap, n_block=3), rhat(x))
+    assert np.allclose(effective_sample_size(x_mmap, n_block=3),
+                       effective_sample_size(x))
+
+def test_rank_normalize_ties():
+    # Tied draws get the same z-score, whatever their order.
+    np.random.seed(42)
+    x = np.random.randint(0, 3, size=(2, 50, 2)).astype(np.float64)
+    z = _rank_normalize(x)
+    for j in range(2):
+        for value in range(3):
+            assert np.allclose(z[..., j][x[..., j] == value],
+                               z[..., j][x[..., j] == value][0])
+
+    assert np.allclose(rhat(x), rhat(x[:, ::-1]))
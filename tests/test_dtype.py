@@ -0,0 +1,59 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Variational, Normal
+from edward.stats import norm
+from edward.util import dtype_policy, get_dtype, has_dtype_policy
+from normal_models import NormalModel
+
+def test_policy():
+    assert get_dtype() == tf.float32
+    with dtype_policy(compute=tf.float64):
+        assert get_dtype() == tf.float64
+        assert get_dtype('storage') == tf.float64
+        assert norm.logpdf(np.zeros(3)).dtype == tf.float64
+
+    assert get_dtype() == tf.float32
+    assert get_dtype('storage') == tf.float32
+
+def test_storage_default():
+    # The storage type follows the compute type until it is set.
+    assert not has_dtype_policy()
+    with dtype_policy(storage=tf.float16):
+        with dtype_policy(compute=tf.float64):
+            assert get_dtype('storage') == tf.float16
+
+        assert get_dtype('storage') == tf.float16
+
+    assert not has_dtype_policy()
+
+def test_data_default():
+    # Without a policy, data keeps its own type.
+    data = ed.Data(np.random.randn(10, 2))
+    assert data.data.dtype == np.float64
+    assert data.sample(5).dtype == np.float64
+
+def test_data_storage():
+    with dtype_policy(compute=tf.float32, storage=tf.float16):
+        data = ed.Data(np.random.randn(10, 2))
+        assert data.data.dtype == np.float16
+        assert data.sample(5).dtype == np.float32
+
+    # Integer data is left as is.
+    with dtype_policy(storage=tf.float16):
+        data = ed.Data(np.arange(10))
+        assert data.data.dtype == np.arange(10).dtype
+
+def test_inference_float64():
+    ed.set_seed(42)
+    model = NormalModel()
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(np.array([0.5, 1.5, 1.0]))
+    inference = ed.MFVI(model, variational, data)
+    inference.initialize(n_minibatch=2, n_print=None, dtype=tf.float64)
+    assert inference.loss.dtype == tf.float64
+    assert np.isfinite(inference.update())
+    assert get_dtype() == tf.float32
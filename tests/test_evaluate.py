@@ -0,0 +1,121 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Variational, PointMass
+
+class LinearModel:
+    def __init__(self):
+        self.num_vars = 2
+
+    def predict(self, xs, zs):
+        y_true = xs[:, 0]
+        x = xs[:, 1:]
+        y_pred = tf.reduce_mean(tf.matmul(x, tf.transpose(zs)), 1)
+        return y_pred, y_true
+
+class MulticlassModel:
+    def __init__(self):
+        self.num_vars = 2
+
+    def predict(self, xs, zs):
+        # Predict the class in the second column with certainty.
+        y_true = xs[:, 0]
+        y_pred = tf.one_hot(tf.cast(xs[:, 1], tf.int32), 3)
+        return y_pred, y_true
+
+class BinaryModel:
+    def __init__(self):
+        self.num_vars = 2
+
+    def predict(self, xs, zs):
+        # Predict the probability in the second column.
+        y_true = xs[:, 0]
+        y_pred = xs[:, 1]
+        return y_pred, y_true
+
+class CountingVariational(Variational):
+    """Variational model counting the draws fed into the graph."""
+    n_draws = 0
+
+    def np_dict(self, samples):
+        self.n_draws += 1
+        return Variational.np_dict(self, samples)
+
+def _test(xs, metrics, n_chunk, n_data):
+    model = LinearModel()
+    variational = Variational()
+    variational.add(PointMass(model.num_vars,
+                              tf.constant([1.0, -1.0])))
+    data = ed.Data(xs)
+    val_full = ed.evaluate(metrics, model, variational, data,
+                           n_minibatch=4)
+    val_chunk = ed.evaluate(metrics, model, variational, data,
+                            n_minibatch=4, n_chunk=n_chunk,
+                            n_data=n_data)
+    assert np.allclose(val_full, val_chunk, atol=1e-5)
+
+def test_ndarray():
+    xs = np.random.randn(10, 3).astype(np.float32)
+    _test(xs, ['mse', 'mae'], 2, 3)
+
+def test_tensor():
+    xs = tf.constant(np.random.randn(10, 3), dtype=tf.float32)
+    _test(xs, ['mse', 'mape'], 1, 4)
+
+def test_log_lik():
+    xs = np.random.randn(10, 3).astype(np.float32)
+    _test(xs, 'log_lik', 2, 5)
+
+def test_cached_graph():
+    model = LinearModel()
+    variational = Variational()
+    variational.add(PointMass(model.num_vars,
+                              tf.constant([1.0, -1.0])))
+    data = ed.Data(np.random.randn(10, 3).astype(np.float32))
+    val1 = ed.evaluate(['mse', 'mae'], model, variational, data)
+    n_ops = len(tf.get_default_graph().get_operations())
+    val2 = ed.evaluate(['mse', 'mae'], model, variational, data)
+    assert len(tf.get_default_graph().get_operations()) == n_ops
+    assert np.allclose(val1, val2)
+
+def test_multiclass_accuracy():
+    model = MulticlassModel()
+    variational = Variational()
+    variational.add(PointMass(model.num_vars,
+                              tf.constant([1.0, -1.0])))
+    xs = np.array([[0, 0], [1, 1], [2, 2], [2, 0], [1, 2], [0, 0]],
+                  dtype=np.float32)
+    data = ed.Data(xs)
+    val_full = ed.evaluate('accuracy', model, variational, data,
+                           n_minibatch=4)
+    val_chunk = ed.evaluate('accuracy', model, variational, data,
+                            n_minibatch=4, n_chunk=2, n_data=4)
+    assert np.allclose(val_full, 4.0 / 6.0)
+    assert np.allclose(val_chunk, 4.0 / 6.0)
+
+def test_binary_accuracy():
+    model = BinaryModel()
+    variational = CountingVariational()
+    variational.add(PointMass(model.num_vars,
+                              tf.constant([1.0, -1.0])))
+    xs = np.array([[0, 0.2], [1, 0.9], [1, 0.3], [0, 0.6], [1, 0.7]],
+                  dtype=np.float32)
+    data = ed.Data(xs)
+    val = ed.evaluate('accuracy', model, variational, data,
+                      n_minibatch=4, n_data=2)
+    assert np.allclose(val, 3.0 / 5.0)
+    # The support of y_true is found in the same pass as the metric.
+    assert variational.n_draws == 3
+
+def test_draws_per_chunk():
+    model = LinearModel()
+    variational = CountingVariational()
+    variational.add(PointMass(model.num_vars,
+                              tf.constant([1.0, -1.0])))
+    data = ed.Data(np.random.randn(10, 3).astype(np.float32))
+    ed.evaluate('mse', model, variational, data, n_minibatch=4,
+                n_chunk=2, n_data=5)
+    # Two chunks of data, each with two chunks of latent variables.
+    assert variational.n_draws == 4
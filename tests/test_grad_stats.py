@@ -0,0 +1,42 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Variational, Normal
+from normal_models import NormalModel
+
+def _inference():
+    ed.set_seed(42)
+    model = NormalModel()
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(tf.constant([0.5, 1.5, 1.0], dtype=tf.float32))
+    return ed.MFVI(model, variational, data)
+
+def test_grad_stats():
+    inference = _inference()
+    inference.initialize(n_iter=10, n_minibatch=5, n_print=None,
+                         grad_stats=True, n_grad_stats=2)
+    for t in range(10):
+        inference.update()
+
+    assert set(inference.grad_var.keys()) == set(['score', 'reparam'])
+    # loc and the unconstrained scale
+    assert inference.grad_var['reparam'].shape == (2, )
+    assert np.all(inference.grad_var['reparam'] >= 0)
+    assert inference.gradient_snr().shape == (2, )
+
+    recommendation = inference.recommend(target_snr=2.0)
+    assert recommendation['n_minibatch'] >= 1
+    # The reparameterization gradient has lower variance here.
+    assert not recommendation['score']
+
+def test_grad_stats_requires_minibatch():
+    inference = _inference()
+    try:
+        inference.initialize(n_minibatch=1, grad_stats=True, n_print=None)
+    except ValueError:
+        pass
+    else:
+        assert False
@@ -0,0 +1,27 @@
+from __future__ import print_function
+import edward as ed
+import tensorflow as tf
+
+from edward.models import Variational, Normal
+from normal_models import NormalModel
+
+def test_graph_report():
+    ed.set_seed(42)
+    model = NormalModel()
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(tf.constant([0.5, 1.5, 1.0], dtype=tf.float32))
+    inference = ed.MFVI(model, variational, data)
+    inference.initialize(n_minibatch=5, n_print=None)
+    report = inference.graph_report()
+
+    assert report['n_ops'] == sum(report['ops'].values())
+    assert report['ops']['log_prob'] > 0
+    unrolled = [f for f in report['unrolled']
+                if f['component'] == 'log_prob' and f['type'] == 'Unpack']
+    assert len(unrolled) == 1
+    assert unrolled[0]['scales_with'] == ['n_minibatch']
+    assert unrolled[0]['ops_per_row'] > 0
+    assert report['memory']['peak_bytes'] >= \
+        report['memory']['variable_bytes'] > 0
+    assert len(report['memory']['largest']) <= 10
@@ -0,0 +1,26 @@
+from __future__ import print_function
+import subprocess
+import sys
+
+def _loaded(script, modules):
+    script += ("; import sys; print(','.join(m for m in %r "
+               "if m in sys.modules))" % (modules, ))
+    out = subprocess.check_output([sys.executable, '-c', script])
+    return out.decode().strip().split('\n')[-1]
+
+def test_lazy_imports():
+    modules = ['pymc3', 'pystan', 'theano', 'prettytensor', 'scipy.stats']
+    assert _loaded("import edward", modules) == ''
+
+def test_lazy_submodules():
+    if sys.version_info < (3, 7):
+        return
+
+    modules = ['edward.callbacks', 'edward.criticisms', 'edward.inferences',
+               'edward.models', 'edward.stats', 'edward.traces']
+    assert _loaded("import edward", modules) == ''
+    # Only the submodules of the names used are imported.
+    assert _loaded("import edward; edward.Trace", modules) == \
+        'edward.traces'
+    assert 'edward.inferences' in _loaded("import edward; edward.MFVI",
+                                          modules)
@@ -0,0 +1,72 @@
+from __future__ import print_function
+import edward as ed
+import json
+import numpy as np
+import os
+import tempfile
+import tensorflow as tf
+
+from edward.models import Variational, IndexedNormal
+from normal_models import LocalNormalModel
+
+def test_gather():
+    ed.set_seed(42)
+    layer = IndexedNormal((10, 2), 3, idx=tf.constant([1, 4, 7]))
+    sess = ed.get_session()
+    sess.run(tf.initialize_all_variables())
+    loc, loc_all = sess.run([layer.loc, layer.loc_all])
+    assert layer.num_vars == 6
+    assert np.allclose(loc, loc_all[[1, 4, 7]].flatten())
+
+def test_update_rows():
+    ed.set_seed(42)
+    x_ph = tf.placeholder(tf.float32, [3, 1])
+    layer = IndexedNormal((10, 1), 3)
+    variational = Variational()
+    variational.add(layer)
+    inference = ed.MFVI(LocalNormalModel(3), variational, ed.Data(x_ph))
+    inference.initialize(n_print=None)
+    sess = ed.get_session()
+    before = sess.run(layer.loc_all)
+    idx = np.array([1, 4, 7])
+    inference.update({x_ph: np.ones((3, 1)), layer.idx: idx})
+    after = sess.run(layer.loc_all)
+    # Only the minibatch's rows are updated.
+    rest = np.setdiff1d(np.arange(10), idx)
+    assert np.allclose(before[rest], after[rest])
+    assert not np.allclose(before[idx], after[idx])
+
+def test_run_requires_idx():
+    x_ph = tf.placeholder(tf.float32, [3, 1])
+    variational = Variational()
+    variational.add(IndexedNormal((10, 1), 3))
+    inference = ed.MFVI(LocalNormalModel(3), variational, ed.Data(x_ph))
+    try:
+        inference.run(n_iter=1, n_print=None)
+    except ValueError:
+        pass
+    else:
+        assert False
+
+def test_log_params():
+    # Only the parameters of all rows are logged, as the minibatch's
+    # depend on the fed row indices.
+    ed.set_seed(42)
+    path = os.path.join(tempfile.mkdtemp(), 'log.jsonl')
+    x_ph = tf.placeholder(tf.float32, [3, 1])
+    layer = IndexedNormal((10, 1), 3)
+    variational = Variational()
+    variational.add(layer)
+    inference = ed.MFVI(LocalNormalModel(3), variational, ed.Data(x_ph))
+    inference.initialize(n_print=None,
+                         callbacks=[ed.MetricsLogger(path, params=True)])
+    loss = inference.update({x_ph: np.ones((3, 1)),
+                             layer.idx: np.array([1, 4, 7])})
+    inference.print_progress(0, loss)
+    inference.callbacks[-1].close()
+    with open(path) as f:
+        record = json.loads(f.readline())
+
+    assert '0/loc_all/mean' in record
+    assert '0/scale_all/mean' in record
+    assert '0/loc/mean' not in record
@@ -0,0 +1,47 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Variational, Normal
+from normal_models import NormalModel
+from scipy import stats
+
+x = np.array([0.5, 1.5, 1.0], dtype=np.float32)
+
+def test_exact_posterior():
+    # With q equal to the posterior, every importance weight is p(x),
+    # so the bound is exact for any K.
+    model = NormalModel()
+    variational = Variational()
+    variational.add(Normal(1, loc=tf.constant([0.75]),
+                           scale=tf.constant([0.5])))
+    inference = ed.IWAE(model, variational, ed.Data(tf.constant(x)))
+    log_evidence = stats.multivariate_normal.logpdf(
+        x, np.zeros(3), np.eye(3) + np.ones((3, 3)))
+    assert np.allclose(inference.bound(K=50), log_evidence, atol=1e-3)
+
+def test_subsampled_bound():
+    # Updates use minibatches of 2, but the bound is on all the data.
+    model = NormalModel()
+    loc = tf.Variable([0.75])
+    variational = Variational()
+    variational.add(Normal(1, loc=loc, scale=tf.constant([0.5])))
+    inference = ed.IWAE(model, variational, ed.Data(tf.constant(x)))
+    inference.initialize(K=10, n_data=2, n_print=None)
+    log_evidence = stats.multivariate_normal.logpdf(
+        x, np.zeros(3), np.eye(3) + np.ones((3, 3)))
+    assert np.allclose(inference.bound(K=50), log_evidence, atol=1e-3)
+
+def test_run():
+    ed.set_seed(42)
+    model = NormalModel()
+    variational = Variational()
+    variational.add(Normal(1))
+    inference = ed.IWAE(model, variational, ed.Data(tf.constant(x)))
+    inference.initialize(K=10, n_minibatch=4, n_print=None)
+    for t in range(5):
+        loss = inference.update()
+
+    assert np.isfinite(loss)
+    assert np.isfinite(inference.bound(K=100, n_repeat=2))
@@ -0,0 +1,41 @@
+from __future__ import print_function
+import numpy as np
+import tensorflow as tf
+
+from edward.util import kernel_linear, kernel_matern, kernel_rbf
+
+sess = tf.Session()
+
+def _sq_dist(x, y, l):
+    diff = x[:, np.newaxis, :] / l - y[np.newaxis, :, :] / l
+    return np.sum(diff**2, 2)
+
+x = np.random.randn(5, 3).astype(np.float32)
+y = np.random.randn(4, 3).astype(np.float32)
+l = np.array([0.5, 1.0, 2.0], dtype=np.float32)
+
+def test_rbf():
+    val_true = 1.5**2 * np.exp(-0.5 * _sq_dist(x, y, l))
+    val_ed = sess.run(kernel_rbf(x, y, sigma=1.5, l=l))
+    assert np.allclose(val_ed, val_true, atol=1e-5)
+
+def test_rbf_symmetric():
+    val_ed = sess.run(kernel_rbf(x))
+    assert val_ed.shape == (5, 5)
+    assert np.allclose(np.diag(val_ed), 1.0, atol=1e-5)
+    assert np.allclose(val_ed, val_ed.T, atol=1e-6)
+
+def test_matern():
+    r = np.sqrt(_sq_dist(x, y, l))
+    val_true = {0.5: np.exp(-r),
+                1.5: (1 + np.sqrt(3) * r) * np.exp(-np.sqrt(3) * r),
+                2.5: (1 + np.sqrt(5) * r + 5.0 / 3.0 * r**2) *
+                     np.exp(-np.sqrt(5) * r)}
+    for nu in [0.5, 1.5, 2.5]:
+        val_ed = sess.run(kernel_matern(x, y, l=l, nu=nu))
+        assert np.allclose(val_ed, val_true[nu], atol=1e-5)
+
+def test_linear():
+    val_true = np.dot(x * l, (y * l).T) + 0.5
+    val_ed = sess.run(kernel_linear(x, y, sigma=l, c=0.5))
+    assert np.allclose(val_ed, val_true, atol=1e-5)
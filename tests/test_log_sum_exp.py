@@ -17,5 +17,25 @@ class test_log_sum_exp(unittest.TestCase):
 
     self.assertAlmostEqual(result.eval(), hand_derived_result)
 
+  def test_axis(self):
+    sess = tf.InteractiveSession()
+
+    x = np.array([[-1.0, -2.0, 1000.0], [-3.0, -4.0, -1000.0]],
+                 dtype=np.float32)
+    m = x.max(1, keepdims=True)
+    expected = (m + np.log(np.exp(x - m).sum(1, keepdims=True)))
+    result = log_sum_exp(tf.constant(x), 1)
+    self.assertTrue(np.allclose(result.eval(), expected[:, 0]))
+    result = log_sum_exp(tf.constant(x), -1, keep_dims=True)
+    self.assertTrue(np.allclose(result.eval(), expected))
+
+  def test_all_inf(self):
+    sess = tf.InteractiveSession()
+
+    x = tf.constant([[-np.inf, -np.inf], [0.0, 0.0]])
+    result = log_sum_exp(x, 1).eval()
+    self.assertEqual(result[0], -np.inf)
+    self.assertAlmostEqual(result[1], np.log(2.0), places=5)
+
 if __name__ == '__main__':
     unittest.main()
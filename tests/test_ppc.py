@@ -0,0 +1,80 @@
+from __future__ import print_function
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Variational, Normal
+from normal_models import NormalModel
+
+T_mean = lambda ys, zs=None: tf.reduce_mean(ys, 1)
+T_max = lambda ys, zs=None: tf.reduce_max(ys, 1)
+
+def _variational(model):
+    variational = Variational()
+    variational.add(Normal(model.num_vars, loc=tf.constant([0.0]),
+                           scale=tf.constant([1.0])))
+    return variational
+
+def test_batched_shapes():
+    model = NormalModel()
+    variational = _variational(model)
+    data = ed.Data(tf.constant(np.random.randn(20), dtype=tf.float32))
+    Tyreps, Tys = ed.ppc(model, variational, data, T_mean, size=25,
+                         n_chunk=10)
+    assert Tyreps.shape == (25, )
+    assert Tys.shape == (25, )
+
+def test_batched_prior():
+    model = NormalModel()
+    Tyreps = ed.ppc(model, T=T_mean, size=25, n_chunk=10)
+    assert Tyreps.shape == (25, )
+
+def test_pvalues():
+    model = NormalModel()
+    variational = _variational(model)
+    data = ed.Data(tf.constant(np.random.randn(20), dtype=tf.float32))
+    pvalues = ed.ppc_pvalue(model, variational, data, [T_mean, T_max],
+                            size=50, n_chunk=20)
+    assert len(pvalues) == 2
+    for pvalue in pvalues:
+        assert 0.0 <= pvalue <= 1.0
+
+def test_pvalues_default_T():
+    model = NormalModel()
+    variational = _variational(model)
+    data = ed.Data(tf.constant(np.random.randn(20), dtype=tf.float32))
+    pvalues = ed.ppc_pvalue(model, variational, data, size=30)
+    assert pvalues.shape == (20, )
+    assert np.all((0.0 <= pvalues) & (pvalues <= 1.0))
+
+def test_cached_graph():
+    model = NormalModel()
+    variational = _variational(model)
+    data = ed.Data(tf.constant(np.random.randn(20), dtype=tf.float32))
+    ed.ppc_pvalue(model, variational, data, T_mean, size=20, n_chunk=10)
+    n_ops = len(tf.get_default_graph().get_operations())
+    ed.ppc_pvalue(model, variational, data, T_mean, size=20, n_chunk=10)
+    assert len(tf.get_default_graph().get_operations()) == n_ops
+
+T_noise = lambda ys, zs: tf.reduce_mean(ys - zs, 1)
+
+def test_parallel_reproducible():
+    # The latent variables differ across calls, but the likelihood
+    # noise yrep - z is seeded.
+    model = NormalModel()
+    variational = _variational(model)
+    data = ed.Data(tf.constant(np.random.randn(20), dtype=tf.float32))
+    Tyreps1, _ = ed.ppc(model, variational, data, T_noise, size=40,
+                        n_chunk=10, seed=42)
+    Tyreps2, _ = ed.ppc(model, variational, data, T_noise, size=40,
+                        n_chunk=10, n_jobs=2, seed=42)
+    assert np.allclose(Tyreps1, Tyreps2, atol=1e-5)
+
+def test_seed_keeps_global_state():
+    model = NormalModel()
+    variational = _variational(model)
+    np.random.seed(1)
+    expected = np.random.rand()
+    np.random.seed(1)
+    ed.ppc(model, variational, T=T_mean, size=20, n_chunk=10, seed=42)
+    assert np.random.rand() == expected
@@ -0,0 +1,32 @@
+from __future__ import print_function
+import edward as ed
+import os
+import tempfile
+import tensorflow as tf
+
+from edward.models import Variational, Normal
+from normal_models import NormalModel
+
+def test_profile():
+    ed.set_seed(42)
+    model = NormalModel()
+    variational = Variational()
+    variational.add(Normal(model.num_vars))
+    data = ed.Data(tf.constant([0.5, 1.5, 1.0], dtype=tf.float32))
+    trace_dir = tempfile.mkdtemp()
+
+    inference = ed.MFVI(model, variational, data)
+    inference.initialize(n_iter=5, n_minibatch=2, n_print=None,
+                         trace_steps=[2], trace_dir=trace_dir)
+    for t in range(5):
+        inference.update()
+
+    assert len(inference.profile_stats) == 5
+    assert 'ops' in inference.profile_stats[2]
+    assert 'ops' not in inference.profile_stats[0]
+    assert os.path.exists(os.path.join(trace_dir, 'timeline_2.json'))
+
+    summary = inference.profile_summary()
+    assert summary['run'] > 0
+    assert 'log_prob' in summary['ops']
+    assert 'q_log_prob' in summary['ops']
@@ -0,0 +1,32 @@
+from __future__ import print_function
+import numpy as np
+
+from edward.criticisms import RunningMoments, RunningQuantiles
+
+def test_moments():
+    np.random.seed(42)
+    x = np.random.randn(1000, 3) * [1.0, 2.0, 3.0] + [0.0, 1.0, 2.0]
+    moments = RunningMoments(3, cov=True)
+    for start in range(0, 1000, 70):
+        moments.update(x[start:(start + 70)])
+
+    assert moments.n == 1000
+    assert np.allclose(moments.mean, np.mean(x, 0))
+    assert np.allclose(moments.var, np.var(x, 0, ddof=1))
+    assert np.allclose(moments.cov, np.cov(x.T))
+
+def test_quantiles():
+    np.random.seed(42)
+    x = np.random.randn(5000, 2) * [1.0, 5.0]
+    quantiles = RunningQuantiles(2, probs=[0.1, 0.5, 0.9])
+    for start in range(0, 5000, 500):
+        quantiles.update(x[start:(start + 500)])
+
+    assert np.allclose(quantiles.quantiles,
+                       np.percentile(x, [10, 50, 90], axis=0), atol=0.1)
+
+def test_quantiles_few_samples():
+    x = np.array([[1.0], [3.0], [2.0]])
+    quantiles = RunningQuantiles(1, probs=[0.5])
+    quantiles.update(x)
+    assert np.allclose(quantiles.quantiles, [[2.0]])
@@ -0,0 +1,93 @@
+from __future__ import print_function
+import numpy as np
+import os
+import tempfile
+
+from edward.traces import Trace
+
+def _path():
+    return os.path.join(tempfile.mkdtemp(), 'trace')
+
+def test_append_read():
+    x = np.random.randn(25, 3)
+    trace = Trace(_path(), num_vars=3, n_chunk=10)
+    trace.append(x[:7])
+    trace.append(x[7:])
+    assert len(trace) == 25
+    assert len(trace.chunk_sizes) == 2
+    assert np.allclose(trace.read(), x.astype(np.float32))
+    assert np.allclose(trace.get([24, 0, 13]), x[[24, 0, 13]])
+
+def test_thin():
+    x = np.random.randn(20, 2)
+    trace = Trace(_path(), num_vars=2, thin=3, n_chunk=4)
+    for i in range(20):
+        trace.append(x[i])
+
+    assert np.allclose(trace.read(), x[::3].astype(np.float32))
+
+def test_float16_reopen():
+    path = _path()
+    x = np.random.randn(15, 4)
+    trace = Trace(path, num_vars=4, dtype='float16', thin=2, n_chunk=5)
+    trace.append(x[:9])
+    trace.flush()
+    trace = Trace(path)
+    trace.append(x[9:])
+    trace.flush()
+    assert trace.dtype == 'float16'
+    assert np.allclose(trace.read(), x[::2], atol=1e-2)
+    for chunk in trace.chunks():
+        assert chunk.dtype == np.float16
+
+def test_sample():
+    trace = Trace(_path(), num_vars=2, n_chunk=10)
+    trace.append(np.ones((30, 2)))
+    samples = trace.sample(50)
+    assert samples.shape == (50, 2)
+    assert samples.dtype == np.float32
+    assert np.all(samples == 1.0)
+
+def test_metadata_on_flush():
+    path = _path()
+    trace = Trace(path, num_vars=2, n_chunk=10)
+    meta_path = os.path.join(path, 'trace.json')
+    with open(meta_path) as f:
+        meta = f.read()
+
+    for i in range(5):
+        trace.append(np.ones(2))
+
+    with open(meta_path) as f:
+        assert f.read() == meta
+
+    trace.flush()
+    with open(meta_path) as f:
+        assert f.read() != meta
+
+def test_reopen_without_flush():
+    # Only the samples on disk are recovered, and thinning resumes
+    # right after the last of them.
+    path = _path()
+    x = np.random.randn(20, 2)
+    trace = Trace(path, num_vars=2, thin=2, n_chunk=3)
+    trace.append(x[:9])
+    assert len(trace) == 5
+    trace = Trace(path)
+    assert len(trace) == 3
+    trace.append(x[5:])
+    trace.flush()
+    assert np.allclose(trace.read(), x[::2].astype(np.float32))
+
+def test_reopen_mismatch():
+    path = _path()
+    trace = Trace(path, num_vars=2, thin=2)
+    trace.flush()
+    Trace(path, num_vars=2, thin=2, n_chunk=5)
+    for kwargs in [{'thin': 3}, {'dtype': 'float16'}, {'num_vars': 3}]:
+        try:
+            Trace(path, **kwargs)
+        except ValueError:
+            pass
+        else:
+            assert False